@@ -1,189 +1,1044 @@
+from time import perf_counter, perf_counter_ns, time
+
+STARTED = perf_counter()  # Start of startup as --measure-startup reports it: everything below is import time
+
+import logging
+import os
+import sqlite3
 import sys
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack
+from itertools import accumulate, repeat
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QFrame, QVBoxLayout, QHBoxLayout,
-                             QCheckBox, QLabel, QPushButton, QLineEdit, QWidget,
-                             QGraphicsDropShadowEffect, QSizePolicy, QSpacerItem)
-from PyQt6.QtCore import Qt, QPoint, QMimeData, QPropertyAnimation, QEasingCurve, QRect
-from PyQt6.QtGui import QFont, QDrag, QFontDatabase, QColor, QIcon, QPalette, QLinearGradient, QPainter
-from datetime import datetime, timedelta
+                             QLabel, QPushButton, QLineEdit, QWidget, QListView, QProgressBar, QFileDialog,
+                             QInputDialog, QTabBar, QDialog, QMessageBox,
+                             QAbstractItemView, QStyledItemDelegate, QStyleOptionViewItem, QStyle,
+                             QGraphicsDropShadowEffect)
+from PyQt6.QtCore import (Qt, QPoint, QMimeData, QPropertyAnimation, QEasingCurve, QRect, QRectF, QSize,
+                          QEvent, QModelIndex, QAbstractListModel, QObject, QThreadPool, QTimer, pyqtSignal)
+from PyQt6.QtGui import (QFont, QDrag, QFontDatabase, QColor, QLinearGradient, QPainter, QKeySequence,
+                         QPen, QPixmap, QCursor, QBrush, QGradient)
+from datetime import datetime
 
 from style import TaskStyles
+from shadows import ShadowCache
+from buckets import BUCKETS, BucketIndex
+from core import TaskList, TaskRecord
+from dates import parse_due_text
+from recurrence import describe, parse_rule, upcoming
+from history import History
+from instrument import Session, StallDetector, recorder, timed
+from search import SearchIndex
+from store import open_store
+from watcher import StoreWatcher, SyncAgent
+from writer import WriteBehindStore, write_behind
+from reminders import ReminderScheduler
+# transfer (import and export), archive, sync, argparse and json are imported where used: startup needs none of them
+
+IMPORTED = perf_counter()
+log = logging.getLogger(__name__)
+
+
+def row_changes(old, new):
+    """
+    Row edits turning the id list `old` into `new`: (first, last) ranges to remove, bottom
+    up, then (row, ids) runs to insert, top down. The longest run of rows that keep their
+    order stays in place; other rows that moved are removed and inserted again.
+    """
+    positions = {task_id: row for row, task_id in enumerate(new)}
+    kept = [task_id for task_id in old if task_id in positions]
+    # Longest increasing subsequence of the kept rows' new positions, by patience sorting
+    tails, tail_ids, previous = [], [], {}
+    for task_id in kept:
+        position = positions[task_id]
+        pile = bisect_left(tails, position)
+        previous[task_id] = tail_ids[pile - 1] if pile else None
+        if pile == len(tails):
+            tails.append(position)
+            tail_ids.append(task_id)
+        else:
+            tails[pile] = position
+            tail_ids[pile] = task_id
+    staying = set()
+    task_id = tail_ids[-1] if tail_ids else None
+    while task_id is not None:
+        staying.add(task_id)
+        task_id = previous[task_id]
+
+    removals = []
+    for row in range(len(old) - 1, -1, -1):
+        if old[row] not in staying:
+            if removals and removals[-1][0] == row + 1:
+                removals[-1] = (row, removals[-1][1])
+            else:
+                removals.append((row, row))
+    insertions = []
+    for row, task_id in enumerate(new):
+        if task_id not in staying:
+            if insertions and insertions[-1][0] + len(insertions[-1][1]) == row:
+                insertions[-1][1].append(task_id)
+            else:
+                insertions.append((row, [task_id]))
+    return removals, insertions
+
+
+def update_rows(model, ids, changed=()):
+    """
+    Brings a model's fetched `ids` to a new list by row removals and insertions, so views
+    keep their selection, current row and scroll position, and repaints the rows of the
+    `changed` tasks that stay. Many edits reset the model instead.
+    """
+    removals, insertions = row_changes(model.ids, ids)
+    for task_id in changed:
+        model.records.pop(task_id, None)
+    if len(removals) + len(insertions) > model.PAGE_SIZE:
+        model.beginResetModel()
+        model.ids = list(ids)
+        model.records.clear()
+        model.endResetModel()
+        return
+    for first, last in removals:
+        model.beginRemoveRows(QModelIndex(), first, last)
+        for task_id in model.ids[first:last + 1]:
+            model.records.pop(task_id, None)
+        del model.ids[first:last + 1]
+        model.endRemoveRows()
+    for row, run in insertions:
+        model.beginInsertRows(QModelIndex(), row, row + len(run) - 1)
+        model.ids[row:row] = run
+        model.endInsertRows()
+    if changed:
+        rows = [row for row, task_id in enumerate(model.ids) if task_id in changed]
+        if rows:
+            model.dataChanged.emit(model.index(rows[0]), model.index(rows[-1]))
+
+
+class TaskListModel(QAbstractListModel):
+    """
+    Qt list model over a core TaskList.
+    The TaskList owns the rows and their paging; the model only forwards its change events
+    to the views and answers their data requests.
+    """
+
+    TaskRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.tasks = TaskList(store)
+        self.tasks.subscribe(self._forward)
+
+    def _forward(self, event):
+        """Translates a TaskList event into the matching model notification"""
+        kind = event.kind
+        if kind == "inserting":
+            self.beginInsertRows(QModelIndex(), event.first, event.last)
+        elif kind == "inserted":
+            self.endInsertRows()
+        elif kind == "removing":
+            self.beginRemoveRows(QModelIndex(), event.first, event.last)
+        elif kind == "removed":
+            self.endRemoveRows()
+        elif kind == "moving":
+            self.beginMoveRows(QModelIndex(), event.first, event.last, QModelIndex(), event.destination)
+        elif kind == "moved":
+            self.endMoveRows()
+        elif kind == "changed":
+            self.dataChanged.emit(self.index(event.first), self.index(event.last))
+        elif kind == "resetting":
+            self.beginResetModel()
+        elif kind == "reset":
+            self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tasks)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.task_data(self.tasks.task(index.row()), role)
+
+    @classmethod
+    def task_data(cls, task, role):
+        """A task's data for a role, as every task model shows it"""
+        if role == cls.TaskRole:
+            return task
+        if role == Qt.ItemDataRole.DisplayRole:
+            return task.text
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if task.completed else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.ToolTipRole and task.repeat:
+            # Occurrences are worked out only for the row being hovered
+            return f"{describe(task.repeat)}. Next: " + ", ".join(
+                datetime.fromtimestamp(due).strftime("%a %d %b %H:%M") for due in upcoming(task.repeat, task.due, 5))
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+                | Qt.ItemFlag.ItemIsDragEnabled)
+
+    def all_ids(self):
+        """Ids of every task, loaded or not"""
+        return [row[0] for row in self.tasks.store.dues()]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.tasks.can_fetch_more()
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not parent.isValid():
+            self.tasks.fetch_more()
+
+
+class TaskSearchModel(QAbstractListModel):
+    """
+    Filtered view of a TaskList: the tasks matching a search query, in display order.
+    The search index is built a chunk per event loop pass the first time a query is set,
+    then kept up to date from the TaskList's task events, so typing never scans the list.
+    """
+
+    TaskRole = TaskListModel.TaskRole
+
+    PAGE_SIZE = 100
+
+    def __init__(self, tasks, parent=None):
+        super().__init__(parent)
+        self.tasks = tasks
+        self.search_index = SearchIndex()
+        self.query = ""
+        self.results = None
+        self.ids = []  # Ids of the fetched result rows
+        self.records = {}  # id -> TaskRecord of fetched result rows
+        self.builder = None  # Index build in progress
+        self.ready = False
+        self.pending = []  # Task events that arrived while the index was being built
+        self.edited = set()  # Ids of tasks changed since the last refresh
+
+        self.build_timer = QTimer(self)
+        self.build_timer.setInterval(0)
+        self.build_timer.timeout.connect(self._build_step)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(0)
+        self.refresh_timer.timeout.connect(self.refresh)
+        tasks.subscribe(self._on_task_event)
+
+    # Index maintenance
+
+    def _on_task_event(self, event):
+        if event.kind not in ("created", "updated", "deleted"):
+            return
+        if self.builder is not None:
+            self.pending.append((event.kind, event.task))
+        elif self.ready:
+            self._apply(event.kind, event.task)
+            if self.query:
+                self.edited.add(event.task.id)
+                self.refresh_timer.start()  # Coalesces several edits into one refresh
+
+    def reset_index(self):
+        """Drops the search index after the list was reloaded wholesale; it is built again when needed"""
+        self.build_timer.stop()
+        self.builder = None
+        self.pending = []
+        self.search_index = SearchIndex()
+        self.ready = False
+        self.beginResetModel()
+        self.results, self.ids = None, []
+        self.records.clear()
+        self.endResetModel()
+        if self.query:
+            self.build_index()
+
+    def _apply(self, kind, task):
+        if kind == "deleted":
+            self.search_index.remove(task.id)
+        else:
+            self.search_index.update(task)
+
+    def build_index(self, wait=False):
+        """Starts building the search index, or with `wait` finishes building it right away"""
+        if not self.ready and self.builder is None:
+            self.builder = self.search_index.build(self.tasks.store)
+            self.build_timer.start()
+        if wait:
+            while self.builder is not None:
+                self._build_step()
+
+    def _build_step(self):
+        try:
+            next(self.builder)
+            return
+        except StopIteration:
+            pass
+        self.build_timer.stop()
+        self.builder = None
+        for kind, task in self.pending:
+            self._apply(kind, task)
+        self.pending = []
+        self.ready = True
+        if self.query:
+            self.refresh()
+
+    # Querying
+
+    def set_query(self, query):
+        """Filters to the tasks matching a query; an empty query clears the results"""
+        self.query = query.strip()
+        if not self.query:
+            self.beginResetModel()
+            self.results, self.ids = None, []
+            self.records.clear()
+            self.endResetModel()
+        elif self.ready:
+            self.refresh()
+        else:
+            self.build_index()  # Results are shown once the index is complete
+
+    def refresh(self):
+        """
+        Re-runs the query, keeping at least as many rows fetched as before; rows are updated
+        in place, so the view keeps its selection and scroll position
+        """
+        self.refresh_timer.stop()
+        edited, self.edited = self.edited, set()
+        if not self.query:
+            return
+        wanted = max(len(self.ids), self.PAGE_SIZE)
+        self.results = self.search_index.search(self.query)
+        update_rows(self, self.results.fetch(wanted), edited)
+
+    def task(self, row):
+        """Task shown at a result row, reading its page from the store on first use"""
+        task_id = self.ids[row]
+        task = self.records.get(task_id)
+        if task is None:
+            start = row - row % self.PAGE_SIZE
+            for stored in self.tasks.store.get_many(self.ids[start:start + self.PAGE_SIZE]):
+                self.records[stored[0]] = TaskRecord.from_row(stored)
+            task = self.records[self.ids[row]]
+        return task
+
+    def all_ids(self):
+        """Ids of every matching task, fetched or not"""
+        return list(self.results.matches) if self.results is not None else []
+
+    # Model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        return TaskListModel.task_data(self.task(index.row()), role)
+
+    def flags(self, index):
+        # Filtered rows are not reordered: their neighbours in the full list are hidden
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.results is not None and not self.results.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        found = self.results.fetch(self.PAGE_SIZE)
+        if found:
+            first = len(self.ids)
+            self.beginInsertRows(QModelIndex(), first, first + len(found) - 1)
+            self.ids += found
+            self.endInsertRows()
+
+
+class TaskBucketModel(QAbstractListModel):
+    """
+    One time bucket of a TaskList: its Overdue, Today, Upcoming or Done tasks, by due time.
+    The bucket index is filled from the store before the first paint, so every count is
+    right from the start; from then on it follows the TaskList's task events, and a single
+    timer armed for the next bucket boundary moves tasks along as time passes.
+    """
+
+    TaskRole = TaskListModel.TaskRole
 
-class Task(QFrame):
-    def __init__(self, parent, text, due_datetime, on_delete, on_toggle):
+    countsChanged = pyqtSignal(dict)  # Bucket name -> number of tasks
+
+    PAGE_SIZE = 100
+    MAX_INTERVAL_MS = ReminderScheduler.MAX_INTERVAL_MS
+
+    def __init__(self, tasks, bucket="overdue", parent=None):
         super().__init__(parent)
-        self.parent = parent
-        self.text = text
-        self.due_datetime = due_datetime
-        self.on_delete = on_delete
-        self.on_toggle = on_toggle
-        self.completed = False
-        self.drag_start_position = None
-        self.styles = TaskStyles()
-
-        # Add shadow effect for depth
-        shadow = QGraphicsDropShadowEffect()
-        shadow.setBlurRadius(15)
-        shadow.setColor(QColor(0, 0, 0, 80))
-        shadow.setOffset(0, 2)
-        self.setGraphicsEffect(shadow)
-
-        # Setup task appearance
-        self.setStyleSheet(self.styles.task_normal_style())
-        self.setFrameShape(QFrame.Shape.StyledPanel)
-        self.setFixedHeight(60)  # Consistent height for all tasks
-
-        # Layout
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(12, 8, 12, 8)
-        layout.setSpacing(10)
+        self.tasks = tasks
+        self.bucket = bucket
+        self.bucket_index = BucketIndex()
+        self.ids = []  # Ids of the fetched rows of the bucket
+        self.records = {}  # id -> TaskRecord of fetched rows
+        self.changes = {}  # id -> task, or None if deleted, not filed yet
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(0)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.boundary_timer = QTimer(self)
+        self.boundary_timer.setSingleShot(True)
+        self.boundary_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.boundary_timer.timeout.connect(self._cross_boundary)
+        tasks.subscribe(self._on_task_event)
+
+    # Index maintenance
+
+    def reset_index(self):
+        """Files every task again, e.g. at startup or after the list was reloaded wholesale"""
+        self.changes = {}
+        self.bucket_index.build(self.tasks.store, time())
+        self._clear()
+        self.refresh()
+
+    def _on_task_event(self, event):
+        kind = event.kind
+        if kind in ("created", "updated", "deleted"):
+            self.changes[event.task.id] = None if kind == "deleted" else event.task
+            self.refresh_timer.start()  # Files a burst of edits, such as a bulk delete, at once
+
+    def _arm(self):
+        delay_ms = int((self.bucket_index.next_boundary() - time()) * 1000) + 1
+        self.boundary_timer.start(min(max(0, delay_ms), self.MAX_INTERVAL_MS))
+
+    def _cross_boundary(self):
+        # An early or capped wake-up moves nothing and just re-arms
+        if self.bucket_index.advance(time()):
+            self.refresh()
+        self._arm()
+
+    # Rows
+
+    def set_bucket(self, bucket):
+        """Shows another bucket, from its first rows"""
+        self.bucket = bucket
+        self._clear()
+        self.refresh()
+
+    def _clear(self):
+        self.beginResetModel()
+        self.ids = []
+        self.records.clear()
+        self.endResetModel()
+
+    def refresh(self):
+        """
+        Files the changed tasks and re-reads the bucket's rows, keeping at least as many
+        fetched as before, and the counts. Rows are updated in place, so the view keeps its
+        selection and scroll position.
+        """
+        self.refresh_timer.stop()
+        changes, self.changes = self.changes, {}
+        if changes:
+            self.bucket_index.apply(changes)
+        self._arm()  # A changed task may now be the next to turn overdue
+        wanted = max(len(self.ids), self.PAGE_SIZE)
+        update_rows(self, self.bucket_index.ids(self.bucket, 0, wanted), changes)
+        self.countsChanged.emit(self.bucket_index.counts())
+
+    def task(self, row):
+        """Task shown at a row, reading its page from the store on first use"""
+        task_id = self.ids[row]
+        task = self.records.get(task_id)
+        if task is None:
+            start = row - row % self.PAGE_SIZE
+            for stored in self.tasks.store.get_many(self.ids[start:start + self.PAGE_SIZE]):
+                self.records[stored[0]] = TaskRecord.from_row(stored)
+            task = self.records[self.ids[row]]
+        return task
 
-        # Checkbox
-        self.check_box = QCheckBox()
-        self.check_box.toggled.connect(self.toggle_done)
-        self.check_box.setStyleSheet(self.styles.checkbox_style())
-        self.check_box.setCheckable(True)
-        self.check_box.setText("")  # No text beside the checkbox
-        layout.addWidget(self.check_box)
-
-        # Task info container
-        task_info_container = QWidget()
-        task_info_container.setStyleSheet("background: transparent; border: none;")
-        task_info_layout = QVBoxLayout(task_info_container)
-        task_info_layout.setContentsMargins(0, 0, 0, 0)
-        task_info_layout.setSpacing(2)
-
-        # Task Label - main text
-        self.label = QLabel(self.text)
-        self.label.setFont(QFont("Segoe UI", 11, QFont.Weight.Medium))
-        self.label.setStyleSheet("color: white; background: transparent;")
-        task_info_layout.addWidget(self.label)
-
-        # Due date label - secondary text
-        self.due_date_label = QLabel(f"Due: {self.due_datetime.strftime('%d/%m/%y %H:%M')}")
-        self.due_date_label.setFont(QFont("Segoe UI", 9))
-        self.due_date_label.setStyleSheet("color: #a0a0a0; background: transparent;")
-        task_info_layout.addWidget(self.due_date_label)
-
-        layout.addWidget(task_info_container, 1)  # Stretch factor of 1 to expand
-
-        # Delete Button
-        self.delete_button = QPushButton("✕")
-        self.delete_button.setStyleSheet(self.styles.delete_button_style())
-        self.delete_button.clicked.connect(self.delete_task)
-        layout.addWidget(self.delete_button)
-
-        # Enable dragging
-        self.setMouseTracking(True)
+    def all_ids(self):
+        """Ids of every task in the bucket, fetched or not"""
+        return self.bucket_index.ids(self.bucket, 0, self.bucket_index.count(self.bucket))
 
-        # Initialize drag properties
-        self.setProperty("dragging", False)
-        self.setProperty("dropBefore", False)
-        self.setProperty("dropAfter", False)
-
-    def toggle_done(self, checked):
-        """Mark task as completed or uncompleted with animation"""
-        self.completed = checked
-
-        if checked:
-            # Change task appearance when completed
-            self.label.setStyleSheet("color: #888888; text-decoration: line-through; background: transparent;")
-            self.due_date_label.setStyleSheet("color: #666666; background: transparent;")
-            self.setStyleSheet(self.styles.task_completed_style())
-            # Remove the priority indicator line
-        else:
-            # Restore original appearance
-            self.label.setStyleSheet("color: white; background: transparent;")
-            self.due_date_label.setStyleSheet("color: #a0a0a0; background: transparent;")
-            self.setStyleSheet(self.styles.task_normal_style())
-            # Remove the priority indicator line
-
-        self.on_toggle(self)
-
-    def delete_task(self):
-        """Delete the task with fade out animation"""
-        self.setStyleSheet(self.styles.task_delete_style())
-        # Could add a QPropertyAnimation here for fade out effect
-        self.on_delete(self)
-
-    def enterEvent(self, event):
-        """Mouse hover enter effect"""
-        self.setStyleSheet(self.styles.task_hover_style())
-        # Increase shadow effect
-        shadow = self.graphicsEffect()
-        shadow.setBlurRadius(20)
-        shadow.setOffset(0, 3)
-
-    def leaveEvent(self, event):
-        """Mouse hover leave effect"""
-        if not self.completed:
-            self.setStyleSheet(self.styles.task_normal_style())
+    # Model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        return TaskListModel.task_data(self.task(index.row()), role)
+
+    def flags(self, index):
+        # Buckets are ordered by due time, not by hand
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.ids) < self.bucket_index.count(self.bucket)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        found = self.bucket_index.ids(self.bucket, len(self.ids), self.PAGE_SIZE)
+        if found:
+            first = len(self.ids)
+            self.beginInsertRows(QModelIndex(), first, first + len(found) - 1)
+            self.ids += found
+            self.endInsertRows()
+
+
+class ArchiveModel(QAbstractListModel):
+    """
+    Archived tasks, most recently archived first, optionally filtered by a query. Rows are
+    read from the archive a page at a time as the view scrolls, a block per step and a time
+    slice of steps per event loop pass, so a search that scans many blocks for few matches
+    keeps the window responsive.
+    """
+
+    PAGE_SIZE = 100
+    TIME_SLICE = 0.012  # Seconds of reading per event loop pass, as TransferJob
+
+    def __init__(self, archive, parent=None):
+        super().__init__(parent)
+        self.archive = archive
+        self.rows = []  # (id, text, due, completed, order_key, repeat) rows shown so far
+        self.found = []  # Rows read past the page being filled
+        self.source = None
+        self.wanted = 0  # Rows to show before reading stops
+        self.exhausted = False
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._read)
+        self.set_query("")
+
+    def set_query(self, query):
+        """Starts over with the archived tasks matching a query, or all of them"""
+        self.beginResetModel()
+        self.source = self.archive.blocks(query)
+        self.rows = []
+        self.found = []
+        self.exhausted = False
+        self.endResetModel()
+        self.wanted = self.PAGE_SIZE
+        self._read()
+
+    def _read(self):
+        """Reads blocks until the page is filled, the archive runs out or the time slice is spent"""
+        deadline = perf_counter() + self.TIME_SLICE
+        while len(self.found) < self.wanted - len(self.rows) and not self.exhausted:
+            if perf_counter() >= deadline:
+                self.timer.start()
+                break
+            try:
+                self.found += next(self.source)
+            except StopIteration:
+                self.exhausted = True
         else:
-            self.setStyleSheet(self.styles.task_completed_style())
-        # Reset shadow effect
-        shadow = self.graphicsEffect()
-        shadow.setBlurRadius(15)
-        shadow.setOffset(0, 2)
-
-    def mousePressEvent(self, event):
-        """Handle mouse press events for drag and drop"""
-        if event.button() == Qt.MouseButton.LeftButton:
-            self.drag_start_position = event.position().toPoint()
-            # Set property to track dragging state
-            self.setProperty("dragging", True)
-            # Highlight the task when dragging starts
-            self.setStyleSheet(self.styles.task_dragging_style())
-
-    def mouseMoveEvent(self, event):
-        """Handle mouse move events for drag and drop"""
-        if not (event.buttons() & Qt.MouseButton.LeftButton) or not self.drag_start_position:
+            self.timer.stop()
+        found = self.found[:self.wanted - len(self.rows)]
+        if found:
+            del self.found[:len(found)]
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(found) - 1)
+            self.rows += found
+            self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{row[1]}  ·  {datetime.fromtimestamp(row[2]).strftime('%d/%m/%y %H:%M')}"
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.timer.isActive() and bool(self.found or not self.exhausted)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
             return
+        self.wanted = len(self.rows) + self.PAGE_SIZE
+        self._read()
+
+
+class ArchiveDialog(QDialog):
+    """Browses and searches the archive, and puts selected tasks back into the list"""
+
+    restoreRequested = pyqtSignal(list)  # Ids of archived tasks to restore
 
-        # Check if the minimum drag distance is met
-        if (event.position().toPoint() - self.drag_start_position).manhattanLength() < QApplication.startDragDistance():
+    def __init__(self, archive, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Archive")
+        self.resize(460, 520)
+        layout = QVBoxLayout(self)
+
+        self.search_entry = QLineEdit()
+        self.search_entry.setPlaceholderText("🔍 Search the archive")
+        self.search_entry.setClearButtonEnabled(True)
+        layout.addWidget(self.search_entry)
+
+        self.model = ArchiveModel(archive, self)
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.list_view.setModel(self.model)
+        layout.addWidget(self.list_view, 1)
+
+        self.restore_btn = QPushButton("Restore selected")
+        self.restore_btn.clicked.connect(self.restore_selected)
+        layout.addWidget(self.restore_btn)
+
+        # Searching scans the archive, so it waits for a pause in typing
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(lambda: self.model.set_query(self.search_entry.text()))
+        self.search_entry.textChanged.connect(self.search_timer.start)
+
+    def restore_selected(self):
+        task_ids = [self.model.rows[index.row()][0] for index in self.list_view.selectionModel().selectedRows()]
+        if task_ids:
+            self.restoreRequested.emit(task_ids)
+            self.model.set_query(self.search_entry.text())
+
+
+class TransferJob(QObject):
+    """
+    Drives an import or export generator from the event loop, a time slice per pass, so the
+    window keeps painting and responding while millions of rows stream through.
+    The generator yields (done, total) progress and returns a summary message.
+    """
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(str)
+
+    TIME_SLICE = 0.012  # Seconds of work per event loop pass
+
+    def __init__(self, steps, parent=None):
+        super().__init__(parent)
+        self.steps = steps
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._step)
+
+    def start(self):
+        self.timer.start()
+
+    def _step(self):
+        deadline = perf_counter() + self.TIME_SLICE
+        done = total = 0
+        try:
+            while perf_counter() < deadline:
+                done, total = next(self.steps)
+        except StopIteration as stop:
+            self._finish(stop.value or "Done")
+            return
+        except (OSError, ValueError) as error:  # Unreadable file, bad JSON or CSV
+            self._finish(f"Transfer failed: {error}")
             return
+        self.progress.emit(done, total)
+
+    def _finish(self, message):
+        self.timer.stop()
+        self.finished.emit(message)
+
+
+class TaskDelegate(QStyledItemDelegate):
+    """Paints a task row: checkbox, text, due date and delete button"""
+
+    toggleRequested = pyqtSignal(int)
+    deleteRequested = pyqtSignal(int)
+    editRequested = pyqtSignal(int)
+
+    ROW_HEIGHT = 70  # Card plus the gap to the next row, which also holds the card's shadow
+    CHECK_SIZE = 20
+    DELETE_SIZE = 30
+
+    def __init__(self, styles, parent=None):
+        super().__init__(parent)
+        self.set_styles(styles)
+        self.shadows = ShadowCache()
+        self.text_font = QFont("Segoe UI", 11, QFont.Weight.Medium)
+        self.done_font = QFont(self.text_font)
+        self.done_font.setStrikeOut(True)
+        self.due_font = QFont("Segoe UI", 9)
+        self.delete_font = QFont("Segoe UI")
+        self.delete_font.setPixelSize(25)
+        self.delete_font.setBold(True)
+
+    def set_styles(self, styles):
+        """Precompiles the brushes, pens and colors rows are painted with"""
+        self.styles = styles
+        self.row_brushes = {}
+        for state in ("normal", "hover", "completed", "selected", "dragging"):
+            top, bottom, border = styles.task_row_colors(state)
+            gradient = QLinearGradient(0, 0, 0, 1)
+            gradient.setCoordinateMode(QGradient.CoordinateMode.ObjectBoundingMode)
+            gradient.setColorAt(0, QColor(top))
+            gradient.setColorAt(1, QColor(bottom))
+            self.row_brushes[state] = (QBrush(gradient), QPen(QColor(border), 1))
+        self.check_paint = {
+            True: (QPen(QColor(styles.color_task_bg), 2), QBrush(QColor(styles.color_accent))),
+            False: (QPen(QColor(styles.color_checkbox_border), 2), QBrush(QColor(styles.color_task_bg))),
+        }
+        self.text_colors = {completed: tuple(QColor(color) for color in styles.task_text_colors(completed))
+                            for completed in (True, False)}
+        self.accent_color = QColor(styles.color_accent)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def frame_rect(self, rect):
+        """Rectangle of the task card inside its row, leaving room for the shadow"""
+        margin = self.shadows.margin
+        return QRectF(rect).adjusted(margin, margin - 1, -margin, -margin - 2)
+
+    def check_rect(self, rect):
+        """Hit/paint rectangle of the checkbox"""
+        frame = self.frame_rect(rect)
+        top = frame.center().y() - self.CHECK_SIZE / 2
+        return QRectF(frame.left() + 12, top, self.CHECK_SIZE, self.CHECK_SIZE)
+
+    def delete_rect(self, rect):
+        """Hit/paint rectangle of the delete button"""
+        frame = self.frame_rect(rect)
+        top = frame.center().y() - self.DELETE_SIZE / 2
+        return QRectF(frame.right() - 12 - self.DELETE_SIZE, top, self.DELETE_SIZE, self.DELETE_SIZE)
+
+    def row_state(self, option, index):
+        """Visual state of a row: normal, hover, completed, selected or dragging"""
+        view = option.widget
+        if view is not None and getattr(view, "drag_row", -1) == index.row():
+            return "dragging"
+        if option.state & QStyle.StateFlag.State_Selected or getattr(view, "all_selected", False):
+            return "selected"
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            return "hover"
+        if index.data(TaskListModel.TaskRole).completed:
+            return "completed"
+        return "normal"
+
+    def paint(self, painter, option, index):
+        task = index.data(TaskListModel.TaskRole)
+        state = self.row_state(option, index)
+        card_brush, border_pen = self.row_brushes[state]
+        frame = self.frame_rect(option.rect)
+
+        painter.save()
+
+        # Shadow for depth, from the cached pixmaps (hover raises the card a little)
+        self.shadows.paint(painter, frame, "hover" if state == "hover" else "normal")
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Card
+        painter.setBrush(card_brush)
+        painter.setPen(border_pen)
+        painter.drawRoundedRect(frame, 8, 8)
+
+        # Checkbox
+        check_pen, check_brush = self.check_paint[task.completed]
+        painter.setPen(check_pen)
+        painter.setBrush(check_brush)
+        painter.drawEllipse(self.check_rect(option.rect).adjusted(1, 1, -1, -1))
+
+        # Task text and due date
+        text_left = self.check_rect(option.rect).right() + 10
+        text_width = self.delete_rect(option.rect).left() - 10 - text_left
+        text_color, due_color = self.text_colors[task.completed]
+
+        painter.setFont(self.done_font if task.completed else self.text_font)
+        painter.setPen(text_color)
+        metrics = painter.fontMetrics()
+        text = metrics.elidedText(task.text, Qt.TextElideMode.ElideRight, int(text_width))
+        text_rect = QRectF(text_left, frame.top() + 8, text_width, frame.height() / 2 - 6)
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignBottom, text)
+
+        painter.setFont(self.due_font)
+        painter.setPen(due_color)
+        due_rect = QRectF(text_left, frame.center().y() + 2, text_width, frame.height() / 2 - 10)
+        due_text = f"Due: {task.due_datetime.strftime('%d/%m/%y %H:%M')}"
+        if task.repeat:
+            due_text += f"  ↻ {describe(task.repeat)}"
+        painter.drawText(due_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, due_text)
+
+        # Delete button
+        painter.setFont(self.delete_font)
+        painter.setPen(self.accent_color)
+        painter.drawText(self.delete_rect(option.rect), Qt.AlignmentFlag.AlignCenter, "✕")
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """Handles clicks on the checkbox and delete button, and double clicks on the text"""
+        if event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
+            position = event.position()
+            if self.check_rect(option.rect).contains(position):
+                self.toggleRequested.emit(index.row())
+                return True
+            if self.delete_rect(option.rect).contains(position):
+                self.deleteRequested.emit(index.row())
+                return True
+        if event.type() == QEvent.Type.MouseButtonDblClick and event.button() == Qt.MouseButton.LeftButton:
+            position = event.position()
+            if not (self.check_rect(option.rect).contains(position)
+                    or self.delete_rect(option.rect).contains(position)):
+                self.editRequested.emit(index.row())
+                return True
+        return super().editorEvent(event, model, option, index)
+
+
+class TaskListView(QListView):
+    """
+    Task list view handling multi-selection, drag-to-reorder and drop zone highlighting.
+    Select all covers every task of the model, including rows not fetched yet.
+    """
+
+    taskMoved = pyqtSignal(int, int)
+    tasksMoved = pyqtSignal(list, int)  # Dragged rows, and the row they were dropped above
+
+    def __init__(self, styles, parent=None):
+        super().__init__(parent)
+        self.set_styles(styles)
+        self.drag_row = -1
+        self.drag_rows = []  # Selected rows dragged along with drag_row
+        self.drop_row = -1
+        self.all_selected = False  # Select all: every task of the model, fetched or not
+        self._row_offsets = None
+        self._row_centers = None
+        self.layout_requested_ns = None  # When a relayout was requested, until it is done
+
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+        self.setMouseTracking(True)
+        self.viewport().setAttribute(Qt.WidgetAttribute.WA_Hover)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setDragEnabled(True)
+        self.setAcceptDrops(True)
+        self.setDropIndicatorShown(False)  # Drop zone is painted by paintEvent
+        self.setObjectName("taskList")
+
+    def set_styles(self, styles):
+        """Precompiles the pen used for the drop zone line"""
+        self.styles = styles
+        self.drop_pen = QPen(QColor(styles.color_accent), 2)
+
+    def selectAll(self):
+        super().selectAll()
+        self.all_selected = True
+
+    def selectionChanged(self, selected, deselected):
+        super().selectionChanged(selected, deselected)
+        self.all_selected = False  # Set again right after by selectAll()
+
+    def reset(self):
+        super().reset()
+        self.all_selected = False
+
+    def startDrag(self, supported_actions):
+        """Starts dragging the row under the cursor, with the other selected rows if it is selected"""
+        index = self.currentIndex()
+        if not index.isValid():
+            return
+        self.drag_row = index.row()
+        if self.selectionModel().isSelected(index):
+            self.drag_rows = sorted(selected.row() for selected in self.selectionModel().selectedRows())
 
-        # Start drag
         drag = QDrag(self)
         mime_data = QMimeData()
         mime_data.setText("task")  # Identifier for the dragged content
         drag.setMimeData(mime_data)
 
-        # Create a visual representation during dragging
-        # Capture the widget appearance
-        pixmap = self.grab()
-        # Make it semi-transparent
+        # Render the row into a semi-transparent pixmap
+        rect = self.visualRect(index)
+        pixmap = QPixmap(rect.size())
+        pixmap.fill(Qt.GlobalColor.transparent)
         painter = QPainter(pixmap)
+        option = QStyleOptionViewItem()
+        self.initViewItemOption(option)
+        option.rect = QRect(0, 0, rect.width(), rect.height())
+        self.itemDelegate().paint(painter, option, index)
         painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_DestinationIn)
         painter.fillRect(pixmap.rect(), QColor(0, 0, 0, 160))
         painter.end()
 
         drag.setPixmap(pixmap)
-        drag.setHotSpot(event.position().toPoint())
+        drag.setHotSpot(self.viewport().mapFromGlobal(QCursor.pos()) - rect.topLeft())
 
-        # Perform the drag operation
+        self.viewport().update(rect)
         drag.exec(Qt.DropAction.MoveAction)
 
-    def mouseReleaseEvent(self, event):
-        """Handle mouse release events"""
-        # Reset dragging state
-        self.setProperty("dragging", False)
-        # Reset styling based on completion status
-        if not self.completed:
-            self.setStyleSheet(self.styles.task_normal_style())
+        self.drag_row = -1
+        self.drag_rows = []
+        self.clear_drop_highlighting()
+
+    def dragEnterEvent(self, event):
+        """Handle when drag enters the list"""
+        if event.source() is self and event.mimeData().hasText():
+            event.acceptProposedAction()
+            # Highlight potential drop area
+            self.highlight_drop_zone(event.position().y())
+        else:
+            event.ignore()
+
+    def dragMoveEvent(self, event):
+        """Handle drag movement over the list"""
+        if event.source() is self and event.mimeData().hasText():
+            event.acceptProposedAction()
+            # Update highlighted drop area
+            self.highlight_drop_zone(event.position().y())
+        else:
+            event.ignore()
+
+    def dragLeaveEvent(self, event):
+        """Handle when drag leaves the list"""
+        # Remove any drop zone highlighting
+        self.clear_drop_highlighting()
+
+    def setModel(self, model):
+        previous = self.model()
+        if previous is not None:
+            for signal in self._geometry_signals(previous):
+                signal.disconnect(self.invalidate_row_offsets)
+        super().setModel(model)
+        for signal in self._geometry_signals(model):
+            signal.connect(self.invalidate_row_offsets)
+        self.invalidate_row_offsets()
+
+    @staticmethod
+    def _geometry_signals(model):
+        return (model.rowsInserted, model.rowsRemoved, model.rowsMoved,
+                model.modelReset, model.layoutChanged)
+
+    def invalidate_row_offsets(self):
+        """Drops the cached row geometry after rows were added, removed or moved"""
+        self._row_offsets = None
+        self._row_centers = None
+
+    def row_offsets(self):
+        """
+        Cached prefix sums of row heights in content coordinates (row i spans offsets i to i+1),
+        with the matching row centers, so drop positions are found by bisection
+        """
+        if self._row_offsets is None:
+            model = self.model()
+            count = model.rowCount()
+            option = QStyleOptionViewItem()
+            self.initViewItemOption(option)
+            spacing = 2 * self.spacing()
+            if self.uniformItemSizes() and count:
+                pitch = self.itemDelegate().sizeHint(option, model.index(0)).height() + spacing
+                heights = repeat(pitch, count)
+            else:
+                heights = (self.itemDelegate().sizeHint(option, model.index(row)).height() + spacing
+                           for row in range(count))
+            offsets = [0]
+            offsets += accumulate(heights)
+            self._row_offsets = offsets
+            self._row_centers = [(top + bottom) / 2 for top, bottom in zip(offsets, offsets[1:])]
+        return self._row_offsets
+
+    def drop_index_at(self, y_position):
+        """Row before which a drop at the given viewport y would insert"""
+        self.row_offsets()
+        return bisect_right(self._row_centers, y_position + self.verticalOffset())
+
+    @timed("highlight_drop_zone")
+    def highlight_drop_zone(self, y_position):
+        """Highlights the potential drop zone"""
+        drop_row = self.drop_index_at(y_position)
+        if drop_row != self.drop_row:
+            self.drop_row = drop_row
+            self.viewport().update()
+
+    def clear_drop_highlighting(self):
+        """Clears all drop zone highlighting"""
+        if self.drop_row != -1:
+            self.drop_row = -1
+            self.viewport().update()
+
+    @timed("dropEvent")
+    def dropEvent(self, event):
+        """Handle drop events to reorder tasks"""
+        if event.source() is self and event.mimeData().hasText() and self.drag_row != -1:
+            insert_index = self.drop_index_at(event.position().y())
+            current_index = self.drag_row
+
+            if len(self.drag_rows) > 1:
+                self.tasksMoved.emit(self.drag_rows, insert_index)
+            # Only reorder if the position changed
+            elif current_index != insert_index and current_index + 1 != insert_index:
+                if current_index < insert_index:
+                    insert_index -= 1  # Adjust index after removal
+                self.taskMoved.emit(current_index, insert_index)
+
+            # Clear any highlighting
+            self.clear_drop_highlighting()
+            event.acceptProposedAction()
         else:
-            self.setStyleSheet(self.styles.task_completed_style())
-        self.drag_start_position = None
+            event.ignore()
+
+    def request_layout(self):
+        """Schedules one relayout for this event loop pass; the wait for it is recorded"""
+        if self.layout_requested_ns is None:
+            self.layout_requested_ns = perf_counter_ns()
+        self.scheduleDelayedItemsLayout()
+
+    def updateGeometries(self):
+        super().updateGeometries()
+        if self.layout_requested_ns is not None:
+            recorder.record("update_task_order.relayout", self.layout_requested_ns, perf_counter_ns())
+            self.layout_requested_ns = None
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.drop_row < 0:
+            return
+        offsets = self.row_offsets()
+        if len(offsets) < 2:
+            return
+        # Draw the insertion line in the gap above the target row (or below the last one)
+        y = min(offsets[self.drop_row], offsets[-1] - self.spacing()) - self.verticalOffset()
+        painter = QPainter(self.viewport())
+        painter.setPen(self.drop_pen)
+        painter.drawLine(4, y, self.viewport().width() - 4, y)
+        painter.end()
 
 
 class TaskManager(QMainWindow):
-    def __init__(self):
+    firstPainted = pyqtSignal()
+    startupFinished = pyqtSignal()  # Tasks loaded and the whole window built
+    archiveWritten = pyqtSignal(object)  # Error message of the archive batch just written, or None; from its thread
+
+    IMPORT_CHUNK = 250  # Tasks per import batch: one store transaction and one row insert each
+    ARCHIVE_BATCH = 2000  # Tasks archived per background write
+    ARCHIVE_DELAY_MS = 10_000  # First archival after startup, then every ARCHIVE_INTERVAL_MS
+    ARCHIVE_INTERVAL_MS = 3_600_000
+    MESSAGE_MS = 15_000  # How long a notice stays in the header banner
+    VIEWS = ("all",) + BUCKETS  # Tabs above the list: the whole list by hand, then the time buckets
+
+    @timed("window_init")
+    def __init__(self, store=None, deferred=False):
+        """
+        Builds the window. With `deferred`, only its frame is built here, to be shown at once;
+        fonts, the input panel and the tasks follow after the first paint (finish_startup).
+        """
         super().__init__()
+        self.store = store
+        self.ready = False
+        self.painted = False
+        self.closing = False
         self.setWindowTitle("Task Scheduler")
         self.setGeometry(100, 100, 500, 650)
-        self.styles = TaskStyles()
+        self.styles = TaskStyles(os.environ.get("JAX_TODO_THEME", "dark"))
 
-        # Set application style
-        self.setStyleSheet(self.styles.main_window_style())
+        # One application-wide stylesheet, parsed once before any widget is polished
+        QApplication.instance().setStyleSheet(self.styles.application_style())
 
         # Central widget and main layout
         central_widget = QWidget()
@@ -199,34 +1054,154 @@ class TaskManager(QMainWindow):
 
         title_label = QLabel("Task Scheduler")
         title_label.setFont(QFont("Segoe UI", 22, QFont.Weight.Bold))
-        title_label.setStyleSheet("color: #ff9100;")
+        title_label.setObjectName("title")
         header_layout.addWidget(title_label)
 
         date_label = QLabel(f"Today: {datetime.now().strftime('%A, %d %B %Y')}")
         date_label.setFont(QFont("Segoe UI", 12))
-        date_label.setStyleSheet("color: #a0a0a0;")
+        date_label.setObjectName("subtitle")
         header_layout.addWidget(date_label)
 
-        main_layout.addWidget(header)
+        # Reminder banner, shown when tasks come due
+        self.reminder_label = QLabel()
+        self.reminder_label.setFont(QFont("Segoe UI", 11, QFont.Weight.Medium))
+        self.reminder_label.setObjectName("reminder")
+        self.reminder_label.setWordWrap(True)
+        self.reminder_label.hide()
+        header_layout.addWidget(self.reminder_label)
+        # One timer hides the banner, restarted by each notice so it shows for the full time
+        self.message_timer = QTimer(self)
+        self.message_timer.setSingleShot(True)
+        self.message_timer.setInterval(self.MESSAGE_MS)
+        self.message_timer.timeout.connect(self.reminder_label.hide)
+
+        # Import/export progress, shown while a transfer runs
+        self.transfer_progress = QProgressBar()
+        self.transfer_progress.setRange(0, 1000)
+        self.transfer_progress.setTextVisible(False)
+        self.transfer_progress.setFixedHeight(6)
+        self.transfer_progress.hide()
+        header_layout.addWidget(self.transfer_progress)
 
-        # Task list with scroll
-        self.task_list_widget = QWidget()
-        self.task_list_layout = QVBoxLayout(self.task_list_widget)
-        self.task_list_layout.setSpacing(10)  # Increased spacing between tasks
-        self.task_list_layout.setContentsMargins(5, 5, 5, 5)
-        self.task_list_layout.addStretch(1)  # Push content to the top
-
-        # Add scroll effect to the task list
-        scroll_area = QWidget()
-        scroll_layout = QVBoxLayout(scroll_area)
-        scroll_layout.setContentsMargins(0, 0, 0, 0)
-        scroll_layout.addWidget(self.task_list_widget)
+        main_layout.addWidget(header)
 
-        main_layout.addWidget(scroll_area, 1)  # Stretch factor to expand
+        self.task_delegate = TaskDelegate(self.styles, self)
+        self.task_delegate.toggleRequested.connect(self.toggle_task)
+        self.task_delegate.deleteRequested.connect(self.remove_task)
+        self.task_delegate.editRequested.connect(self.edit_task)
+
+        self.task_view = TaskListView(self.styles)
+        self.task_view.setItemDelegate(self.task_delegate)
+        self.task_view.taskMoved.connect(self.move_task)
+        self.task_view.tasksMoved.connect(self.move_tasks)
+
+        # Search bar, filtering the list as the user types
+        self.search_entry = QLineEdit()
+        self.search_entry.setPlaceholderText("🔍 Search tasks")
+        self.search_entry.setClearButtonEnabled(True)
+        self.search_entry.setMinimumHeight(36)
+        main_layout.addWidget(self.search_entry)
+
+        # Whole list or one time bucket, opening on the overdue tasks
+        self.view_tabs = QTabBar()
+        self.view_tabs.setDrawBase(False)
+        self.view_tabs.setExpanding(False)
+        for view in self.VIEWS:
+            self.view_tabs.addTab(view.capitalize())
+        self.view_tabs.setCurrentIndex(self.VIEWS.index("overdue"))
+        main_layout.addWidget(self.view_tabs)
+
+        main_layout.addWidget(self.task_view, 1)  # Stretch factor to expand
+
+        # Event loop stall detection, ticking only while the window is active
+        self.stall_detector = StallDetector(self)
+
+        # Bulk import and export, streamed from the File menu; usable once the tasks are loaded
+        self.transfer = None
+        self.menuBar().setEnabled(False)
+        file_menu = self.menuBar().addMenu("&File")
+        import_action = file_menu.addAction("&Import tasks…")
+        import_action.setShortcut(QKeySequence("Ctrl+I"))
+        import_action.triggered.connect(lambda: self.import_tasks())
+        export_action = file_menu.addAction("&Export tasks…")
+        export_action.setShortcut(QKeySequence("Ctrl+E"))
+        export_action.triggered.connect(lambda: self.export_tasks())
+        file_menu.addSeparator()
+        archive_action = file_menu.addAction("&Browse archive…")
+        archive_action.triggered.connect(self.browse_archive)
+
+        edit_menu = self.menuBar().addMenu("&Edit")
+        undo_action = edit_menu.addAction("&Undo")
+        undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        undo_action.triggered.connect(self.undo)
+        redo_action = edit_menu.addAction("&Redo")
+        redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+        redo_action.triggered.connect(self.redo)
+        edit_menu.addSeparator()
+        clear_action = edit_menu.addAction("&Clear completed tasks")
+        clear_action.triggered.connect(self.clear_completed)
+        repeat_action = edit_menu.addAction("Re&peat…")
+        repeat_action.setShortcut(QKeySequence("Ctrl+R"))
+        repeat_action.triggered.connect(lambda: self.edit_repeat(self.task_view.currentIndex().row()))
+
+        # Bulk edits of the selected tasks, each one undoable step
+        edit_menu.addSeparator()
+        select_action = edit_menu.addAction("Select &all")
+        select_action.setShortcut(QKeySequence.StandardKey.SelectAll)
+        select_action.triggered.connect(self.select_all_tasks)
+        complete_action = edit_menu.addAction("C&omplete selected")
+        complete_action.setShortcut(QKeySequence("Ctrl+D"))
+        complete_action.triggered.connect(self.complete_selected)
+        delete_action = edit_menu.addAction("&Delete selected")
+        delete_action.setShortcut(QKeySequence.StandardKey.Delete)
+        delete_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)  # Not while typing
+        delete_action.triggered.connect(self.delete_selected)
+        self.task_view.addAction(delete_action)
+        reschedule_action = edit_menu.addAction("Re&schedule selected…")
+        reschedule_action.setShortcut(QKeySequence("Ctrl+Shift+R"))
+        reschedule_action.triggered.connect(self.reschedule_selected)
+        top_action = edit_menu.addAction("Move selected to &top")
+        top_action.setShortcut(QKeySequence("Ctrl+Shift+Up"))
+        top_action.triggered.connect(lambda: self.move_selected(0))
+        bottom_action = edit_menu.addAction("Move selected to &bottom")
+        bottom_action.setShortcut(QKeySequence("Ctrl+Shift+Down"))
+        bottom_action.triggered.connect(lambda: self.move_selected(len(self.tasks)))
+
+        view_menu = self.menuBar().addMenu("&View")
+        light_action = view_menu.addAction("&Light theme")
+        light_action.setCheckable(True)
+        light_action.setChecked(self.styles.theme == "light")
+        light_action.toggled.connect(lambda light: self.set_theme("light" if light else "dark"))
+
+        if not deferred:
+            self.finish_startup()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            self.firstPainted.emit()
+            if not self.ready:
+                QTimer.singleShot(0, self.finish_startup)  # Once the frame is on screen
+
+    def finish_startup(self):
+        """The part of startup that can wait for the first frame: fonts, input panel and tasks"""
+        if self.ready or self.closing:
+            return
+        QFontDatabase.addApplicationFont("SegoeUI.ttf")  # Load Segoe UI if available
+        self.build_input_panel()
+        if not self.load_tasks():
+            QTimer.singleShot(0, self.close)  # Also when startup runs before the window is shown
+            return
+        self.menuBar().setEnabled(True)
+        self.ready = True
+        self.startupFinished.emit()
 
+    def build_input_panel(self):
+        """Adds the panel for new tasks below the list"""
         # Input section
         input_widget = QFrame()
-        input_widget.setStyleSheet(self.styles.input_panel_style())
+        input_widget.setObjectName("inputPanel")
 
         # Add shadow to input panel
         input_shadow = QGraphicsDropShadowEffect()
@@ -242,7 +1217,7 @@ class TaskManager(QMainWindow):
         # Add "Add New Task" header
         new_task_label = QLabel("Add New Task")
         new_task_label.setFont(QFont("Segoe UI", 14, QFont.Weight.Bold))
-        new_task_label.setStyleSheet("color: white;")
+        new_task_label.setObjectName("panelTitle")
         input_layout.addWidget(new_task_label)
 
         # Task name input with icon
@@ -251,12 +1226,11 @@ class TaskManager(QMainWindow):
         task_input_layout.setContentsMargins(0, 0, 0, 0)
 
         task_icon = QLabel("📋")  # Task icon
-        task_icon.setStyleSheet("font-size: 16px;")
+        task_icon.setObjectName("inputIcon")
         task_input_layout.addWidget(task_icon)
 
         self.task_entry = QLineEdit()
         self.task_entry.setPlaceholderText("What needs to be done?")
-        self.task_entry.setStyleSheet(self.styles.entry_style())
         self.task_entry.setMinimumHeight(40)
         task_input_layout.addWidget(self.task_entry)
 
@@ -274,12 +1248,11 @@ class TaskManager(QMainWindow):
         date_layout.setContentsMargins(0, 0, 0, 0)
 
         date_icon = QLabel("📅")  # Calendar icon
-        date_icon.setStyleSheet("font-size: 16px;")
+        date_icon.setObjectName("inputIcon")
         date_layout.addWidget(date_icon)
 
         self.date_entry = QLineEdit()
-        self.date_entry.setPlaceholderText("DDMMYY")
-        self.date_entry.setStyleSheet(self.styles.entry_style())
+        self.date_entry.setPlaceholderText("DDMMYY, fri, +3d")
         self.date_entry.setMinimumHeight(40)
         date_layout.addWidget(self.date_entry)
 
@@ -291,32 +1264,148 @@ class TaskManager(QMainWindow):
         time_layout.setContentsMargins(0, 0, 0, 0)
 
         time_icon = QLabel("🕒")  # Clock icon
-        time_icon.setStyleSheet("font-size: 16px;")
+        time_icon.setObjectName("inputIcon")
         time_layout.addWidget(time_icon)
 
         self.time_entry = QLineEdit()
-        self.time_entry.setPlaceholderText("HHMM")
-        self.time_entry.setStyleSheet(self.styles.entry_style())
+        self.time_entry.setPlaceholderText("HHMM, 5pm")
         self.time_entry.setMinimumHeight(40)
         time_layout.addWidget(self.time_entry)
 
         datetime_layout.addWidget(time_container)
 
+        # Repeat Entry with icon
+        repeat_container = QWidget()
+        repeat_layout = QHBoxLayout(repeat_container)
+        repeat_layout.setContentsMargins(0, 0, 0, 0)
+
+        repeat_icon = QLabel("🔁")  # Repeat icon
+        repeat_icon.setObjectName("inputIcon")
+        repeat_layout.addWidget(repeat_icon)
+
+        self.repeat_entry = QLineEdit()
+        self.repeat_entry.setPlaceholderText("Repeat: daily, mon wed")
+        self.repeat_entry.setMinimumHeight(40)
+        repeat_layout.addWidget(self.repeat_entry)
+
+        datetime_layout.addWidget(repeat_container)
+
         input_layout.addWidget(datetime_container)
 
+        # Live preview of the due time the date and time inputs describe
+        self.due_preview = QLabel()
+        self.due_preview.setObjectName("duePreview")
+        self.due_preview.setFont(QFont("Segoe UI", 10))
+        input_layout.addWidget(self.due_preview)
+        self.date_entry.textChanged.connect(self.update_due_preview)
+        self.time_entry.textChanged.connect(self.update_due_preview)
+        self.repeat_entry.textChanged.connect(self.update_due_preview)
+        self.update_due_preview()
+
+        # Feedback for an empty task: a short shake and a red outline, cleared by a timer
+        self.shake = QPropertyAnimation(self.task_entry, b"pos", self)
+        self.shake.setDuration(300)
+        self.shake.setEasingCurve(QEasingCurve.Type.OutQuad)
+        self.error_timer = QTimer(self)
+        self.error_timer.setSingleShot(True)
+        self.error_timer.setInterval(300)
+        self.error_timer.timeout.connect(lambda: self.set_error_state(self.task_entry, False))
+        self.task_entry.textEdited.connect(lambda: self.set_error_state(self.task_entry, False))
+
         # Add Task Button
         self.add_btn = QPushButton("Add Task")
-        self.add_btn.setStyleSheet(self.styles.button_style())
         self.add_btn.setMinimumHeight(45)
         self.add_btn.clicked.connect(self.add_task)
         input_layout.addWidget(self.add_btn)
 
-        main_layout.addWidget(input_widget)
-
-        # Store tasks
-        self.tasks = []
-        self.setAcceptDrops(True)
-
+        self.centralWidget().layout().addWidget(input_widget)
+
+    def load_tasks(self):
+        """Opens the task store and shows its tasks; returns False if the store cannot be read"""
+        store = self.store if self.store is not None else self.open_task_store()
+        if store is None:
+            return False
+        # Writes go to disk from a background thread, so editing never waits on the disk
+        self.store = write_behind(store, self)
+        self.task_model = TaskListModel(self.store, self)
+        self.tasks = self.task_model.tasks
+        self.search_model = TaskSearchModel(self.tasks, self)
+        self.bucket_model = TaskBucketModel(self.tasks, parent=self)
+        self.task_view.setModel(self.task_model)
+        self.search_entry.textChanged.connect(self.search_tasks)
+        self.view_tabs.currentChanged.connect(lambda index: self.show_view())
+        self.bucket_model.countsChanged.connect(self.update_view_tabs)
+
+        # Follow what other instances write to a shared store, from before the first page is read
+        self.watcher = None
+        if self.store.change_seq() is not None:
+            self.watcher = StoreWatcher(self.store, self)
+            self.watcher.changed.connect(self.merge_changes)
+
+        # Restore saved tasks, one page at a time, and file them all into their buckets
+        self.tasks.load()
+        self.bucket_model.reset_index()
+        self.show_view()
+
+        # Undo and redo, recorded from the task list's own change events
+        self.history = History(self.tasks)
+
+        if isinstance(self.store, WriteBehindStore):
+            self.store.failed.connect(lambda error: self.show_message(f"Could not save changes, retrying: {error}"))
+
+        # Make batched writes durable shortly after editing stops
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(1000)
+        self.sync_timer.timeout.connect(self.store.sync)
+        self.sync_timer.start()
+
+        # Due-date reminders, loaded once the window is up
+        self.reminders = ReminderScheduler(parent=self)
+        self.reminders.tasksDue.connect(self.show_reminders)
+        self.tasks.subscribe(self.update_reminder)
+        QTimer.singleShot(0, self.start_reminders)
+
+        # Old completed tasks move to the archive a while after startup, then every hour
+        self.archive = None  # Opened on first use
+        self.archive_dialog = None
+        self.archived = 0  # Tasks moved by the archival in progress
+        self.archive_rows = None  # Rows of the batch being written to the archive
+        self.archive_pool = QThreadPool(self)
+        self.archive_pool.setMaxThreadCount(1)
+        self.archiveWritten.connect(self.finish_archiving)
+        self.archive_timer = QTimer(self)
+        self.archive_timer.setInterval(self.ARCHIVE_INTERVAL_MS)
+        self.archive_timer.timeout.connect(self.archive_old_tasks)
+        self.archive_timer.start()
+        QTimer.singleShot(self.ARCHIVE_DELAY_MS, self.archive_old_tasks)
+
+        # Sync across machines through a sync server, when one is configured
+        self.sync_agent = None
+        url = os.environ.get("JAX_TODO_SYNC_URL")
+        if url:
+            from sync import SyncClient
+
+            self.sync_agent = SyncAgent(SyncClient(self.tasks), url, self.history.paused, self)
+            self.sync_agent.synced.connect(self.finish_sync)
+            self.sync_agent.failed.connect(lambda error: log.warning("sync_failed error=%s", error))
+            self.sync_agent.start()
+        return True
+
+    def open_task_store(self):
+        """Opens the configured store, telling the user about damaged files; None if it cannot be read"""
+        try:
+            store = open_store()
+        except (OSError, ValueError, sqlite3.DatabaseError) as error:
+            log.error("store_open_failed error=%s", error)
+            QMessageBox.critical(self, "Task Scheduler", f"Your tasks could not be opened and were left as they are:\n{error}")
+            return None
+        recovered = getattr(store, "recovered", ())
+        if recovered:
+            self.show_message("Damaged task files were set aside as "
+                              + ", ".join(os.path.basename(path) for path in recovered) + "; the rest was loaded")
+        return store
+
+    @timed("add_task")
     def add_task(self):
         """Adds a new task with animation"""
         task_text = self.task_entry.text().strip()
@@ -324,224 +1413,556 @@ class TaskManager(QMainWindow):
         time_text = self.time_entry.text().strip()
 
         if not task_text:  # Prevent empty task addition
-            # Could add a subtle shake animation to the input field
-            self.task_entry.setStyleSheet(self.styles.input_error_style())
-            # Reset styling after brief period
-            QApplication.processEvents()
-            import time
-            time.sleep(0.3)
-            self.task_entry.setStyleSheet(self.styles.entry_style())
+            self.show_input_error(self.task_entry)
             return
 
-        due_datetime = self.get_due_datetime(date_text, time_text)
-
-        # Create new task
-        task = Task(
-            self.task_list_widget,
-            task_text,
-            due_datetime,
-            self.remove_task,
-            self.toggle_task
-        )
+        due = int(self.get_due_datetime(date_text, time_text).timestamp())
+        repeat = parse_rule(self.repeat_entry.text(), due)
+        if repeat is None:
+            self.show_input_error(self.repeat_entry)
+            return
 
-        # Insert at top of the list
-        self.task_list_layout.insertWidget(0, task)
-        self.tasks.append(task)
+        # Insert at top of the list; the entries are kept if no id could be claimed for it
+        try:
+            self.tasks.add(task_text, due, repeat)
+        except OSError as e:
+            self.show_message(f"Could not add the task: {e}")
+            return
 
-        # Clear inputs
+        # Clear inputs (the preview follows the cleared date and time)
         self.task_entry.clear()
         self.date_entry.clear()
         self.time_entry.clear()
+        self.repeat_entry.clear()
 
         self.task_entry.setFocus()  # Set focus back to task entry
 
+    def show_input_error(self, widget):
+        """Flags an input as invalid with a shake and an outline; timers undo both, nothing blocks"""
+        self.set_error_state(widget, True)
+        self.error_timer.start()
+        if self.shake.state() != QPropertyAnimation.State.Running:
+            origin = widget.pos()
+            self.shake.setStartValue(origin)
+            for step, dx in ((0.15, -6), (0.35, 6), (0.55, -4), (0.75, 3)):
+                self.shake.setKeyValueAt(step, origin + QPoint(dx, 0))
+            self.shake.setEndValue(origin)
+            self.shake.start()
+
+    def update_due_preview(self):
+        """Shows when a task added now would be due; runs on every keystroke"""
+        date_text = self.date_entry.text().strip()
+        time_text = self.time_entry.text().strip()
+        text = f"{date_text} {time_text}".strip()
+        due = parse_due_text(text)
+        understood = due is not None or not text
+        if due is None:
+            due = self.get_due_datetime(date_text, time_text)
+        message = f"Due: {due.strftime('%a %d %b %Y, %H:%M')}"
+        repeat_text = self.repeat_entry.text().strip()
+        repeat = parse_rule(repeat_text, int(due.timestamp()))
+        if repeat:
+            message += f"  ↻ {describe(repeat)}"
+        if not understood:
+            message += f"  (couldn't read “{text}”)"
+        elif repeat is None:
+            message += f"  (couldn't read “{repeat_text}”)"
+            understood = False
+        self.due_preview.setText(message)
+        if self.due_preview.property("error") != (not understood):
+            self.set_error_state(self.due_preview, not understood)
+
+    def set_error_state(self, widget, error):
+        """Flips a widget's "error" property and repolishes it against the compiled stylesheet"""
+        widget.setProperty("error", error)
+        widget.style().unpolish(widget)
+        widget.style().polish(widget)
+
+    def set_theme(self, theme):
+        """Switches every widget and painted row to another theme in one pass"""
+        self.styles = TaskStyles(theme)
+        QApplication.instance().setStyleSheet(self.styles.application_style())
+        self.task_delegate.set_styles(self.styles)
+        self.task_view.set_styles(self.styles)
+        self.task_view.viewport().update()
+
     def get_due_datetime(self, date_text, time_text):
         """Parses date and time, applies defaults if empty"""
-        now = datetime.now()
-
-        # Handle time input
-        if time_text and time_text.isdigit() and len(time_text) == 4:
-            try:
-                hours, minutes = int(time_text[:2]), int(time_text[2:])
-                if 0 <= hours < 24 and 0 <= minutes < 60:
-                    pass  # Valid time
-                else:
-                    hours, minutes = now.hour, now.minute
-            except ValueError:
-                hours, minutes = now.hour, now.minute
+        return TaskList.parse_due(date_text, time_text)
+
+    def search_tasks(self, text):
+        """Shows the tasks matching the search text, or the selected view when it is empty"""
+        self.search_model.set_query(text)
+        self.show_view()
+
+    def show_view(self):
+        """Shows the search results, the whole list or the selected time bucket"""
+        view = self.VIEWS[self.view_tabs.currentIndex()]
+        if self.search_model.query:
+            model = self.search_model
+        elif view == "all":
+            model = self.task_model
         else:
-            hours, minutes = now.hour, now.minute
+            model = self.bucket_model
+            if model.bucket != view:
+                model.set_bucket(view)
+        if self.task_view.model() is not model:
+            self.task_view.setModel(model)
+            self.task_view.setDragEnabled(model is self.task_model)
+
+    def update_view_tabs(self, counts):
+        """Shows the number of tasks in each time bucket on its tab"""
+        for index, view in enumerate(self.VIEWS):
+            if view in counts:
+                self.view_tabs.setTabText(index, f"{view.capitalize()} {counts[view]}")
+
+    def remove_task(self, row):
+        """Removes the task at the given row"""
+        model = self.task_view.model()
+        if 0 <= row < model.rowCount():
+            if model is not self.task_model:
+                self.tasks.remove_id(model.task(row).id)
+            else:
+                self.tasks.remove(row)
 
-        # Handle date input
-        if date_text and date_text.isdigit() and len(date_text) == 6:
-            try:
-                day, month, year = int(date_text[:2]), int(date_text[2:4]), int(date_text[4:])
-                year += 2000  # Convert YY to YYYY
-            except ValueError:
-                day, month, year = now.day, now.month, now.year
-        else:
-            day, month, year = now.day, now.month, now.year
+    def edit_task(self, row):
+        """Asks for a new text for the task at the given row"""
+        model = self.task_view.model()
+        if not 0 <= row < model.rowCount():
+            return
+        task = self.tasks.task(row) if model is self.task_model else model.task(row)
+        text, accepted = QInputDialog.getText(self, "Edit task", "Task:", QLineEdit.EchoMode.Normal, task.text)
+        text = text.strip()
+        if accepted and text and text != task.text:
+            if model is not self.task_model:
+                self.tasks.edit_id(task.id, text, task.due)
+            else:
+                self.tasks.edit(row, text, task.due)
 
-        try:
-            return datetime(year, month, day, hours, minutes)
-        except ValueError:
-            return now + timedelta(days=1)  # Default: Next day if invalid
-
-    def remove_task(self, task):
-        """Removes the task from the list"""
-        if task in self.tasks:
-            self.task_list_layout.removeWidget(task)
-            task.deleteLater()
-            self.tasks.remove(task)
-
-    def toggle_task(self, task):
+    def edit_repeat(self, row):
+        """Asks how the task at the given row repeats"""
+        model = self.task_view.model()
+        if not 0 <= row < model.rowCount():
+            self.show_message("Select a task to repeat first")
+            return
+        task = self.tasks.task(row) if model is self.task_model else model.task(row)
+        text, accepted = QInputDialog.getText(
+            self, "Repeat task", "Repeats (daily, mon wed, monthly, every 6h; empty for never):",
+            QLineEdit.EchoMode.Normal, describe(task.repeat))
+        if not accepted:
+            return
+        repeat = parse_rule(text, task.due)
+        if repeat is None:
+            self.show_message(f"Couldn't read “{text.strip()}” as a repeat")
+        elif repeat != task.repeat:
+            if model is not self.task_model:
+                self.tasks.edit_id(task.id, task.text, task.due, repeat)
+            else:
+                self.tasks.edit(row, task.text, task.due, repeat)
+
+    def clear_completed(self):
+        """Deletes every completed task as one undoable step"""
+        with self.history.group():
+            removed = self.tasks.remove_many(self.tasks.completed_ids())
+        self.update_task_order()
+        if removed:
+            self.show_message(f"Deleted {len(removed)} completed tasks (Ctrl+Z to undo)")
+
+    def undo(self):
+        """Reverts the last change to the tasks"""
+        if self.history.undo() is None:
+            self.show_message("Nothing to undo")
+        self.update_task_order()
+
+    def redo(self):
+        """Re-applies the last undone change"""
+        if self.history.redo() is None:
+            self.show_message("Nothing to redo")
+        self.update_task_order()
+
+    def update_reminder(self, event):
+        """Keeps a task's reminder in step with it, whatever created, changed or deleted it"""
+        kind, task = event.kind, event.task
+        if kind == "deleted" or kind == "updated" and task.completed:
+            self.reminders.cancel(task.id)
+        elif kind in ("created", "updated") and not task.completed:
+            self.reminders.schedule(task.id, task.due)
+
+    @timed("toggle_task")
+    def toggle_task(self, row):
         """Handle task toggle event"""
-        if task is None:
-            print("Error: Task is None!")
+        model = self.task_view.model()
+        if not 0 <= row < model.rowCount():
+            log.warning("toggle_task no_task row=%d rows=%d", row, model.rowCount())
             return  # Avoid further execution if the task is invalid
 
-        task.completed = not task.completed  # Toggle completion status
-
-        print(f"Task '{task}' toggled. Completed: {task.completed}")
+        # Toggle completion status and reposition
+        if model is not self.task_model:
+            task = self.tasks.toggle_id(model.task(row).id)
+        else:
+            task = self.tasks.toggle(row)
+
+        log.debug("task_toggled id=%d completed=%s repeat=%r due=%d", task.id, task.completed, task.repeat, task.due)
+        if task.repeat and not task.completed:
+            self.show_message(f"Done for now; next due {task.due_datetime.strftime('%a %d %b, %H:%M')}")
+
+        self.update_task_order()
+
+    def move_task(self, current_index, insert_index):
+        """Moves a dragged task to its drop position"""
+        self.tasks.move(current_index, insert_index)
+        self.update_task_order()
+
+    def move_tasks(self, rows, insert_index):
+        """Moves dragged selected tasks to their drop position"""
+        task_ids = [self.tasks.task(row).id for row in rows]
+        self.bulk_edit(lambda: self.tasks.move_many(task_ids, insert_index), "Moved {count} tasks")
+
+    # Bulk edits: one store transaction, one model update and one relayout each
+
+    def selected_ids(self):
+        """Ids of the selected tasks; after Select all, every task of the current view"""
+        if self.task_view.all_selected:
+            return self.task_view.model().all_ids()
+        return [index.data(TaskListModel.TaskRole).id for index in self.task_view.selectionModel().selectedRows()]
+
+    def select_all_tasks(self):
+        """Selects every task of the current view, fetched or not"""
+        self.task_view.setFocus()
+        self.task_view.selectAll()
+
+    @timed("bulk_edit")
+    def bulk_edit(self, edit, message):
+        """Runs an edit of many tasks as one undoable step, then shows `message` with the count"""
+        with self.history.group():
+            changed = edit()
+        self.update_task_order()
+        if changed:
+            self.show_message(message.format(count=len(changed)))
+
+    def complete_selected(self):
+        """Completes the selected tasks, or reopens them if they are all completed already"""
+        task_ids = self.selected_ids()
+        if not task_ids:
+            self.show_message("Select tasks first (Ctrl+A selects all)")
+            return
+        self.bulk_edit(lambda: self.tasks.complete_many(task_ids) or self.tasks.complete_many(task_ids, False),
+                       "Updated {count} tasks (Ctrl+Z to undo)")
+
+    def delete_selected(self):
+        """Deletes the selected tasks"""
+        task_ids = self.selected_ids()
+        if not task_ids:
+            self.show_message("Select tasks first (Ctrl+A selects all)")
+            return
+        self.bulk_edit(lambda: self.tasks.remove_many(task_ids), "Deleted {count} tasks (Ctrl+Z to undo)")
 
-        if task in self.tasks:
-            self.tasks.remove(task)
-            if task.completed:
-                self.tasks.append(task)  # Move to end if completed
-            else:
-                self.tasks.insert(0, task)  # Move to beginning if active
-            self.update_task_order()
+    def reschedule_selected(self):
+        """Asks for a new due time for the selected tasks"""
+        task_ids = self.selected_ids()
+        if not task_ids:
+            self.show_message("Select tasks first (Ctrl+A selects all)")
+            return
+        text, accepted = QInputDialog.getText(
+            self, "Reschedule tasks", f"Due time for {len(task_ids)} tasks (tomorrow 9am, fri, +3d):")
+        if not accepted:
+            return
+        due = parse_due_text(text)
+        if due is None:
+            self.show_message(f"Couldn't read “{text.strip()}” as a due time")
+            return
+        self.bulk_edit(lambda: self.tasks.reschedule_many(task_ids, int(due.timestamp())),
+                       f"Rescheduled {{count}} tasks to {due.strftime('%a %d %b, %H:%M')}")
+
+    def move_selected(self, row):
+        """Moves the selected tasks above a row of the whole list, 0 for the top of their section"""
+        task_ids = self.selected_ids()
+        if not task_ids:
+            self.show_message("Select tasks first (Ctrl+A selects all)")
+            return
+        self.bulk_edit(lambda: self.tasks.move_many(task_ids, row), "Moved {count} tasks")
 
+    @timed("update_task_order")
     def update_task_order(self):
-        """Updates the order of tasks in the UI"""
-        # Remove all tasks safely
-        for task in self.tasks:
-            if task is not None and task in self.task_list_layout.children():
-                self.task_list_layout.removeWidget(task)
-                task.setParent(None)  # Detach widget safely
-
-        # Re-add them in the correct order
-        for i, task in enumerate(self.tasks):
-            if task is not None:
-                self.task_list_layout.insertWidget(i, task)
-
-    def dragEnterEvent(self, event):
-        """Handle when drag enters the main window"""
-        if event.mimeData().hasText():
-            event.acceptProposedAction()
-            # Highlight potential drop area
-            self.highlight_drop_zone(event.position().y())
-
-    def dragMoveEvent(self, event):
-        """Handle drag movement over the window"""
-        if event.mimeData().hasText():
-            event.acceptProposedAction()
-            # Update highlighted drop area
-            self.highlight_drop_zone(event.position().y())
-
-    def dragLeaveEvent(self, event):
-        """Handle when drag leaves the window"""
-        # Remove any drop zone highlighting
-        self.clear_drop_highlighting()
-
-    def highlight_drop_zone(self, y_position):
-        """Highlights the potential drop zone"""
-        source_task = None
-        target_index = -1
-
-        # Find the dragged task
-        for task in self.tasks:
-            if task.property("dragging"):
-                source_task = task
-                break
-
-        # Determine where it would be dropped
-        for i, task in enumerate(self.tasks):
-            if task == source_task:
-                continue
-
-            task_y = task.y()
-            task_height = task.height()
-
-            # Clear previous styling
-            task.setProperty("dropBefore", False)
-            task.setProperty("dropAfter", False)
+        """Requests one relayout of the task list, coalesced with any others this event loop pass"""
+        self.task_view.request_layout()
+
+    def start_reminders(self):
+        """Arms reminders and reports tasks that came due while the app was closed"""
+        if self.closing:
+            return  # Closed right after starting up
+        missed = self.reminders.start(self.store)
+        if missed:
+            self.show_reminders(missed, while_closed=True)
+
+    def show_reminders(self, task_ids, while_closed=False):
+        """Shows one coalesced notification for tasks that came due"""
+        rows = self.store.get_many(task_ids)
+        if not rows:
+            return
+        if len(rows) == 1:
+            message = f"Due now: {rows[0][1]}"
+        else:
+            message = f"{len(rows)} tasks are due: " + ", ".join(row[1] for row in rows[:3])
+            if len(rows) > 3:
+                message += ", …"
+        if while_closed:
+            message += " (while the app was closed)"
+
+        self.show_message(message)
+        QApplication.alert(self)
+
+    def show_message(self, message):
+        """Shows a notice in the header banner for a while"""
+        self.reminder_label.setText(message)
+        self.reminder_label.show()
+        self.message_timer.start()
+
+    # Import and export
+
+    def import_tasks(self, path=None):
+        """Streams tasks in from a JSON Lines or CSV file without blocking the window"""
+        path = path or QFileDialog.getOpenFileName(self, "Import tasks", "",
+                                                   "Tasks (*.jsonl *.csv);;All files (*)")[0]
+        if path:
+            self.run_transfer(self.import_steps(path))
+
+    def export_tasks(self, path=None):
+        """Streams every task out to a JSON Lines or CSV file without blocking the window"""
+        path = path or QFileDialog.getSaveFileName(self, "Export tasks", "tasks.jsonl",
+                                                   "JSON Lines (*.jsonl);;CSV (*.csv)")[0]
+        if path:
+            self.run_transfer(self.export_steps(path))
+
+    def import_steps(self, path):
+        """Imports a chunk per step, yielding (done, total) progress and returning a summary"""
+        from transfer import file_format, import_chunks
+
+        file_type = file_format(path)
+        total = os.path.getsize(path)
+        stats = {"skipped": 0}
+        imported = 0
+        with open(path, "rb") as f:
+            for chunk in import_chunks(f, file_type, stats, self.IMPORT_CHUNK):
+                with self.history.paused():  # Imports are not undone task by task
+                    self.tasks.add_many(chunk)
+                imported += len(chunk)
+                yield f.tell(), total
+        self.store.sync()
+        summary = f"Imported {imported} tasks"
+        if stats["skipped"]:
+            summary += f", skipped {stats['skipped']} rows without text"
+        return summary
+
+    def export_steps(self, path):
+        """Exports a thousand tasks per step, yielding (done, total) progress and returning a summary"""
+        from transfer import export_steps, file_format
+
+        exported = 0
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for _ in export_steps(self.store, f, file_format(path)):
+                exported += 1
+                if exported % 1000 == 0:
+                    yield exported, 0
+        return f"Exported {exported} tasks"
+
+    def run_transfer(self, steps):
+        """Runs an import or export a time slice per event loop pass, showing its progress"""
+        if self.transfer is not None:
+            self.show_message("An import or export is already running")
+            return
+        self.transfer = TransferJob(steps, self)
+        self.transfer.progress.connect(self.show_transfer_progress)
+        self.transfer.finished.connect(self.finish_transfer)
+        self.transfer_progress.setValue(0)
+        self.transfer_progress.show()
+        self.transfer.start()
+
+    def show_transfer_progress(self, done, total):
+        if total:
+            self.transfer_progress.setRange(0, 1000)
+            self.transfer_progress.setValue(int(1000 * done / total))
+        else:
+            self.transfer_progress.setRange(0, 0)  # Busy indicator: the total is unknown
+
+    def finish_transfer(self, message):
+        self.transfer = None
+        self.transfer_progress.hide()
+        self.update_task_order()
+        self.show_message(message)
+
+    # Archive
+
+    def open_archive(self):
+        if self.archive is None:
+            from archive import Archive
+
+            self.archive = Archive()
+        return self.archive
+
+    @timed("archive_old_tasks")
+    def archive_old_tasks(self):
+        """
+        Moves a batch of old completed tasks to the archive, and the next batch once it is
+        there, until none are left. The batch is compressed and synced to the archive on a
+        background thread, then deleted from the list. Archival is left out of the undo history.
+        """
+        from archive import Archive, archivable_rows, archive_age
+
+        age = archive_age()
+        if self.closing or not age or self.transfer is not None or self.archive_rows is not None:
+            return
+        rows = archivable_rows(self.tasks, self.open_archive(), int(time()) - age, self.ARCHIVE_BATCH)
+        if not rows:
+            if self.archived:
+                log.info("archived count=%d", self.archived)
+                self.archived = 0
+            return
+        self.archive_rows = rows
+        archive = Archive(self.archive.directory)  # The background thread's own reader of the index
+        self.archive_pool.start(lambda: self.write_archive(archive, rows))
 
-            # If cursor is above the middle of this task
-            if y_position < task_y + (task_height / 2):
-                task.setProperty("dropBefore", True)
-                task.setStyleSheet(task.styleSheet())  # Force style update
-                target_index = i
-                break
-            # If this is the last task and cursor is below it
-            elif i == len(self.tasks) - 1:
-                task.setProperty("dropAfter", True)
-                task.setStyleSheet(task.styleSheet())  # Force style update
-                target_index = i + 1
-
-        # Apply visual styling to all tasks based on properties
-        for task in self.tasks:
-            if task.property("dropBefore"):
-                # Add top border or background highlight
-                task.setStyleSheet(task.styleSheet() + "border-top: 2px solid #ff9100;")
-            elif task.property("dropAfter"):
-                # Add bottom border or background highlight
-                task.setStyleSheet(task.styleSheet() + "border-bottom: 2px solid #ff9100;")
+    def write_archive(self, archive, rows):
+        """Runs on the archive thread"""
+        try:
+            archive.append(rows)
+            error = None
+        except OSError as e:
+            error = str(e) or type(e).__name__
+        try:
+            self.archiveWritten.emit(error)
+        except RuntimeError:
+            pass  # The window was deleted at exit
+
+    def finish_archiving(self, error):
+        """Deletes the batch just archived from the list, and starts on the next one"""
+        from archive import remove_archived
+
+        rows, self.archive_rows = self.archive_rows, None
+        if rows is None or self.closing:
+            return  # Left in the list: archiving them again skips the copies already there
+        if error is not None:
+            log.warning("archive_failed error=%s", error)
+            self.show_message(f"Could not archive old tasks: {error}")
+            return
+        with self.unsynced():
+            self.archived += remove_archived(self.tasks, self.open_archive(), rows)
+        self.update_task_order()
+        QTimer.singleShot(0, self.archive_old_tasks)
+
+    def browse_archive(self):
+        """Opens the archive browser, reading archived tasks only as they are scrolled to"""
+        if self.archive_dialog is None:
+            self.archive_dialog = ArchiveDialog(self.open_archive(), self)
+            self.archive_dialog.restoreRequested.connect(self.restore_archived)
+        else:
+            self.archive_dialog.model.set_query(self.archive_dialog.search_entry.text())
+        self.archive_dialog.show()
+        self.archive_dialog.raise_()
+
+    def restore_archived(self, task_ids):
+        """Puts archived tasks back into the list, where they were"""
+        from archive import restore_archived
+
+        with self.unsynced():
+            restored = restore_archived(self.tasks, self.open_archive(), task_ids)
+        self.update_task_order()
+        self.show_message(f"Restored {len(restored)} tasks from the archive")
+
+    # Sync
+
+    def unsynced(self):
+        """
+        Context leaving the edits inside it out of the undo history and of what is synced:
+        local housekeeping, and changes that came from elsewhere
+        """
+        stack = ExitStack()
+        stack.enter_context(self.history.paused())
+        if self.sync_agent is not None:
+            stack.enter_context(self.sync_agent.client.paused())
+        return stack
+
+    def finish_sync(self, result):
+        if result["received"]:
+            self.update_task_order()
 
-    def clear_drop_highlighting(self):
-        """Clears all drop zone highlighting"""
-        for task in self.tasks:
-            task.setProperty("dropBefore", False)
-            task.setProperty("dropAfter", False)
-            # Reset to normal styling based on completion status
-            if task.completed:
-                task.setStyleSheet(self.styles.task_completed_style())
+    def merge_changes(self, task_ids):
+        """Shows tasks another instance changed, leaving them out of this window's undo history"""
+        with self.unsynced():
+            if task_ids is None:
+                self.tasks.load()
+                self.search_model.reset_index()
+                self.bucket_model.reset_index()
+                self.reminders.start(self.store)
             else:
-                task.setStyleSheet(self.styles.task_normal_style())
-
-    def dropEvent(self, event):
-        """Handle drop events to reorder tasks"""
-        if event.mimeData().hasText() and event.source() in self.tasks:
-            source_task = event.source()
-            drop_y = event.position().y()
+                self.tasks.merge(task_ids)
 
-            # Determine insertion index based on drop position
-            insert_index = 0
-            for i, task in enumerate(self.tasks):
-                if task == source_task:
-                    continue
-
-                task_y = task.y() + task.height() / 2
-                if drop_y > task_y:
-                    insert_index = i + 1
-
-            # Only reorder if the position changed
-            current_index = self.tasks.index(source_task)
-            if current_index != insert_index and current_index + 1 != insert_index:
-                # Remove from current position
-                self.tasks.remove(source_task)
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.ActivationChange:
+            if self.isActiveWindow():
+                self.stall_detector.start()
+            else:
+                self.stall_detector.stop()
+        super().changeEvent(event)
+
+    def closeEvent(self, event):
+        """Closes the task store with the window, writing out every pending change first"""
+        self.stall_detector.stop()
+        self.closing = True
+        if not self.ready:
+            super().closeEvent(event)  # Closed before the store was opened
+            return
+        self.reminders.stop()
+        self.sync_timer.stop()
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.sync_agent is not None:
+            self.sync_agent.stop()
+        self.archive_pool.waitForDone()
+        self.store.close()
+        super().closeEvent(event)
 
-                # Insert at new position
-                if current_index < insert_index:
-                    insert_index -= 1  # Adjust index after removal
 
-                self.tasks.insert(insert_index, source_task)
-                self.update_task_order()
+def report_startup(marks):
+    """Prints the startup milestones, in ms since app.py started loading, as JSON"""
+    import json
 
-            # Clear any highlighting
-            self.clear_drop_highlighting()
-            event.acceptProposedAction()
+    print(json.dumps({name: round((mark - STARTED) * 1000, 1) for name, mark in marks.items()}))
 
 
 def main():
-    app = QApplication(sys.argv)
-
-    # Try to load the preferred fonts if available
-    QFontDatabase.addApplicationFont("SegoeUI.ttf")  # Load Segoe UI if available
-
-    window = TaskManager()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Task Scheduler")
+    parser.add_argument("--profile", metavar="PATH", default=os.environ.get("JAX_TODO_PROFILE"),
+                        help="record the session: a Chrome trace if PATH ends in .json, else a cProfile file")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="print the import time, time to first frame and time until the tasks are "
+                             "shown, then quit")
+    args, qt_args = parser.parse_known_args()
+    logging.basicConfig(level=os.environ.get("JAX_TODO_LOG", "WARNING").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    session = Session(args.profile) if args.profile else None
+    if session is not None:
+        session.start()
+    app = QApplication(sys.argv[:1] + qt_args)
+
+    # The frame shows first; fonts, the input panel and the tasks follow its first paint
+    window = TaskManager(deferred=True)
+    if args.measure_startup:
+        marks = {"imports_ms": IMPORTED}
+        window.firstPainted.connect(lambda: marks.setdefault("first_frame_ms", perf_counter()))
+        window.startupFinished.connect(lambda: marks.setdefault("ready_ms", perf_counter()))
+        window.startupFinished.connect(window.close, Qt.ConnectionType.QueuedConnection)
     window.show()
-    sys.exit(app.exec())
+    status = app.exec()
+    if args.measure_startup:
+        report_startup(marks)
+    recorder.log_summary()
+    if session is not None:
+        session.stop()
+    sys.exit(status)
 
 
 if __name__ == "__main__":
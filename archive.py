@@ -0,0 +1,307 @@
+"""
+Cold storage for old completed tasks.
+
+Completed tasks due more than JAX_TODO_ARCHIVE_DAYS days ago (30 by default, 0 for never)
+are moved out of the task store into append-only archive segments, so the store, the
+loaded list and startup grow with the active tasks rather than with the whole history.
+The stores keep no completion time, so a completed task's age is taken from its due time.
+
+A segment is a run of zlib-compressed blocks of up to BLOCK tasks; it is only ever
+appended to, and a new one is started once it passes SEGMENT_BYTES. A small binary index
+holds one entry per block with its id and due ranges, so looking tasks up decompresses
+only the blocks that may hold them, and browsing decompresses a block at a time, most
+recently archived first. Nothing is read until the archive is first used. Tasks restored
+to the list are recorded in a tombstone file instead of rewriting their segments; they
+stay in the list for another JAX_TODO_ARCHIVE_DAYS from their restore, and are archived
+again after that if they are still completed and old.
+Qt-free, like core.
+
+    python archive.py run
+    python archive.py list [QUERY]
+    python archive.py restore ID...
+"""
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+from store import data_dir
+
+DAY = 86400
+
+
+def archive_age():
+    """Seconds past their due time after which completed tasks are archived, or 0 for never"""
+    return int(float(os.environ.get("JAX_TODO_ARCHIVE_DAYS", "30")) * DAY)
+
+
+class Archive:
+    """Append-only archive segments of (id, text, due, completed, order_key, repeat) rows"""
+
+    BLOCK = 256  # Tasks per compressed block
+    SEGMENT_BYTES = 4 * 1024 * 1024  # Size past which a new segment is started
+    ENTRY = struct.Struct("<IQIIqqqq")  # segment, offset, length, count, min id, max id, min due, max due
+    TOMBSTONE = struct.Struct("<qQq")  # id, number of index entries when it was restored, restore time
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(data_dir(), "archive")
+        self.index_path = os.path.join(self.directory, "index")
+        self.restored_path = os.path.join(self.directory, "tombstones")
+        self.entries = []  # Index entries read so far, oldest block first
+        self.index_size = 0  # Bytes of the index read into entries
+        self.restored = {}  # id -> (index entries its dead archived copies predate, latest restore time)
+        self.restored_size = 0
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment-{segment:06d}.z")
+
+    # Reading
+
+    def _refresh(self):
+        """Reads index entries and tombstones appended since the last call, by any instance"""
+        self.entries += self._read_tail(self.index_path, self.ENTRY, "index_size")
+        for task_id, position, restored_at in self._read_tail(self.restored_path, self.TOMBSTONE, "restored_size"):
+            self.restored[task_id] = max((position, restored_at), self.restored.get(task_id, (0, 0)))
+
+    def _read_tail(self, path, record, attribute):
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return []
+        start = getattr(self, attribute)
+        size -= (size - start) % record.size  # A record still being written is read next time
+        if size <= start:
+            return []
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(size - start)
+        setattr(self, attribute, size)
+        return list(record.iter_unpack(data))
+
+    def __len__(self):
+        """Number of archived copies not restored; a task two instances archived at once counts twice"""
+        self._refresh()
+        return max(0, sum(entry[3] for entry in self.entries) - self.restored_size // self.TOMBSTONE.size)
+
+    def _block(self, entry):
+        segment, offset, length = entry[:3]
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(zlib.decompress(f.read(length)))
+
+    def restored_since(self, since):
+        """Ids of the tasks restored from the archive after the epoch time `since`"""
+        self._refresh()
+        return {task_id for task_id, (_, restored_at) in self.restored.items() if restored_at > since}
+
+    def _live(self, task_id, position):
+        return position >= self.restored.get(task_id, (0, 0))[0]
+
+    def blocks(self, query=""):
+        """
+        Yields the archived rows of one block at a time, most recently archived first, as a
+        list that may be empty, so a caller can stop between blocks. With a query, only rows
+        whose text contains every word of it, ignoring case. Of a task archived more than
+        once, only the latest copy is yielded.
+        """
+        self._refresh()
+        words = query.lower().split()
+        seen = set()
+        for position in range(len(self.entries) - 1, -1, -1):
+            rows = []
+            for row in reversed(self._block(self.entries[position])):
+                task_id = row[0]
+                if task_id not in seen and self._live(task_id, position):
+                    seen.add(task_id)
+                    if all(word in row[1].lower() for word in words):
+                        rows.append(tuple(row))
+            yield rows
+
+    def rows(self):
+        """Yields archived rows lazily, most recently archived first, reading one block at a time"""
+        for rows in self.blocks():
+            yield from rows
+
+    def search(self, query):
+        """Yields archived rows whose text contains every word of a query, ignoring case"""
+        for rows in self.blocks(query):
+            yield from rows
+
+    def get_many(self, task_ids):
+        """Latest archived rows of the given tasks, reading only blocks whose id range holds one"""
+        self._refresh()
+        wanted = set(task_ids)
+        found = {}
+        for position in range(len(self.entries) - 1, -1, -1):
+            if len(found) == len(wanted):
+                break
+            entry = self.entries[position]
+            low, high = entry[4], entry[5]
+            if not any(low <= task_id <= high and task_id not in found for task_id in wanted):
+                continue
+            for row in self._block(entry):
+                task_id = row[0]
+                if task_id in wanted and task_id not in found and self._live(task_id, position):
+                    found[task_id] = tuple(row)
+        return list(found.values())
+
+    # Writing
+
+    def _append(self, path, data):
+        """
+        Appends bytes in one write and returns the offset they landed at. O_APPEND makes the
+        write land at the end even while another instance appends too.
+        """
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+            return os.lseek(fd, 0, os.SEEK_CUR) - len(data)
+        finally:
+            os.close(fd)
+
+    def _current_segment(self):
+        segment = self.entries[-1][0] if self.entries else 1
+        try:
+            if os.path.getsize(self._segment_path(segment)) >= self.SEGMENT_BYTES:
+                segment += 1
+        except FileNotFoundError:
+            pass
+        return segment
+
+    def append(self, rows):
+        """
+        Archives (id, text, due, completed, order_key, repeat) rows, durably: blocks are written
+        and synced before the index entries pointing at them, so a crash leaves at worst an
+        unindexed block, never an entry without its data. Rows whose live archived copy is the
+        same, left in the store by a crash before their delete was written, are skipped.
+        """
+        archived = {row[0]: row for row in self.get_many([row[0] for row in rows])}
+        rows = sorted(row for row in rows if archived.get(row[0]) != tuple(row))  # By id, for narrow id ranges
+        if not rows:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        blocks = [rows[start:start + self.BLOCK] for start in range(0, len(rows), self.BLOCK)]
+        payloads = [zlib.compress(json.dumps(block, separators=(",", ":")).encode("utf-8"), 6)
+                    for block in blocks]
+        # One write and one sync for the whole batch; the segment may overrun by a batch
+        segment = self._current_segment()
+        offset = self._append(self._segment_path(segment), b"".join(payloads))
+        entries = []
+        for block, payload in zip(blocks, payloads):
+            ids = [row[0] for row in block]
+            entries.append((segment, offset, len(payload), len(block), min(ids), max(ids), block[0][2], block[-1][2]))
+            offset += len(payload)
+        self._append(self.index_path, b"".join(self.ENTRY.pack(*entry) for entry in entries))
+        self._refresh()
+
+    def discard(self, task_ids, now=None):
+        """Marks the archived copies of tasks as gone, once they are back in the task store"""
+        self._refresh()
+        position = len(self.entries)
+        now = int(time.time() if now is None else now)
+        self._append(self.restored_path,
+                     b"".join(self.TOMBSTONE.pack(task_id, position, now) for task_id in task_ids))
+        self._refresh()
+
+    def disk_usage(self):
+        """Bytes of the segments, the index and the tombstones on disk"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in names)
+
+
+def archivable_rows(tasks, archive, cutoff, limit=5000):
+    """
+    Rows of up to `limit` completed tasks of a TaskList due before `cutoff`, to be archived.
+    Tasks restored from the archive since `cutoff` are held back.
+    """
+    held = archive.restored_since(cutoff)
+    ids = [task_id for task_id, _ in tasks.store.completed_tasks(cutoff - 1, limit + len(held))
+           if task_id not in held][:limit]
+    return tasks.store.get_many(ids) if ids else []
+
+
+def remove_archived(tasks, archive, rows):
+    """
+    Deletes tasks from a TaskList as one batch once their rows are in the archive. Tasks
+    changed or deleted since the rows were read stay as they are, and their archived copies
+    are marked gone. Returns how many were deleted.
+    """
+    current = set(tasks.store.get_many([row[0] for row in rows]))
+    moved = [row[0] for row in rows if tuple(row) in current]
+    changed = [row[0] for row in rows if tuple(row) not in current]
+    if moved:
+        tasks.remove_many(moved)
+    if changed:
+        archive.discard(changed)
+    return len(moved)
+
+
+def archive_completed(tasks, archive, cutoff, limit=5000):
+    """
+    Moves up to `limit` completed tasks due before `cutoff` from a TaskList into an archive:
+    synced to the archive first, then deleted from the list as one batch. Returns how many
+    were moved.
+    """
+    rows = archivable_rows(tasks, archive, cutoff, limit)
+    if not rows:
+        return 0
+    archive.append(rows)
+    return remove_archived(tasks, archive, rows)
+
+
+def restore_archived(tasks, archive, task_ids):
+    """Moves archived tasks back into a TaskList, where they were; returns their records"""
+    rows = archive.get_many(task_ids)
+    if not rows:
+        return []
+    restored = tasks.restore_many(rows)  # Ids are never handed out again, so they are free
+    archive.discard([row[0] for row in rows])
+    return restored
+
+
+def main(argv=None):
+    """Command line archival, browsing and restoring against the configured store, without the UI"""
+    import argparse
+    from datetime import datetime
+
+    from core import TaskList
+    from store import open_store
+
+    parser = argparse.ArgumentParser(description="Archive old completed tasks, list or restore them.")
+    parser.add_argument("command", choices=("run", "list", "restore"))
+    parser.add_argument("args", nargs="*", help="a search query for list, task ids for restore")
+    args = parser.parse_args(argv)
+
+    archive = Archive()
+    if args.command == "list":
+        for row in archive.search(" ".join(args.args)):
+            print(f"{row[0]}\t{datetime.fromtimestamp(row[2]).strftime('%Y-%m-%d %H:%M')}\t{row[1]}")
+        return
+    store = open_store()
+    try:
+        tasks = TaskList(store)
+        tasks.load()
+        if args.command == "run":
+            age = archive_age()
+            moved = 0
+            while age:
+                count = archive_completed(tasks, archive, int(time.time()) - age)
+                if not count:
+                    break
+                moved += count
+            print(f"Archived {moved} tasks, {len(archive)} in the archive", file=sys.stderr)
+        else:
+            restored = restore_archived(tasks, archive, [int(task_id) for task_id in args.args])
+            print(f"Restored {len(restored)} tasks", file=sys.stderr)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
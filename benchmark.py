@@ -0,0 +1,455 @@
+"""
+Benchmark suite for the task list core and UI.
+
+Runs headless on the offscreen platform and drives TaskManager directly, each list size
+in a fresh data directory. Results are written as JSON and can be checked against a
+stored baseline:
+
+    python benchmark.py --sizes 1000,10000 --output results.json
+    python benchmark.py --baseline baseline.json --threshold 0.15
+
+Metric names end in their unit: "_ms", "_kb" and "_bytes" are better lower, "_per_s" better
+higher.
+The exit status is 1 when any metric regressed past the threshold.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QT_VERSION_STR, QMimeData, QPointF, QRect, Qt
+from PyQt6.QtGui import QColor, QDropEvent, QPainter, QPixmap
+from PyQt6.QtWidgets import (QApplication, QFrame, QGraphicsDropShadowEffect, QLabel, QVBoxLayout,
+                             QWidget)
+
+
+def timed(function, repeats):
+    """Median wall time of `function` in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None where it cannot be read"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+@contextlib.contextmanager
+def data_home():
+    """Points the app at a fresh, empty data directory"""
+    previous = os.environ.get("JAX_TODO_HOME")
+    with tempfile.TemporaryDirectory(prefix="jax_todo_bench_") as path:
+        os.environ["JAX_TODO_HOME"] = path
+        try:
+            yield path
+        finally:
+            if previous is None:
+                del os.environ["JAX_TODO_HOME"]
+            else:
+                os.environ["JAX_TODO_HOME"] = previous
+
+
+class ViewDropEvent(QDropEvent):
+    """Drop event that reports the task view itself as its drag source, as a real drag would"""
+
+    def __init__(self, view, y, mime_data):
+        super().__init__(QPointF(10, y), Qt.DropAction.MoveAction, mime_data,
+                         Qt.MouseButton.NoButton, Qt.KeyboardModifier.NoModifier)
+        self.view = view
+
+    def source(self):
+        return self.view
+
+
+# UI benchmarks
+
+def bench_window(size, repeats):
+    """
+    add_task, background writing, toggle_task, dropEvent, the drop zone sweep, search and
+    startup for one list size
+    """
+    from app import TaskManager
+
+    app = QApplication.instance()
+    results = {}
+    with data_home(), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        window = TaskManager()
+        window.show()
+        window.view_tabs.setCurrentIndex(0)  # The whole list, which rows are dragged within
+        app.processEvents()
+
+        # Adding: every task goes through the input fields like a user's would
+        entry = window.task_entry
+        start = time.perf_counter()
+        for i in range(size):
+            entry.setText(f"task {i}")
+            window.add_task()
+        app.processEvents()
+        results[f"add_task_{size}_ms"] = (time.perf_counter() - start) * 1000
+
+        # Writing the added tasks out in the background, measured until the last batch landed
+        start = time.perf_counter()
+        window.store.sync()
+        while getattr(window.store, "overlay", None):
+            app.processEvents()
+        results[f"write_behind_{size}_ms"] = (time.perf_counter() - start) * 1000
+
+        # Toggling, including the relayout scheduled by update_task_order
+        rows = iter(range(repeats * 2))
+
+        def toggle():
+            window.toggle_task(next(rows) % 10)
+            app.processEvents()
+        results[f"toggle_task_{size}_ms"] = timed(toggle, repeats)
+
+        # Dropping a dragged row onto another position in the visible part of the list
+        view = window.task_view
+        mime_data = QMimeData()
+        mime_data.setText("task")
+        height = view.viewport().height()
+        positions = iter(range(repeats * 2))
+
+        def drop():
+            step = next(positions)
+            view.drag_row = step % 5
+            view.dropEvent(ViewDropEvent(view, (step * 37) % height, mime_data))
+            view.drag_row = -1
+            app.processEvents()
+        results[f"drop_event_{size}_ms"] = timed(drop, repeats)
+
+        # Sweeping the drop zone over every pixel of the viewport, scrolled halfway down
+        scroll_bar = view.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum() // 2)
+        app.processEvents()
+
+        def sweep():
+            for y in range(height):
+                view.highlight_drop_zone(y)
+            view.clear_drop_highlighting()
+        results[f"highlight_sweep_{size}_ms"] = timed(sweep, repeats)
+
+        # Searching: the slowest keystroke while typing queries, once the index is built
+        start = time.perf_counter()
+        window.search_model.build_index(wait=True)
+        results[f"search_index_{size}_ms"] = (time.perf_counter() - start) * 1000
+        keystrokes = []
+        for query in ("task 12", "ask 3", "9"):
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                window.search_entry.setText(query[:end])
+                app.processEvents()
+                keystrokes.append((time.perf_counter() - start) * 1000)
+            window.search_entry.clear()
+        results[f"search_keystroke_{size}_ms"] = max(keystrokes)
+        window.close()
+
+        # Startup as main() runs it: construction to first paint, then until the list just
+        # written is loaded and shown
+        start = time.perf_counter()
+        window = TaskManager(deferred=True)
+        window.show()
+        while not window.painted:
+            app.processEvents()
+        results[f"startup_{size}_ms"] = (time.perf_counter() - start) * 1000
+        while not window.ready:
+            app.processEvents()
+        results[f"startup_ready_{size}_ms"] = (time.perf_counter() - start) * 1000
+        window.close()
+    return results
+
+
+def effect_rows(count):
+    """The old layout: one widget per task, each with its own QGraphicsDropShadowEffect"""
+    container = QWidget()
+    layout = QVBoxLayout(container)
+    layout.setSpacing(5)
+    rows = []
+    for i in range(count):
+        row = QFrame()
+        row.setFixedHeight(55)
+        row.setStyleSheet("QFrame { background-color: #252525; border-radius: 8px; }")
+        QVBoxLayout(row).addWidget(QLabel(f"task {i}"))
+        shadow = QGraphicsDropShadowEffect(row)
+        shadow.setBlurRadius(15)
+        shadow.setColor(QColor(0, 0, 0, 80))
+        shadow.setOffset(0, 1)
+        row.setGraphicsEffect(shadow)
+        layout.addWidget(row)
+        rows.append(row)
+    container.resize(460, count * 60)
+    return container, rows
+
+
+def bench_shadows(count, repeats):
+    """Full repaint and hover repaint: per-row effects against cached nine-slice shadows"""
+    from app import TaskDelegate
+    from shadows import ShadowCache
+    from style import TaskStyles
+
+    target = QPixmap(460, count * 60)
+    results = {}
+
+    # Per-row effects: hovering changes the blur radius, so the row is blurred again
+    container, rows = effect_rows(count)
+    container.show()
+    QApplication.processEvents()
+    results["effect_repaint_ms"] = timed(lambda: container.render(target), repeats)
+
+    def effect_hover():
+        effect = rows[0].graphicsEffect()
+        effect.setBlurRadius(20 if effect.blurRadius() == 15 else 15)
+        rows[0].render(target)
+    results["effect_hover_ms"] = timed(effect_hover, repeats)
+    container.close()
+
+    # Cached shadows: rows are painted by the delegate, hover only swaps the pixmap
+    delegate = TaskDelegate(TaskStyles())
+    shadows = ShadowCache()
+    height = delegate.ROW_HEIGHT
+
+    def paint_shadows(states):
+        painter = QPainter(target)
+        for i, state in enumerate(states):
+            shadows.paint(painter, delegate.frame_rect(QRect(0, i * height, 460, height)), state)
+        painter.end()
+
+    normal = ["normal"] * count
+    results["cached_repaint_ms"] = timed(lambda: paint_shadows(normal), repeats)
+    hovered = iter(("hover", "normal") * repeats)
+    results["cached_hover_ms"] = timed(lambda: paint_shadows([next(hovered)]), repeats)
+    return results
+
+
+# Core benchmarks
+
+def bench_core(count):
+    """Operations per second of the Qt-free task list over an in-memory store"""
+    from core import TaskList
+    from history import History
+    from store import MemoryStore
+
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    results = {}
+
+    start = time.perf_counter()
+    for i in range(count):
+        tasks.add(f"task {i}", 0)
+    results["core_add_per_s"] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(count):
+        tasks.toggle(i % 50)
+    results["core_toggle_per_s"] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(count):
+        tasks.move(i % 40, i * 7 % 40)
+    results["core_move_per_s"] = count / (time.perf_counter() - start)
+
+    # Undoing a bulk delete of every completed task, restored as one batch
+    history = History(tasks)
+    with history.group():
+        tasks.remove_many(tasks.completed_ids())
+    start = time.perf_counter()
+    history.undo()
+    results["core_undo_bulk_delete_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(count):
+        TaskList.parse_due("311226", "0930")
+    results["core_parse_due_per_s"] = count / (time.perf_counter() - start)
+    return results
+
+
+def bench_table(count, repeats):
+    """Memory and bulk query times of the columnar task table at `count` tasks"""
+    from rank import initial_keys
+    from table import TaskTable
+
+    table = TaskTable(ordered=False)
+    table.reserve(count + 1)
+    now = int(time.time())
+    for task_id, order_key in enumerate(initial_keys(count), 1):
+        # Due times spread over a month either side of now; every third task completed
+        table.insert(task_id, f"task {task_id}", now + (task_id * 7919) % 5_184_000 - 2_592_000,
+                     task_id % 3 == 0, order_key, "days:1" if task_id % 10 == 0 else "")
+    table.reindex()
+    results = {f"table_{count}_kb": table.memory_report()["total"] // 1024}
+    results["table_count_overdue_ms"] = timed(lambda: table.count_overdue(now), repeats)
+    results["table_completed_ids_ms"] = timed(table.completed_ids, repeats)
+    results["table_sort_by_due_ms"] = timed(table.ids_by_due, repeats)
+    return results
+
+
+def bench_archive(count, repeats):
+    """Moving `count` old completed tasks to the archive, and reading them back"""
+    from itertools import islice
+
+    from archive import Archive, archive_completed
+    from core import TaskList
+    from store import MemoryStore
+
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    now = int(time.time())
+    tasks.add_many([(f"task {i}", now - 86400 * (60 + i % 300), True, "") for i in range(count)])
+    with data_home() as path:
+        archive = Archive(os.path.join(path, "archive"))
+        start = time.perf_counter()
+        while archive_completed(tasks, archive, now):
+            pass
+        results = {"archive_tasks_per_s": count / (time.perf_counter() - start),
+                   f"archive_{count}_kb": archive.disk_usage() // 1024}
+        wanted = list(range(1, count + 1, max(1, count // 100)))
+        results["archive_lookup_100_ms"] = timed(lambda: Archive(archive.directory).get_many(wanted), repeats)
+        results["archive_first_page_ms"] = timed(lambda: list(islice(Archive(archive.directory).rows(), 100)),
+                                                 repeats)
+    return results
+
+
+def bench_sync(count, repeats):
+    """Syncing `count` tasks to a second device through a local sync server, then single edits"""
+    from core import TaskList
+    from store import MemoryStore
+    from sync import SyncClient, encode, post
+    from sync_server import serve
+
+    server = serve()
+    with data_home() as path:
+        devices = []
+        for name in ("a", "b"):
+            tasks = TaskList(MemoryStore())
+            tasks.load()
+            devices.append((tasks, SyncClient(tasks, os.path.join(path, f"sync-{name}.db"))))
+        (tasks, client), (_, other) = devices
+        now = int(time.time())
+        tasks.add_many([(f"task {i}", now + i * 60, i % 3 == 0, "") for i in range(count)])
+        sent = []
+
+        def sync(client):
+            while True:
+                request = client.request()
+                response = post(server.url, request)
+                sent.append((len(encode(request)), len(encode(response))))
+                if not client.apply(response)["more"]:
+                    return
+
+        start = time.perf_counter()
+        sync(client)
+        sync(other)
+        results = {"sync_tasks_per_s": count / (time.perf_counter() - start)}
+
+        def edit():
+            task = tasks.task(0)
+            tasks.edit_id(task.id, task.text + "!", task.due)
+            sync(client)
+
+        sent.clear()
+        results["sync_edit_round_ms"] = timed(edit, repeats)
+        results["sync_edit_request_bytes"] = max(size for size, _ in sent)
+        sent.clear()
+        sync(other)
+        results["sync_edit_pull_bytes"] = sent[0][1]
+        client.close()
+        other.close()
+    server.shutdown()
+    server.server_close()
+    return results
+
+
+# Baseline comparison
+
+def regressions(results, baseline, threshold):
+    """Yields (name, baseline, current, change) for metrics that got worse by more than `threshold`"""
+    for name, before in baseline.items():
+        after = results.get(name)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        if name.endswith("_per_s"):
+            change = -change
+        if change > threshold:
+            yield name, before, after, change
+
+
+def run(args):
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = {}
+    results.update(bench_core(args.operations))
+    results.update(bench_table(args.table_size, min(args.repeats, 5)))
+    results.update(bench_archive(args.archive_size, min(args.repeats, 5)))
+    results.update(bench_sync(args.sync_size, args.repeats))
+    results.update(bench_shadows(args.rows, args.repeats))
+    for size in args.sizes:
+        results.update(bench_window(size, args.repeats))
+    rss = peak_rss_kb()
+    if rss is not None:
+        results["peak_rss_kb"] = rss
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+            "storage": os.environ.get("JAX_TODO_STORAGE", "sqlite"),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        type=lambda text: [int(size) for size in text.split(",")],
+                        help="comma-separated task list sizes to drive TaskManager with")
+    parser.add_argument("--rows", type=int, default=200, help="rows painted by the shadow benchmark")
+    parser.add_argument("--repeats", type=int, default=20, help="samples per timed measurement")
+    parser.add_argument("--operations", type=int, default=20000, help="operations per core measurement")
+    parser.add_argument("--table-size", type=int, default=1_000_000, help="tasks in the task table benchmark")
+    parser.add_argument("--archive-size", type=int, default=100_000, help="tasks in the archive benchmark")
+    parser.add_argument("--sync-size", type=int, default=10_000, help="tasks in the sync benchmark")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown counted as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        failed = list(regressions(report["results"], baseline, args.threshold))
+        for name, before, after, change in failed:
+            print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ({change:+.1%})", file=sys.stderr)
+        if failed:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
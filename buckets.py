@@ -0,0 +1,159 @@
+"""
+Time buckets: Overdue, Today, Upcoming and Done.
+
+BucketIndex keeps the ids of active and of completed tasks in two DisplayOrders sorted by
+(due, id). The active buckets are not stored separately: they are the slices of the active
+order cut at two boundaries, now and the end of today, so a bucket's members and count are
+found by binary search, and the passing of time only moves the boundaries. An edit re-files
+one id, shifting only the ids of its block; bulk edits rebuild the orders in one pass.
+Qt-free, like core.
+"""
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+from operator import itemgetter
+
+from table import DisplayOrder
+
+BUCKETS = ("overdue", "today", "upcoming", "done")
+LAST = float("inf")  # Sorts after any task id sharing a due time
+
+
+def end_of_day(now):
+    """Epoch seconds of the midnight that ends the local day `now` falls in"""
+    tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+    return int(datetime.combine(tomorrow, time()).timestamp())
+
+
+class BucketIndex:
+    """
+    Tasks filed into time buckets by due time: overdue if due by now, today if due later
+    today, upcoming after that, done once completed. Overdue comes earliest due first,
+    done latest due first.
+    """
+
+    BATCH = 256  # Changes filed one by one; larger batches rebuild the orders
+
+    def __init__(self):
+        self.entries = {}  # id -> (due, completed)
+        self.active = DisplayOrder(self._sort_key)  # Ids of active tasks, by (due, id)
+        self.completed = DisplayOrder(self._sort_key)  # Ids of completed tasks, by (due, id)
+        self.now = 0
+        self.midnight = 0
+        self.cuts = None  # Positions of the two boundaries in the active order, until it or they change
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _sort_key(self, task_id):
+        return self.entries[task_id][0], task_id
+
+    def build(self, store, now):
+        """Files every task of a store at once, with the boundaries set for `now`"""
+        self.entries = {task_id: (due, bool(done)) for task_id, due, done in store.dues()}
+        self._rebuild()
+        self.advance(now)
+
+    def _rebuild(self):
+        active, completed = [], []
+        for task_id, (due, done) in self.entries.items():
+            (completed if done else active).append((due, task_id))
+        active.sort()
+        completed.sort()
+        self.active = DisplayOrder(self._sort_key, map(itemgetter(1), active))
+        self.completed = DisplayOrder(self._sort_key, map(itemgetter(1), completed))
+        self.cuts = None
+
+    # Boundaries
+
+    def advance(self, now):
+        """Moves the boundaries to `now`; returns whether any bucket gained or lost tasks"""
+        before = self._cuts()
+        self.now = int(now)
+        self.midnight = end_of_day(now)
+        self.cuts = None
+        return self._cuts() != before
+
+    def _cuts(self):
+        if self.cuts is None:
+            self.cuts = self.active.rank((self.now, LAST), bisect_right), self.active.rank((self.midnight,))
+        return self.cuts
+
+    def next_boundary(self):
+        """When the next task turns overdue or the day ends, whichever comes first"""
+        following = self.active.after((self.now, LAST), 1)
+        if following:
+            return min(self.entries[following[0]][0], self.midnight)
+        return self.midnight
+
+    # Filing
+
+    def add(self, task):
+        if task.id in self.entries:
+            self.remove(task.id)
+        self.entries[task.id] = (task.due, task.completed)
+        (self.completed if task.completed else self.active).insert(task.id)
+        self.cuts = None
+
+    def remove(self, task_id):
+        entry = self.entries.get(task_id)
+        if entry is None:
+            return
+        (self.completed if entry[1] else self.active).remove(task_id)  # Under the key it was filed with
+        del self.entries[task_id]
+        self.cuts = None
+
+    def update(self, task):
+        if self.entries.get(task.id) != (task.due, task.completed):
+            self.add(task)
+
+    def apply(self, changes):
+        """
+        Files a batch of changes, id -> task or None if deleted. A large batch, such as a bulk
+        delete, rebuilds the orders in one pass instead of re-filing task by task.
+        """
+        if len(changes) <= self.BATCH:
+            for task_id, task in changes.items():
+                if task is None:
+                    self.remove(task_id)
+                else:
+                    self.update(task)
+            return
+        entries = self.entries
+        for task_id, task in changes.items():
+            if task is None:
+                entries.pop(task_id, None)
+            else:
+                entries[task_id] = (task.due, task.completed)
+        self._rebuild()
+
+    # Reading
+
+    def _span(self, bucket):
+        """(order, first, end) of a bucket's slice"""
+        if bucket == "done":
+            return self.completed, 0, len(self.completed)
+        now_cut, midnight_cut = self._cuts()
+        if bucket == "overdue":
+            return self.active, 0, now_cut
+        if bucket == "today":
+            return self.active, now_cut, max(now_cut, midnight_cut)
+        return self.active, max(now_cut, midnight_cut), len(self.active)
+
+    def count(self, bucket):
+        _, first, end = self._span(bucket)
+        return end - first
+
+    def counts(self):
+        """Bucket name -> number of tasks in it"""
+        return {bucket: self.count(bucket) for bucket in BUCKETS}
+
+    def ids(self, bucket, start, limit):
+        """Ids of up to `limit` tasks of a bucket, from its `start`th on, in display order"""
+        order, first, end = self._span(bucket)
+        if bucket == "done":
+            # Latest due first: walk the slice backwards
+            high = max(first, end - start)
+            low = max(first, high - limit)
+            return order.slice(low, high)[::-1]
+        low = min(end, first + start)
+        return order.slice(low, min(end, low + limit))
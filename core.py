@@ -0,0 +1,833 @@
+"""
+Qt-free task domain: task records, the ordered task list and due-date parsing.
+
+Nothing here imports Qt, so the list logic can be driven, measured and stressed without a
+display. The Qt model subscribes to TaskList change events and forwards them to its views.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from dates import parse_due_text
+from rank import FIRST_KEY, key_between, keys_between
+from recurrence import next_due
+from store import Change
+
+
+class TaskRecord:
+    """Plain task data, as persisted"""
+
+    __slots__ = ("id", "text", "due", "completed", "order_key", "repeat")
+
+    def __init__(self, task_id, text, due, completed=False, order_key=FIRST_KEY, repeat=""):
+        self.id = task_id
+        self.text = text
+        self.due = due  # Epoch seconds; the current occurrence of a repeating task
+        self.completed = completed
+        self.order_key = order_key
+        self.repeat = repeat  # Recurrence rule, "" for none
+
+    @classmethod
+    def from_row(cls, row):
+        """Record of a stored (id, text, due, completed, order_key, repeat) row"""
+        task_id, text, due, completed, order_key, repeat = row
+        return cls(task_id, text, due, completed == 1, order_key, repeat)
+
+    @property
+    def due_datetime(self):
+        return datetime.fromtimestamp(self.due)
+
+    def sort_key(self):
+        """Display position as stored: (completed, order_key, id)"""
+        return (int(self.completed), self.order_key, self.id)
+
+
+class TaskEvent:
+    """
+    A change to a TaskList. Structural changes to the loaded rows are published twice, once
+    before the rows change ("inserting", "removing", "moving", "resetting") and once after
+    ("inserted", "removed", "moved", "reset"); "changed" is published after the fact only.
+    Changes to the tasks themselves, loaded or not, are published as "created", "deleted"
+    and "updated" events carrying the task; an "updating" event carries the task just before
+    it is changed, so listeners can see what an update replaced.
+    """
+
+    __slots__ = ("kind", "first", "last", "destination", "task")
+
+    def __init__(self, kind, first=-1, last=-1, destination=-1, task=None):
+        self.kind = kind
+        self.first = first
+        self.last = last
+        self.destination = destination  # Row the moved row is inserted before, counted before the move
+        self.task = task
+
+    def __repr__(self):
+        return f"TaskEvent({self.kind!r}, {self.first}, {self.last}, {self.destination}, {self.task!r})"
+
+
+class TaskList:
+    """
+    Ordered task list paging tasks in from a store.
+    Only task ids of the loaded rows stay resident; full records live in a bounded cache and
+    are re-read a page at a time when an evicted row is needed again. Every mutation writes
+    through to the store and is published to subscribers as TaskEvents.
+    """
+
+    PAGE_SIZE = 100
+    CACHE_SIZE = 2000
+
+    def __init__(self, store):
+        self.store = store
+        self.ids = []  # Ids of the loaded rows, in display order
+        self.cache = OrderedDict()  # id -> TaskRecord, least recently used first
+        self.active_rows = 0  # Loaded rows that are not completed; they always come first
+        self.cursor = None  # (completed, order_key, id) of the last row read from the store
+        self.exhausted = False
+        self.max_keys = {}  # completed -> at least the largest order key of that section
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Events
+
+    def subscribe(self, listener):
+        """Calls `listener(event)` for every change to the rows"""
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def _publish(self, kind, first=-1, last=-1, destination=-1, task=None):
+        if self.listeners:
+            event = TaskEvent(kind, first, last, destination, task)
+            for listener in self.listeners:
+                listener(event)
+
+    # Paging
+
+    def load(self):
+        """Resets the list to the first page of the store"""
+        self._publish("resetting")
+        self.ids = []
+        self.cache.clear()
+        self.active_rows = 0
+        self.cursor = None
+        self.exhausted = False
+        self.max_keys.clear()
+        self._append_page(self._read_page())
+        self._publish("reset")
+
+    def can_fetch_more(self):
+        return not self.exhausted
+
+    def fetch_more(self):
+        """Loads the next page of tasks below the loaded rows"""
+        if self.exhausted:
+            return
+        tasks = self._read_page()
+        if tasks:
+            first = len(self.ids)
+            self._publish("inserting", first, first + len(tasks) - 1)
+            self._append_page(tasks)
+            self._publish("inserted", first, first + len(tasks) - 1)
+
+    def _read_page(self):
+        tasks = [self._remember(TaskRecord.from_row(row)) for row in self.store.page(self.cursor, self.PAGE_SIZE)]
+        if len(tasks) < self.PAGE_SIZE:
+            self.exhausted = True
+        if tasks:
+            self.cursor = tasks[-1].sort_key()
+        return tasks
+
+    def _append_page(self, tasks):
+        self.ids += [task.id for task in tasks]
+        self.active_rows += sum(1 for task in tasks if not task.completed)
+
+    def _remember(self, task):
+        cache = self.cache
+        cache[task.id] = task
+        cache.move_to_end(task.id)
+        while len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
+        return task
+
+    def task(self, row):
+        """Task shown at a loaded row, re-reading its page if it was evicted"""
+        task_id = self.ids[row]
+        task = self.cache.get(task_id)
+        if task is not None:
+            self.cache.move_to_end(task_id)
+            return task
+        start = row - row % self.PAGE_SIZE
+        for stored in self.store.get_many(self.ids[start:start + self.PAGE_SIZE]):
+            self._remember(TaskRecord.from_row(stored))
+        task = self.cache.get(self.ids[row])
+        if task is None:
+            # Deleted by another instance and not merged yet: held by an empty placeholder in
+            # its section until merge() removes the row
+            completed = row >= self.active_rows
+            neighbour = self.cache.get(self.ids[row - 1]) if row else None
+            order_key = neighbour.order_key if neighbour is not None and neighbour.completed == completed else FIRST_KEY
+            task = self._remember(TaskRecord(self.ids[row], "", 0, completed, order_key))
+        return task
+
+    # Ordering
+
+    def active_count(self):
+        """Number of loaded active tasks; completed tasks always sort after them"""
+        return self.active_rows
+
+    def max_key(self, completed):
+        """
+        Largest order key of the active or completed section, as read from the store once and
+        then kept up to date. After deletions it may be a key no task has any more, which
+        still sorts after the section, as appending needs; so toggling never reads the store.
+        """
+        if completed not in self.max_keys:
+            self.max_keys[completed] = self.store.max_order_key(completed)
+        return self.max_keys[completed]
+
+    def _note_key(self, completed, order_key):
+        if completed in self.max_keys:
+            current = self.max_keys[completed]
+            if current is None or order_key > current:
+                self.max_keys[completed] = order_key
+
+    def order_key_at(self, row, completed):
+        """Order key of the task at a row if it is in the given section, else None"""
+        if 0 <= row < len(self.ids):
+            task = self.task(row)
+            return task.order_key if task.completed == completed else None
+        if row == len(self.ids) and not self.exhausted:
+            # Just past the loaded rows: peek at the next row in the store
+            rows = self.store.page(self.cursor, 1)
+            if rows and (rows[0][3] == 1) == completed:
+                return rows[0][4]
+        return None
+
+    def _place(self, row, task, first=False):
+        """
+        Inserts a task id at a row, or leaves it unloaded if it sorts after the loaded rows.
+        A task that sorts `first` in the whole list always goes in, even above no loaded rows.
+        """
+        if row >= len(self.ids) and not self.exhausted and not first:
+            self.cache.pop(task.id, None)
+            return False
+        self.ids.insert(row, task.id)
+        self._remember(task)
+        if not task.completed:
+            self.active_rows += 1
+        if row == len(self.ids) - 1:
+            self.cursor = task.sort_key()
+        return True
+
+    def _row_for(self, position):
+        """Loaded row a (completed, order_key, id) position sorts at, by binary search"""
+        low, high = 0, len(self.ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self.task(middle).sort_key() < position:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _insert_sorted(self, task):
+        """Shows a task at its sorted row, unless that lies beyond the loaded rows"""
+        row = self._row_for(task.sort_key())
+        if row < len(self.ids) or self.exhausted:
+            self._publish("inserting", row, row)
+            self._place(row, task)
+            self._publish("inserted", row, row)
+
+    def _take(self, row):
+        """Removes a row's id from the loaded rows and returns its task"""
+        task = self.task(row)
+        del self.ids[row]
+        if not task.completed:
+            self.active_rows -= 1
+        if row == len(self.ids):
+            self._rewind()
+        return task
+
+    def _rewind(self):
+        """After the last loaded row left, pages in again from the row above, so nothing below is skipped"""
+        if not self.exhausted:
+            self.cursor = self.task(len(self.ids) - 1).sort_key() if self.ids else None
+
+    # Mutations: each writes through to the store
+
+    def add(self, text, due, repeat=""):
+        """Creates a new active task at the top of the list, repeating by a recurrence rule if given"""
+        order_key = key_between(None, self.order_key_at(0, False))
+        task_id = self.store.add(text, due, False, order_key, repeat)
+        self._note_key(False, order_key)
+        task = TaskRecord(task_id, text, due, False, order_key, repeat)
+        self._publish("inserting", 0, 0)
+        self._place(0, task, first=True)
+        self._publish("inserted", 0, 0)
+        self._publish("created", task=task)
+        return task
+
+    def add_many(self, items):
+        """
+        Appends (text, due, completed, repeat) tasks at the end of their sections as one batch: one
+        store call, and at most one row insert per section. Rows past the loaded rows are
+        left for paging, so importing any number of tasks keeps the loaded rows bounded.
+        """
+        created = []
+        for completed in (False, True):
+            key = self.max_key(completed)
+            keyed = []
+            for text, due, done, repeat in items:
+                if done == completed:
+                    key = key_between(key, None)
+                    keyed.append((text, due, completed, key, repeat))
+            if not keyed:
+                continue
+            ids = self.store.add_many(keyed)
+            self._note_key(completed, key)
+            tasks = [TaskRecord(task_id, *fields) for task_id, fields in zip(ids, keyed)]
+            self._append_to_section(tasks, completed)
+            created += tasks
+        for task in created:
+            self._publish("created", task=task)
+        return created
+
+    def _append_to_section(self, tasks, completed):
+        """Places new tasks that sort last in their section"""
+        row = len(self.ids) if completed else self.active_rows
+        if row < len(self.ids) and len(self.ids) + len(tasks) > self.CACHE_SIZE:
+            # Too many to insert in between: unload the rows below instead, to be paged in again
+            last = len(self.ids) - 1
+            self._publish("removing", row, last)
+            self.cursor = self.task(row - 1).sort_key() if row else None
+            del self.ids[row:]
+            self.exhausted = False
+            self._publish("removed", row, last)
+        if row < len(self.ids):
+            # Loaded rows follow (completed tasks below new active ones): insert in between
+            self._publish("inserting", row, row + len(tasks) - 1)
+            self.ids[row:row] = [task.id for task in tasks]
+            self.active_rows += len(tasks)
+            self._publish("inserted", row, row + len(tasks) - 1)
+        elif self.exhausted:
+            # At the end of a fully loaded list: show what fits in the first page, page in the rest
+            shown = tasks[:max(0, self.PAGE_SIZE - row)]
+            if shown:
+                self._publish("inserting", row, row + len(shown) - 1)
+                self._append_page(shown)
+                for task in shown:
+                    self._remember(task)
+                self.cursor = shown[-1].sort_key()
+                self._publish("inserted", row, row + len(shown) - 1)
+            if len(shown) < len(tasks):
+                self.exhausted = False
+        # Otherwise the end of the section is not loaded yet and the tasks are paged in later
+
+    def remove(self, row):
+        """Deletes the task at a row"""
+        self._publish("removing", row, row)
+        task = self._take(row)
+        self.store.remove(task.id)
+        self._publish("removed", row, row)
+        self._publish("deleted", task=task)
+        return task
+
+    def remove_many(self, task_ids):
+        """
+        Deletes tasks by id, loaded or not, as one batch: one store transaction, and one
+        reset instead of a row removal each when many loaded rows go
+        """
+        tasks = [TaskRecord.from_row(row) for row in self.store.get_many(list(dict.fromkeys(task_ids)))]
+        if not tasks:
+            return []
+        gone = {task.id for task in tasks}
+        rows = [row for row, task_id in enumerate(self.ids) if task_id in gone]
+        if len(rows) > self.PAGE_SIZE:
+            loaded = {self.ids[row] for row in rows}
+            self._publish("resetting")
+            self.ids = [task_id for task_id in self.ids if task_id not in gone]
+            self.active_rows -= sum(1 for task in tasks if not task.completed and task.id in loaded)
+            self._rewind()
+            self._publish("reset")
+        else:
+            for row in reversed(rows):
+                self._publish("removing", row, row)
+                self._take(row)
+                self._publish("removed", row, row)
+        self.store.remove_many([task.id for task in tasks])
+        for task in tasks:
+            self.cache.pop(task.id, None)
+            self._publish("deleted", task=task)
+        return tasks
+
+    def restore_many(self, rows):
+        """
+        Re-creates deleted tasks from their (id, text, due, completed, order_key, repeat) rows, keeping
+        their ids and positions. Many tasks are stored in one transaction and shown by reloading
+        the list instead of inserting rows one by one.
+        """
+        self.store.restore_many(rows)
+        tasks = [TaskRecord.from_row(row) for row in rows]
+        for task in tasks:
+            self._note_key(task.completed, task.order_key)
+        if len(tasks) > self.PAGE_SIZE:
+            self.load()
+        else:
+            for task in tasks:
+                self._insert_sorted(task)
+        for task in tasks:
+            self._publish("created", task=task)
+        return tasks
+
+    def merge(self, task_ids):
+        """
+        Catches up with changes another instance made to the given tasks in the shared store:
+        re-reads just those tasks, takes their loaded rows out and inserts them again where
+        they now sort. The store row wins, so every instance ends up showing what was
+        committed last. Publishes "updated" and "deleted" task events, without "updating",
+        as the replaced state is not known for tasks that were not loaded. Many changes
+        reload the list instead.
+        """
+        task_ids = list(task_ids)
+        rows = {row[0]: row for row in self.store.get_many(task_ids)}
+        # Deleted tasks are announced as last seen here; only the id is known for others
+        gone = {task_id: self.cache.get(task_id) or TaskRecord(task_id, "", 0)
+                for task_id in task_ids if task_id not in rows}
+        tasks = [TaskRecord.from_row(row) for row in rows.values()]
+        for task in tasks:
+            self._note_key(task.completed, task.order_key)
+
+        if len(task_ids) > self.PAGE_SIZE:
+            for task_id in task_ids:
+                self.cache.pop(task_id, None)
+            self.load()
+        else:
+            # Cached records of the loaded rows may already be the re-read new state, so the
+            # rows are placed by their new keys among the rows that did not change
+            changed = set(task_ids)
+            for row in reversed([row for row, task_id in enumerate(self.ids) if task_id in changed]):
+                self._publish("removing", row, row)
+                del self.ids[row]
+                if row < self.active_rows:  # By position, as the record may be the new state
+                    self.active_rows -= 1
+                if row == len(self.ids):
+                    self._rewind()
+                self._publish("removed", row, row)
+            for task_id in task_ids:
+                self.cache.pop(task_id, None)
+            for task in sorted(tasks, key=TaskRecord.sort_key):
+                self._insert_sorted(task)
+
+        for task in tasks:
+            self._publish("updated", task=task)
+        for task in gone.values():
+            self._publish("deleted", task=task)
+
+    def completed_ids(self):
+        """Ids of every completed task, read from the store a page at a time"""
+        ids = []
+        after = (0, "~", 0)  # Sorts after every active task: rank keys are letters and digits
+        while True:
+            rows = self.store.page(after, self.CACHE_SIZE)
+            ids += [row[0] for row in rows]
+            if len(rows) < self.CACHE_SIZE:
+                return ids
+            after = (1, rows[-1][4], rows[-1][0])
+
+    def row_of(self, task_id):
+        """Loaded row of a task, or -1 if it is not loaded"""
+        try:
+            return self.ids.index(task_id)
+        except ValueError:
+            return -1
+
+    def _read_task(self, task_id):
+        rows = self.store.get_many([task_id])
+        if not rows:
+            raise KeyError(task_id)
+        return TaskRecord.from_row(rows[0])
+
+    def remove_id(self, task_id):
+        """Deletes a task by id, whether or not it is loaded"""
+        row = self.row_of(task_id)
+        if row >= 0:
+            return self.remove(row)
+        task = self._read_task(task_id)
+        self.cache.pop(task_id, None)
+        self.store.remove(task_id)
+        self._publish("deleted", task=task)
+        return task
+
+    def edit(self, row, text, due, repeat=None):
+        """Changes the text, due time and, unless `repeat` is None, the recurrence rule of the task at a row"""
+        task = self.task(row)
+        self._publish("updating", task=task)
+        task.text, task.due = text, due
+        if repeat is not None:
+            task.repeat = repeat
+        self.store.set_text(task.id, text, due, task.repeat)
+        self._publish("changed", row, row)
+        self._publish("updated", task=task)
+        return task
+
+    def edit_id(self, task_id, text, due, repeat=None):
+        """Like edit(), by id, whether or not the task is loaded"""
+        row = self.row_of(task_id)
+        if row >= 0:
+            return self.edit(row, text, due, repeat)
+        task = self._read_task(task_id)
+        self._publish("updating", task=task)
+        task.text, task.due = text, due
+        if repeat is not None:
+            task.repeat = repeat
+        self.store.set_text(task_id, text, due, task.repeat)
+        self._publish("updated", task=task)
+        return task
+
+    def set_state(self, task_id, text, due, completed, order_key, repeat):
+        """
+        Puts a task back into a recorded state, for undo and redo: its text, due time and
+        recurrence rule, and its position, which may lie anywhere in the list
+        """
+        row = self.row_of(task_id)
+        task = self.task(row) if row >= 0 else self._read_task(task_id)
+        self._publish("updating", task=task)
+        if (task.text, task.due, task.repeat) != (text, due, repeat):
+            task.text, task.due, task.repeat = text, due, repeat
+            self.store.set_text(task_id, text, due, repeat)
+        if (task.completed, task.order_key) != (completed, order_key):
+            if row >= 0:
+                self._publish("removing", row, row)
+                self._take(row)
+                self._publish("removed", row, row)
+            task.completed, task.order_key = completed, order_key
+            self.store.set_completed(task_id, completed, order_key)
+            self._note_key(completed, order_key)
+            self._insert_sorted(task)
+        elif row >= 0:
+            self._publish("changed", row, row)
+        self._publish("updated", task=task)
+        return task
+
+    # Reordering announces only the moved row
+
+    def _advance(self, task, row=-1):
+        """Completes the current occurrence of a repeating task: it stays active, due at the next one"""
+        self._publish("updating", task=task)
+        # Occurrences missed meanwhile are skipped rather than left overdue
+        task.due = next_due(task.repeat, task.due, max(task.due, int(time.time())))
+        self.store.set_text(task.id, task.text, task.due, task.repeat)
+        if row >= 0:
+            self._publish("changed", row, row)
+        self._publish("updated", task=task)
+        return task
+
+    def toggle(self, row):
+        """
+        Flips a task's completed flag, moving it to the top (active) or bottom (completed).
+        An active repeating task advances to its next occurrence instead.
+        """
+        task = self.task(row)
+        if task.repeat and not task.completed:
+            return self._advance(task, row)
+        self._publish("updating", task=task)
+        completed = not task.completed
+        if completed:
+            order_key = key_between(self.max_key(True), None)
+            dest = len(self.ids)  # Move to end if completed
+        else:
+            order_key = key_between(None, self.order_key_at(0, False))
+            dest = 0  # Move to beginning if active
+
+        if dest == len(self.ids) and not self.exhausted:
+            # The new position lies beyond the loaded rows; it is paged in again later
+            self._publish("removing", row, row)
+            self._take(row)
+            task.completed, task.order_key = completed, order_key
+            self.cache.pop(task.id, None)
+            self._publish("removed", row, row)
+        else:
+            moved = dest not in (row, row + 1)
+            if moved:
+                self._publish("moving", row, row, dest)
+            self._take(row)
+            task.completed, task.order_key = completed, order_key
+            new_row = dest if dest <= row else dest - 1
+            self._place(new_row, task)
+            if moved:
+                self._publish("moved", row, row, dest)
+            self._publish("changed", new_row, new_row)
+
+        self.store.set_completed(task.id, task.completed, task.order_key)
+        self._note_key(task.completed, task.order_key)
+        self._publish("updated", task=task)
+        return task
+
+    def toggle_id(self, task_id):
+        """Toggles a task by id; an unloaded task becomes loaded if it moves to the top"""
+        row = self.row_of(task_id)
+        if row >= 0:
+            return self.toggle(row)
+        # Not loaded, so the list is not exhausted and the completed section's end is unloaded too
+        task = self._read_task(task_id)
+        if task.repeat and not task.completed:
+            return self._advance(task)
+        self._publish("updating", task=task)
+        task.completed = not task.completed
+        if task.completed:
+            task.order_key = key_between(self.max_key(True), None)
+        else:
+            task.order_key = key_between(None, self.order_key_at(0, False))
+            self._publish("inserting", 0, 0)
+            self._place(0, task, first=True)
+            self._publish("inserted", 0, 0)
+        self.store.set_completed(task.id, task.completed, task.order_key)
+        self._note_key(task.completed, task.order_key)
+        self._publish("updated", task=task)
+        return task
+
+    def move(self, current_index, insert_index):
+        """
+        Moves a task to a new row (counted after its removal) within its section.
+        Returns whether the task moved.
+        """
+        task = self.task(current_index)
+
+        # Active and completed tasks stay in their own sections
+        other_active_rows = self.active_rows - (0 if task.completed else 1)
+        insert_index = min(insert_index, len(self.ids) - 1)
+        if task.completed:
+            insert_index = max(insert_index, other_active_rows)
+        else:
+            insert_index = min(insert_index, other_active_rows)
+        if insert_index == current_index:
+            return False
+
+        dest = insert_index if insert_index < current_index else insert_index + 1
+        self._publish("updating", task=task)
+        self._publish("moving", current_index, current_index, dest)
+        self._take(current_index)
+        before = self.order_key_at(insert_index - 1, task.completed)
+        after = self.order_key_at(insert_index, task.completed)
+        # Neighbours with equal keys, as instances adding at the same spot at once leave them,
+        # or changed elsewhere and not merged yet, have no key between them: the task takes
+        # the upper one's key and is shown where its id puts it
+        misplaced = before is not None and after is not None and before >= after
+        task.order_key = before if misplaced else key_between(before, after)
+        self.ids.insert(insert_index, task.id)
+        if not task.completed:
+            self.active_rows += 1
+        if insert_index == len(self.ids) - 1:
+            self.cursor = task.sort_key()
+        self._publish("moved", current_index, current_index, dest)
+        if misplaced:
+            self._publish("removing", insert_index, insert_index)
+            self._take(insert_index)
+            self._publish("removed", insert_index, insert_index)
+            self._insert_sorted(task)
+        self.store.set_order(task.id, task.order_key)
+        self._note_key(task.completed, task.order_key)
+        self._publish("updated", task=task)
+        return True
+
+    # Bulk edits: one store call for any number of tasks
+
+    def _records(self, task_ids):
+        """Current records of tasks by id, loaded or not, in display order; missing ids are skipped"""
+        task_ids = list(dict.fromkeys(task_ids))
+        rows = {task_id: row for row, task_id in enumerate(self.ids)}
+        tasks = [self.task(rows[task_id]) for task_id in task_ids if task_id in rows]
+        unloaded = [task_id for task_id in task_ids if task_id not in rows]
+        if unloaded:
+            tasks += [TaskRecord.from_row(row) for row in self.store.get_many(unloaded)]
+        return sorted(tasks, key=TaskRecord.sort_key)
+
+    def _update_many(self, changes):
+        """
+        Makes (task, Change) edits as one batch: one store call, and one reset instead of a
+        row move each when many tasks change position. Tasks that keep their position
+        are announced as a single "changed" range.
+        """
+        if not changes:
+            return []
+        rows = {task_id: row for row, task_id in enumerate(self.ids)}
+        moving = [task for task, change in changes
+                  if change.completed is not None and change.completed != task.completed
+                  or change.order_key is not None and change.order_key != task.order_key]
+        moved = {task.id for task in moving}
+        moved_rows = sorted(rows[task_id] for task_id in moved if task_id in rows)
+        reset = len(moving) > self.PAGE_SIZE
+        for task, _ in changes:
+            self._publish("updating", task=task)
+
+        if reset:
+            self._publish("resetting")
+            self.active_rows -= sum(1 for row in moved_rows if row < self.active_rows)
+            self.ids = [task_id for task_id in self.ids if task_id not in moved]
+        else:
+            for row in reversed(moved_rows):
+                self._publish("removing", row, row)
+                self._take(row)
+                self._publish("removed", row, row)
+        # Page in again after the last row left, so moved tasks sorting above the old cursor,
+        # loaded or not, show up
+        self._rewind()
+
+        for task, change in changes:
+            text, due, completed, order_key, repeat = change.fields()
+            task.text = task.text if text is None else text
+            task.due = task.due if due is None else due
+            task.completed = task.completed if completed is None else completed
+            task.order_key = task.order_key if order_key is None else order_key
+            task.repeat = task.repeat if repeat is None else repeat
+            self._note_key(task.completed, task.order_key)
+        # Paging records in above may have replaced the cached ones: cache the edited records
+        # of rows that stay, and drop the rest until they are placed or paged in again
+        for task, _ in changes:
+            if task.id in rows and task.id not in moved:
+                self._remember(task)
+            else:
+                self.cache.pop(task.id, None)
+        self.store.apply([(task.id, change) for task, change in changes])
+
+        moving.sort(key=TaskRecord.sort_key)
+        if reset:
+            for task in moving:
+                self._place(self._row_for(task.sort_key()), task)
+            self._publish("reset")
+        else:
+            for task in moving:
+                self._insert_sorted(task)
+            kept = {task.id for task, _ in changes}.difference(moved)
+            kept_rows = [row for row, task_id in enumerate(self.ids) if task_id in kept] if kept else []
+            if kept_rows:
+                self._publish("changed", kept_rows[0], kept_rows[-1])
+        for task, _ in changes:
+            self._publish("updated", task=task)
+        return [task for task, _ in changes]
+
+    def complete_many(self, task_ids, completed=True):
+        """
+        Completes tasks by id as one batch, loaded or not, or reopens them if `completed` is
+        False. Completed tasks go to the end of the list and reopened ones to the top, keeping
+        their order; active repeating tasks advance to their next occurrence, as in toggle().
+        """
+        tasks = [task for task in self._records(task_ids) if task.completed != completed]
+        changes = []
+        if completed:
+            now = int(time.time())
+            key = self.max_key(True)
+            for task in tasks:
+                if task.repeat:
+                    changes.append((task, Change(due=next_due(task.repeat, task.due, max(task.due, now)))))
+                else:
+                    key = key_between(key, None)
+                    changes.append((task, Change(completed=True, order_key=key)))
+        else:
+            key = self.order_key_at(0, False)
+            for task in reversed(tasks):
+                key = key_between(None, key)
+                changes.append((task, Change(completed=False, order_key=key)))
+        return self._update_many(changes)
+
+    def reschedule_many(self, task_ids, due):
+        """Sets the due time of tasks by id as one batch, loaded or not"""
+        return self._update_many([(task, Change(due=due)) for task in self._records(task_ids) if task.due != due])
+
+    def move_many(self, task_ids, row):
+        """
+        Moves tasks by id, loaded or not, to just above a loaded row (len(self) for the end),
+        keeping their order. Each stays in its own section: active tasks go no lower than the
+        end of the active rows, completed ones no higher than their start.
+        """
+        tasks = self._records(task_ids)
+        skip = {task.id for task in tasks}
+        changes = []
+        for completed in (False, True):
+            section = [task for task in tasks if task.completed == completed]
+            if not section:
+                continue
+            target = max(row, self.active_rows) if completed else min(row, self.active_rows)
+            before, after = self._neighbour_keys(target, completed, skip)
+            if before is not None and after is not None and before >= after:
+                after = None  # Neighbours with equal keys, as in move(): place after the upper one
+            keys = keys_between(before, after, len(section))
+            changes += [(task, Change(order_key=key)) for task, key in zip(section, keys)]
+        return self._update_many(changes)
+
+    def _neighbour_keys(self, row, completed, skip):
+        """
+        Order keys of a section's nearest tasks above a loaded row and from it on, passing over
+        the ids in `skip`; None where the section ends
+        """
+        above = row - 1
+        while above >= 0 and self.ids[above] in skip:
+            above -= 1
+        below = row
+        while below < len(self.ids) and self.ids[below] in skip:
+            below += 1
+        before = self.order_key_at(above, completed) if above >= 0 else None
+        if below < len(self.ids) or self.exhausted:
+            return before, self.order_key_at(below, completed)
+        # Past the loaded rows: peek at the store, where the skipped tasks may come next
+        for stored in self.store.page(self.cursor, len(skip) + 1):
+            if stored[0] not in skip:
+                return before, stored[4] if (stored[3] == 1) == completed else None
+        return before, None
+
+    def set_state_many(self, states):
+        """
+        Puts tasks back into recorded (text, due, completed, order_key, repeat) states as one
+        batch, for undo and redo; tasks deleted since are skipped
+        """
+        states = dict(states)
+        changes = []
+        for task in self._records(states):
+            current = (task.text, task.due, task.completed, task.order_key, task.repeat)
+            wanted = states[task.id]
+            if current != wanted:
+                changes.append((task, Change(*(new if new != old else None for old, new in zip(current, wanted)))))
+        return self._update_many(changes)
+
+    # Due dates
+
+    @staticmethod
+    def parse_due(date_text, time_text, now=None):
+        """
+        Parses the date and time inputs, as natural language ("tomorrow 5pm", "fri", "+3d",
+        "2026-11-02 09:30") or else as DDMMYY and HHMM, defaulting to now for missing or
+        invalid parts
+        """
+        due = parse_due_text(f"{date_text} {time_text}", now)
+        if due is not None:
+            return due
+        now = now or datetime.now()
+
+        # Handle time input
+        if time_text and time_text.isdigit() and len(time_text) == 4:
+            try:
+                hours, minutes = int(time_text[:2]), int(time_text[2:])
+                if not (0 <= hours < 24 and 0 <= minutes < 60):
+                    hours, minutes = now.hour, now.minute
+            except ValueError:
+                hours, minutes = now.hour, now.minute
+        else:
+            hours, minutes = now.hour, now.minute
+
+        # Handle date input
+        if date_text and date_text.isdigit() and len(date_text) == 6:
+            try:
+                day, month, year = int(date_text[:2]), int(date_text[2:4]), int(date_text[4:])
+                year += 2000  # Convert YY to YYYY
+            except ValueError:
+                day, month, year = now.day, now.month, now.year
+        else:
+            day, month, year = now.day, now.month, now.year
+
+        try:
+            return datetime(year, month, day, hours, minutes)
+        except ValueError:
+            return now + timedelta(days=1)  # Default: Next day if invalid
@@ -0,0 +1,122 @@
+"""
+Natural-language due dates.
+
+Understands a date part and a time part, in either order, each optional:
+
+    dates:  today, tomorrow, mon..sun (the next one, 1-7 days ahead), "next fri",
+            2026-11-02 (ISO-8601), 021126 (DDMMYY), +3d / +2w / +4h / +30m, "in 3 days"
+    times:  5pm, 5:30pm, 17:00, 0930 (HHMM), noon, midnight
+
+A missing time keeps the current time of day and a missing date means today, as in the
+input fields. Patterns are compiled once and results are memoized per minute, so parsing
+the same text on every keystroke costs a dictionary lookup.
+"""
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+UNITS = {"m": "minutes", "min": "minutes", "minute": "minutes", "minutes": "minutes",
+         "h": "hours", "hour": "hours", "hours": "hours",
+         "d": "days", "day": "days", "days": "days",
+         "w": "weeks", "week": "weeks", "weeks": "weeks"}
+
+# One alternative per token; the whole text must be consumed by them
+TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<iso>(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2}))(?:[t\s]+(?P<iso_time>\d{1,2}:\d{2}))?
+      | (?P<ddmmyy>\d{6})
+      | (?P<clock>(?P<clock_hour>\d{1,2})(?::(?P<clock_minute>\d{2}))?\s*(?P<meridiem>am|pm))
+      | (?P<hhmm>\d{1,2}:\d{2}|\d{4})
+      | (?P<relative>(?:\+|in\s+)(?P<amount>\d+)\s*(?P<unit>minutes?|min|hours?|h|days?|d|weeks?|w|m)\b)
+      | (?P<weekday>(?:next\s+)?(?P<weekday_name>mon|tue|wed|thu|fri|sat|sun)[a-z]*)
+      | (?P<word>today|tonight|tomorrow|tmrw|noon|midnight)
+    )(?=\s|$)
+""", re.VERBOSE)
+
+
+def _parse_clock(hours, minutes):
+    if 0 <= hours < 24 and 0 <= minutes < 60:
+        return hours, minutes
+    return None
+
+
+@lru_cache(maxsize=512)
+def _parse(text, now):
+    date = None  # A datetime.date, or None for today
+    clock = None  # (hours, minutes), or None for the current time of day
+    moved = None  # Exact datetime from a relative offset
+    dates_given = clocks_given = 0
+
+    position = 0
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            return None
+        position = match.end()
+        groups = match.groupdict()
+
+        if groups["iso"]:
+            try:
+                date = datetime(int(groups["year"]), int(groups["month"]), int(groups["day"])).date()
+            except ValueError:
+                return None
+            dates_given += 1
+            if groups["iso_time"]:
+                hours, minutes = groups["iso_time"].split(":")
+                clock = _parse_clock(int(hours), int(minutes))
+                clocks_given += 1
+        elif groups["ddmmyy"]:
+            digits = groups["ddmmyy"]
+            try:
+                date = datetime(2000 + int(digits[4:]), int(digits[2:4]), int(digits[:2])).date()
+            except ValueError:
+                return None
+            dates_given += 1
+        elif groups["clock"]:
+            hours = int(groups["clock_hour"])
+            if not 1 <= hours <= 12:
+                return None
+            clock = _parse_clock(hours % 12 + (12 if groups["meridiem"] == "pm" else 0),
+                                 int(groups["clock_minute"] or 0))
+            clocks_given += 1
+        elif groups["hhmm"]:
+            digits = groups["hhmm"].replace(":", "")
+            clock = _parse_clock(int(digits[:-2]), int(digits[-2:]))
+            clocks_given += 1
+        elif groups["relative"]:
+            moved = now + timedelta(**{UNITS[groups["unit"]]: int(groups["amount"])})
+            dates_given += 1
+        elif groups["weekday"]:
+            ahead = (WEEKDAYS.index(groups["weekday_name"]) - now.weekday()) % 7 or 7
+            date = (now + timedelta(days=ahead)).date()
+            dates_given += 1
+        else:
+            word = groups["word"]
+            if word in ("noon", "midnight"):
+                clock = (12, 0) if word == "noon" else (0, 0)
+                clocks_given += 1
+            else:
+                date = (now + timedelta(days=1)).date() if word in ("tomorrow", "tmrw") else now.date()
+                dates_given += 1
+                if word == "tonight":
+                    clock = (20, 0)
+                    clocks_given += 1
+
+        # Each part may be given only once, and must be valid
+        if dates_given > 1 or clocks_given > 1 or clocks_given and clock is None:
+            return None
+
+    base = moved or datetime.combine(date or now.date(), now.time())
+    if clock is not None:
+        base = base.replace(hour=clock[0], minute=clock[1])
+    return base
+
+
+def parse_due_text(text, now=None):
+    """The due time a text describes, or None if it is empty or not understood"""
+    text = " ".join(text.lower().split())
+    if not text:
+        return None
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    return _parse(text, now)
@@ -0,0 +1,221 @@
+"""
+Undo and redo for task list edits.
+
+History listens to a TaskList's record events and keeps every edit as a compact diff: the
+rows of created or deleted tasks, or the (text, due, completed, order_key, repeat) state an update
+replaced and produced. No widget or model state is kept. Consecutive moves or edits of the
+same task merge into one entry, and the oldest entries are dropped once the history's
+estimated size passes its limit; a single step larger than the limit is not recorded at all.
+Qt-free, like core.
+"""
+from collections import deque
+from contextlib import contextmanager
+
+ROW_BYTES = 120  # Estimated size of a recorded row besides its text
+
+
+def state(task):
+    return (task.text, task.due, task.completed, task.order_key, task.repeat)
+
+
+def row(task):
+    return (task.id, task.text, task.due, task.completed, task.order_key, task.repeat)
+
+
+class Command:
+    """
+    One undoable step: a list of (kind, rows) parts in the order they happened, where kind is
+    "add" or "delete" with (id, text, due, completed, order_key, repeat) rows, or "update" with
+    (id, before, after) state rows
+    """
+
+    __slots__ = ("parts", "size")
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def append(self, kind, item, size):
+        if not self.parts or self.parts[-1][0] != kind:
+            self.parts.append((kind, []))
+        self.parts[-1][1].append(item)
+        self.size += size
+
+    def single_update(self):
+        """(id, before, after) if this is an update of one task only, else None"""
+        if len(self.parts) == 1 and self.parts[0][0] == "update" and len(self.parts[0][1]) == 1:
+            return self.parts[0][1][0]
+        return None
+
+
+def update_kind(before, after):
+    """"toggle", "edit" or "move", by which fields of a task state changed"""
+    if before[2] != after[2]:
+        return "toggle"
+    if before[:2] != after[:2] or before[4] != after[4]:
+        return "edit"
+    return "move"
+
+
+class History:
+    """Bounded undo and redo stacks of Commands recorded from a TaskList"""
+
+    LIMIT = 8 * 1024 * 1024  # Estimated bytes of recorded rows kept across both stacks
+    COALESCED = ("move", "edit")  # Update kinds merged when repeated on one task
+
+    def __init__(self, tasks, limit=LIMIT):
+        self.tasks = tasks
+        self.limit = limit
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.size = 0
+        self.before = {}  # task id -> state at its "updating" event
+        self.current = None  # Command being grouped
+        self.depth = 0
+        self.replaying = False
+        self.paused_depth = 0
+        self.coalescing = False  # Whether the top entry may still absorb a repeated edit
+        tasks.subscribe(self._on_task_event)
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.size = 0
+        self.coalescing = False
+
+    # Recording
+
+    @contextmanager
+    def group(self):
+        """Records every edit made inside the block as one command, e.g. a bulk delete"""
+        if self.depth == 0:
+            self.current = Command()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                command, self.current = self.current, None
+                if command.parts:
+                    self._push(command)
+
+    @contextmanager
+    def paused(self):
+        """Leaves the edits made inside the block out of the history, e.g. bulk imports"""
+        self.paused_depth += 1
+        try:
+            yield
+        finally:
+            self.paused_depth -= 1
+
+    def _on_task_event(self, event):
+        kind = event.kind
+        if self.replaying or self.paused_depth or kind not in ("created", "deleted", "updating", "updated"):
+            return
+        task = event.task
+        if kind == "updating":
+            self.before[task.id] = state(task)
+            return
+        if kind == "updated":
+            before = self.before.pop(task.id, None)
+            after = state(task)
+            if before is None or before == after:
+                return
+            item = (task.id, before, after)
+            size = 2 * ROW_BYTES + len(before[0]) + (len(after[0]) if after[0] is not before[0] else 0)
+            kind = "update"
+        else:
+            item = row(task)
+            size = ROW_BYTES + len(task.text)
+            kind = "add" if kind == "created" else "delete"
+
+        if self.current is not None:
+            if self.current.parts is not None:
+                self.current.append(kind, item, size)
+                if self.current.size > self.limit:
+                    self.current.parts = None  # Too large to keep: the group is not undoable
+            return
+        if kind == "update" and self._coalesce(item):
+            return
+        command = Command()
+        command.append(kind, item, size)
+        self._push(command)
+
+    def _coalesce(self, item):
+        """Merges a repeated move or edit of one task into the top entry"""
+        if not self.coalescing or not self.undo_stack:
+            return False
+        top = self.undo_stack[-1]
+        previous = top.single_update()
+        task_id, before, after = item
+        if previous is None or previous[0] != task_id or previous[2] != before:
+            return False
+        kind = update_kind(before, after)
+        if kind not in self.COALESCED or update_kind(previous[1], previous[2]) != kind:
+            return False
+        if previous[1] == after:
+            # Back where it started: the entry no longer changes anything
+            self.undo_stack.pop()
+            self.size -= top.size
+            self.coalescing = False
+        else:
+            top.parts[0][1][0] = (task_id, previous[1], after)
+        return True
+
+    def _push(self, command):
+        for dropped in self.redo_stack:
+            self.size -= dropped.size
+        self.redo_stack = []
+        self.undo_stack.append(command)
+        self.size += command.size
+        self.coalescing = True
+        # Evict the oldest entries past the limit, always keeping the newest
+        while self.size > self.limit and len(self.undo_stack) > 1:
+            self.size -= self.undo_stack.popleft().size
+
+    # Replaying
+
+    def undo(self):
+        """Reverts the last command; returns it, or None if there is nothing to undo"""
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        self._replay(command, undo=True)
+        self.redo_stack.append(command)
+        return command
+
+    def redo(self):
+        """Re-applies the last undone command; returns it, or None if there is nothing to redo"""
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        self._replay(command, undo=False)
+        self.undo_stack.append(command)
+        return command
+
+    def _replay(self, command, undo):
+        self.replaying = True
+        self.coalescing = False
+        tasks = self.tasks
+        try:
+            for kind, rows in (reversed(command.parts) if undo else command.parts):
+                if kind == "update":
+                    # One batch per part; undo keeps each task's earliest state, redo its latest.
+                    # Tasks deleted by an edit left out of the history are skipped
+                    states = {}
+                    for task_id, before, after in (reversed(rows) if undo else rows):
+                        states[task_id] = before if undo else after
+                    tasks.set_state_many(states.items())
+                elif (kind == "add") == undo:
+                    tasks.remove_many([item[0] for item in rows])
+                else:
+                    tasks.restore_many(rows)
+        finally:
+            self.replaying = False
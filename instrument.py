@@ -0,0 +1,182 @@
+"""
+Hot-path instrumentation: per-call timing histograms, event loop stall detection and
+session profiles.
+
+Functions wrapped with @timed record every call into a Histogram of its duration, with
+log2 buckets from 1 µs up, so recording costs two clock reads and an increment. A
+StallDetector's timer ticks every TICK_MS and records how late each tick came: a late
+tick is time the event loop spent blocked, which the user saw as jank.
+
+Setting JAX_TODO_PROFILE (or passing --profile) to a path records the whole session:
+"*.json" writes a Chrome trace of the timed calls and stalls, viewable in chrome://tracing
+or Perfetto; any other path writes a cProfile file for pstats or snakeviz.
+"""
+import logging
+import os
+import threading
+from collections import deque
+from functools import wraps
+from time import perf_counter_ns
+
+from PyQt6.QtCore import QObject, Qt, QTimer
+
+log = logging.getLogger(__name__)
+
+BUCKETS = 32  # Histogram buckets: [2**(i-1), 2**i) µs, the last one open-ended
+
+
+class Histogram:
+    """Durations of the calls of one operation, bucketed by powers of two of a microsecond"""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns):
+        self.counts[min((duration_ns // 1000).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, fraction):
+        """Upper bound, in milliseconds, of the bucket holding the given fraction of calls"""
+        wanted = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return min(2 ** bucket / 1000, self.max_ns / 1e6)
+        return 0.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+class Recorder:
+    """Histograms by operation name, and the trace events of a session being traced"""
+
+    TRACE_LIMIT = 1_000_000  # Newest trace events kept
+
+    def __init__(self):
+        self.histograms = {}
+        self.trace = None  # deque of Chrome trace events, while tracing
+        self.origin_ns = perf_counter_ns()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def record(self, name, start_ns, end_ns):
+        self.histogram(name).record(end_ns - start_ns)
+        if self.trace is not None:
+            self.trace.append({"name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                               "ts": (start_ns - self.origin_ns) / 1000, "dur": (end_ns - start_ns) / 1000})
+
+    def summary(self):
+        """Operation name -> count and duration statistics"""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def log_summary(self):
+        for name, stats in self.summary().items():
+            log.info("timing op=%s count=%d mean_ms=%.3f p50_ms=%.3f p95_ms=%.3f p99_ms=%.3f max_ms=%.3f",
+                     name, stats["count"], stats["mean_ms"], stats["p50_ms"], stats["p95_ms"],
+                     stats["p99_ms"], stats["max_ms"])
+
+
+recorder = Recorder()
+
+
+def timed(name=None):
+    """Decorator recording the duration of every call of a function under `name`"""
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                recorder.record(label, start, perf_counter_ns())
+        return wrapper
+    return decorate
+
+
+class StallDetector(QObject):
+    """
+    Measures event loop responsiveness: a timer ticks every TICK_MS, and the delay of each
+    tick past its due time is recorded. Delays over STALL_MS are logged as stalls.
+    """
+
+    TICK_MS = 50
+    STALL_MS = 100
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.last_ns = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(self.TICK_MS)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self):
+        self.last_ns = perf_counter_ns()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def _tick(self):
+        now_ns = perf_counter_ns()
+        due_ns = self.last_ns + self.TICK_MS * 1_000_000
+        self.last_ns = now_ns
+        late_ns = max(0, now_ns - due_ns)
+        recorder.histogram("event_loop_lag").record(late_ns)
+        if late_ns > self.STALL_MS * 1_000_000:
+            recorder.record("event_loop_stall", due_ns, now_ns)
+            log.warning("event_loop_stall ms=%.1f", late_ns / 1e6)
+
+
+class Session:
+    """Profile of a whole session, written to `path` when it stops: a Chrome trace or cProfile file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.profiler = None
+
+    def start(self):
+        if self.path.endswith(".json"):
+            recorder.trace = deque(maxlen=Recorder.TRACE_LIMIT)
+        else:
+            import cProfile  # Only when profiling, like json below
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        log.info("profiling path=%s", self.path)
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.path)
+        elif recorder.trace is not None:
+            import json
+
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": list(recorder.trace), "displayTimeUnit": "ms",
+                           "metadata": {"timings": recorder.summary()}}, f)
+            recorder.trace = None
+        log.info("profile written path=%s", self.path)
@@ -0,0 +1,513 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from rank import initial_keys
+from store import data_dir
+from table import TaskTable
+
+log = logging.getLogger(__name__)
+
+
+class JournalStore:
+    """
+    Append-only task journal with snapshot compaction.
+    Every edit appends one small checksummed record to the journal, so saving costs O(1)
+    regardless of list size. The journal is periodically folded into a binary snapshot that
+    is memory-mapped on startup; only the journal tail written since is replayed.
+    Tasks are held in a columnar TaskTable, guarded by a lock so a background writer can apply
+    batches while the UI reads; the lock is never held across file writes.
+    A damaged snapshot or journal raises ValueError, leaving the files as they are; opened
+    with `recover`, it is renamed aside instead and the store starts from what is readable.
+    """
+
+    MAGIC = b"JAXS"
+    VERSION = 3
+    SNAPSHOT_HEADER = struct.Struct("<4sHQQQ")  # magic, version, generation, next id, count
+    SNAPSHOT_ROW = struct.Struct("<qqBQIHH")  # id, due, completed, offset, text, key and rule lengths
+    JOURNAL_HEADER = struct.Struct("<4sQ")  # magic, generation
+    RECORD_HEADER = struct.Struct("<II")  # payload length, crc32
+
+    OP_REMOVE = 2
+    OP_ADD = 5
+    OP_COMPLETE = 6
+    OP_ORDER = 7
+    OP_TEXT = 8
+    OP_REPEAT = 9
+    ADD = struct.Struct("<BqqBH")  # op, id, due, completed, key length (key, then text follow)
+    REMOVE = struct.Struct("<Bq")
+    COMPLETE = struct.Struct("<BqB")  # Order key follows
+    ORDER = struct.Struct("<Bq")  # Order key follows
+    TEXT = struct.Struct("<Bqq")  # op, id, due (text follows)
+    REPEAT = struct.Struct("<Bq")  # Recurrence rule follows
+
+    # Version 2 had no recurrence rules, version 1 stored numeric order keys; both are still
+    # read so existing files can be upgraded
+    SNAPSHOT_ROW_V2 = struct.Struct("<qqBQIH")  # id, due, completed, offset, text length, key length
+    SNAPSHOT_ROW_V1 = struct.Struct("<qqBdQI")  # id, due, completed, order key, text offset, text length
+    OP_ADD_V1 = 1
+    OP_COMPLETE_V1 = 3
+    OP_ORDER_V1 = 4
+    ADD_V1 = struct.Struct("<BqqBd")
+    COMPLETE_V1 = struct.Struct("<BqBd")
+    ORDER_V1 = struct.Struct("<Bqd")
+
+    def __init__(self, directory=None, sync_every=64, compact_every=10000, recover=False):
+        directory = directory or data_dir()
+        self.snapshot_path = os.path.join(directory, "tasks.snapshot")
+        self.journal_path = os.path.join(directory, "tasks.journal")
+        self.directory = directory
+        self.sync_every = sync_every
+        self.compact_every = compact_every
+        self.recover = recover
+        self.recovered = []  # Damaged files renamed aside while opening
+
+        self.table = TaskTable(ordered=False)  # Display order is sorted once, after loading
+        self.legacy_keys = {}  # id -> numeric order key read from a version 1 file
+        self.generation = 0
+        self.next_id = 1
+        self.journal_records = 0
+        self.unsynced = 0
+        self.lock = threading.RLock()
+
+        self._read_snapshot()
+        self._replay_journal()
+        self._upgrade_order_keys()
+        self.table.reindex()
+        if self.recovered:
+            self.compact()  # Keeps the records read before the damage
+
+    # Loading
+
+    def _read_snapshot(self):
+        """Maps the snapshot file and rebuilds the task table from it"""
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < self.SNAPSHOT_HEADER.size:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    self._parse_snapshot(mm)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            if not self.recover:
+                raise
+            self._set_aside(self.snapshot_path)
+            self._set_aside(self.journal_path)  # Its records apply on top of the lost snapshot
+
+    def _set_aside(self, path):
+        """Renames a damaged file out of the way, keeping it for recovery by hand"""
+        if os.path.exists(path):
+            aside = f"{path}.damaged-{time.strftime('%Y%m%d-%H%M%S')}"
+            os.replace(path, aside)
+            log.warning("store_file_set_aside path=%s", aside)
+            self.recovered.append(aside)
+
+    def _parse_snapshot(self, mm):
+        size = len(mm) - 4
+        if zlib.crc32(mm[:size]) != struct.unpack_from("<I", mm, size)[0]:
+            raise ValueError(f"Corrupted task snapshot: {self.snapshot_path}")
+        magic, version, generation, next_id, count = self.SNAPSHOT_HEADER.unpack_from(mm)
+        if magic != self.MAGIC or version not in (1, 2, self.VERSION):
+            raise ValueError(f"Unknown task snapshot format: {self.snapshot_path}")
+
+        rows_start = self.SNAPSHOT_HEADER.size
+        row_format = {1: self.SNAPSHOT_ROW_V1, 2: self.SNAPSHOT_ROW_V2}.get(version, self.SNAPSHOT_ROW)
+        rows_end = rows_start + count * row_format.size
+        table = TaskTable(ordered=False)
+        table.reserve(next_id)
+        # Texts and order keys are copied into the table's pools still encoded
+        with memoryview(mm) as view, view[rows_start:rows_end] as rows:
+            if version == self.VERSION:
+                table.load_packed(row_format.iter_unpack(rows), view[rows_end:size])
+            elif version == 2:
+                for task_id, due, completed, offset, text_length, key_length in row_format.iter_unpack(rows):
+                    start = rows_end + offset
+                    key_start = start + text_length
+                    table.insert_encoded(task_id, view[start:key_start], due, completed == 1,
+                                         view[key_start:key_start + key_length])
+            else:
+                for task_id, due, completed, order_key, offset, length in row_format.iter_unpack(rows):
+                    start = rows_end + offset
+                    table.insert_encoded(task_id, view[start:start + length], due, completed == 1, b"")
+                    self.legacy_keys[task_id] = order_key
+
+        self.table = table
+        self.generation = generation
+        self.next_id = next_id
+
+    def _replay_journal(self):
+        """
+        Applies journal records written after the snapshot, dropping a torn tail: a bad record
+        with no whole record after it. A bad record before others is damage, and the journal
+        is left alone rather than losing the records after it.
+        """
+        try:
+            with open(self.journal_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+
+        good_end = 0
+        if len(data) >= self.JOURNAL_HEADER.size:
+            magic, generation = self.JOURNAL_HEADER.unpack_from(data)
+            if magic == self.MAGIC and generation == self.generation:
+                good_end = self.JOURNAL_HEADER.size
+                view = memoryview(data)
+                while good_end + self.RECORD_HEADER.size <= len(data):
+                    length, crc = self.RECORD_HEADER.unpack_from(data, good_end)
+                    start = good_end + self.RECORD_HEADER.size
+                    payload = view[start:start + length]
+                    if not length or len(payload) != length or zlib.crc32(payload) != crc:
+                        if self._record_after(data, good_end):
+                            if not self.recover:
+                                raise ValueError(f"Corrupted task journal at byte {good_end}: {self.journal_path}")
+                            self._set_aside(self.journal_path)
+                            good_end = 0
+                        break  # Torn write from a crash: everything after it is discarded
+                    self._apply(payload)
+                    self.journal_records += 1
+                    good_end = start + length
+
+        if good_end == 0:
+            # Missing, foreign, stale or damaged journal: start a fresh one for this generation
+            self._write_journal_header()
+            self.journal_records = 0
+        elif good_end < len(data):
+            log.warning("journal_torn_tail dropped_bytes=%d records=%d", len(data) - good_end, self.journal_records)
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_end)
+                os.fsync(f.fileno())
+        self.journal = open(self.journal_path, "ab")
+
+    def _record_after(self, data, offset):
+        """Whether a whole, checksummed record starts anywhere in `data` past `offset`"""
+        view = memoryview(data)
+        header = self.RECORD_HEADER
+        for start in range(offset + 1, len(data) - header.size + 1):
+            length, crc = header.unpack_from(data, start)
+            end = start + header.size + length
+            if length and end <= len(data) and zlib.crc32(view[start + header.size:end]) == crc:
+                return True
+        return False
+
+    def _apply(self, payload):
+        op = payload[0]
+        table = self.table
+        if op == self.OP_ADD:
+            _, task_id, due, completed, key_length = self.ADD.unpack_from(payload)
+            key_end = self.ADD.size + key_length
+            table.insert_encoded(task_id, payload[key_end:], due, completed == 1, payload[self.ADD.size:key_end])
+            self.legacy_keys.pop(task_id, None)
+            self.next_id = max(self.next_id, task_id + 1)
+        elif op == self.OP_REMOVE:
+            task_id = self.REMOVE.unpack_from(payload)[1]
+            table.remove(task_id)
+            self.legacy_keys.pop(task_id, None)
+        elif op == self.OP_COMPLETE:
+            _, task_id, completed = self.COMPLETE.unpack_from(payload)
+            if task_id in table:
+                table.set_position(task_id, completed == 1, str(payload[self.COMPLETE.size:], "ascii"))
+                self.legacy_keys.pop(task_id, None)
+        elif op == self.OP_ORDER:
+            task_id = self.ORDER.unpack_from(payload)[1]
+            if task_id in table:
+                table.set_position(task_id, table.completed(task_id), str(payload[self.ORDER.size:], "ascii"))
+                self.legacy_keys.pop(task_id, None)
+        elif op == self.OP_TEXT:
+            _, task_id, due = self.TEXT.unpack_from(payload)
+            if task_id in table:
+                table.set_text(task_id, str(payload[self.TEXT.size:], "utf-8"))
+                table.set_due(task_id, due)
+        elif op == self.OP_REPEAT:
+            task_id = self.REPEAT.unpack_from(payload)[1]
+            if task_id in table:
+                table.set_repeat(task_id, str(payload[self.REPEAT.size:], "ascii"))
+        elif op == self.OP_ADD_V1:
+            _, task_id, due, completed, order_key = self.ADD_V1.unpack_from(payload)
+            table.insert_encoded(task_id, payload[self.ADD_V1.size:], due, completed == 1, b"")
+            self.legacy_keys[task_id] = order_key
+            self.next_id = max(self.next_id, task_id + 1)
+        elif op == self.OP_COMPLETE_V1:
+            _, task_id, completed, order_key = self.COMPLETE_V1.unpack_from(payload)
+            if task_id in table:
+                table.set_position(task_id, completed == 1, "")
+                self.legacy_keys[task_id] = order_key
+        elif op == self.OP_ORDER_V1:
+            _, task_id, order_key = self.ORDER_V1.unpack_from(payload)
+            if task_id in table:
+                self.legacy_keys[task_id] = order_key
+
+    def _upgrade_order_keys(self):
+        """Renumbers numeric order keys from version 1 files as rank keys, keeping the order"""
+        if not self.legacy_keys:
+            return
+        table, legacy_keys = self.table, self.legacy_keys
+        ordered = sorted(legacy_keys, key=lambda task_id: (table.completed(task_id), legacy_keys[task_id], task_id))
+        for task_id, order_key in zip(ordered, initial_keys(len(ordered))):
+            table.set_position(task_id, table.completed(task_id), order_key)
+        self.legacy_keys = {}
+        self.compact()
+
+    def page(self, after, limit):
+        """
+        Returns up to `limit` tasks as (id, text, due, completed, order_key, repeat) in display
+        order, starting after the (completed, order_key, id) position `after` (None for the top)
+        """
+        with self.lock:
+            return self.table.rows(self.table.page(after, limit))
+
+    def get_many(self, task_ids):
+        """Returns the (id, text, due, completed, order_key, repeat) rows of the given tasks"""
+        with self.lock:
+            return self.table.rows(task_ids)
+
+    def max_order_key(self, completed):
+        """Largest order key in the active or completed section, or None if it is empty"""
+        with self.lock:
+            return self.table.max_order_key(completed)
+
+    def last_id(self):
+        """Largest task id handed out so far, or 0"""
+        return self.next_id - 1
+
+    def reserve_ids(self, count):
+        """Claims `count` consecutive ids for tasks created later; returns the first"""
+        with self.lock:
+            first = self.next_id
+            self.next_id += count
+            return first
+
+    def change_seq(self):
+        """None: the journal has a single writer, so there are no changes by others to follow"""
+        return None
+
+    def dues(self):
+        """Returns (id, due, completed) of every task"""
+        with self.lock:
+            return self.table.dues()
+
+    def due_tasks(self, after, until):
+        """Returns (id, due) of active tasks due in the interval (after, until]"""
+        with self.lock:
+            return self.table.due_tasks(after, until)
+
+    def completed_tasks(self, until, limit):
+        """Returns (id, due) of up to `limit` completed tasks due by `until`"""
+        with self.lock:
+            return self.table.completed_tasks(until, limit)
+
+    def memory_report(self):
+        """Allocated bytes of the task table by column"""
+        with self.lock:
+            return self.table.memory_report()
+
+    # Mutations
+
+    def _append(self, payload):
+        self.journal.write(self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.journal_records += 1
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def add(self, text, due, completed, order_key, repeat=""):
+        """Appends a task and returns its id"""
+        task_id = self.next_id
+        self._insert(task_id, text, due, completed, order_key, repeat)
+        return task_id
+
+    def _insert(self, task_id, text, due, completed, order_key, repeat):
+        self.next_id = max(self.next_id, task_id + 1)
+        self.table.insert(task_id, text, due, completed, order_key, repeat)
+        for payload in self._add_payloads(task_id, text, due, completed, order_key, repeat):
+            self._append(payload)
+
+    def _add_payloads(self, task_id, text, due, completed, order_key, repeat):
+        """Records of a whole task: the task, then its recurrence rule if it has one"""
+        payloads = [self.ADD.pack(self.OP_ADD, task_id, due, int(completed), len(order_key))
+                    + order_key.encode("ascii") + text.encode("utf-8")]
+        if repeat:
+            payloads.append(self._repeat_payload(task_id, repeat))
+        return payloads
+
+    def _repeat_payload(self, task_id, repeat):
+        return self.REPEAT.pack(self.OP_REPEAT, task_id) + repeat.encode("ascii")
+
+    @contextmanager
+    def _batch(self):
+        """Defers fsync to the end of a batch of records"""
+        sync_every, self.sync_every = self.sync_every, float("inf")
+        try:
+            yield
+        finally:
+            self.sync_every = sync_every
+        self.sync()
+
+    def add_many(self, tasks):
+        """Appends (text, due, completed, order_key, repeat) tasks and returns their ids, with one fsync"""
+        with self._batch():
+            return [self.add(*task) for task in tasks]
+
+    def restore_many(self, rows):
+        """Re-appends (id, text, due, completed, order_key, repeat) rows of deleted tasks, with one fsync"""
+        with self._batch():
+            for row in rows:
+                self._insert(*row)
+
+    def remove(self, task_id):
+        """Records a task deletion"""
+        if self.table.remove(task_id):
+            self._append(self.REMOVE.pack(self.OP_REMOVE, task_id))
+
+    def remove_many(self, task_ids):
+        """Records task deletions, with one fsync"""
+        with self._batch():
+            for task_id in task_ids:
+                self.remove(task_id)
+
+    def set_text(self, task_id, text, due, repeat):
+        """Records a new text, due time and recurrence rule for a task"""
+        table = self.table
+        if task_id in table:
+            table.set_text(task_id, text)
+            table.set_due(task_id, due)
+            self._append(self.TEXT.pack(self.OP_TEXT, task_id, due) + text.encode("utf-8"))
+            if table.repeat(task_id) != repeat:
+                table.set_repeat(task_id, repeat)
+                self._append(self._repeat_payload(task_id, repeat))
+
+    def set_completed(self, task_id, completed, order_key):
+        """Records a completed flag change together with the task's new position"""
+        if task_id in self.table:
+            self.table.set_position(task_id, completed, order_key)
+            self._append(self.COMPLETE.pack(self.OP_COMPLETE, task_id, int(completed)) + order_key.encode("ascii"))
+
+    def set_order(self, task_id, order_key):
+        """Records a move as a new order key for one task"""
+        if task_id in self.table:
+            self.table.set_position(task_id, self.table.completed(task_id), order_key)
+            self._append(self.ORDER.pack(self.OP_ORDER, task_id) + order_key.encode("ascii"))
+
+    def apply(self, changes):
+        """Appends a batch of (id, Change) pairs with one fsync; callable from a background thread"""
+        with self.lock:
+            payloads = [payload for task_id, change in changes for payload in self._change(task_id, change)]
+        self.journal.write(b"".join(self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+                                    for payload in payloads))
+        self.journal_records += len(payloads)
+        self.unsynced += len(payloads)
+        self.sync()
+
+    def _change(self, task_id, change):
+        """Makes one change to the task table and returns the journal records describing it"""
+        table = self.table
+        if change.deleted:
+            return [self.REMOVE.pack(self.OP_REMOVE, task_id)] if table.remove(task_id) else []
+        if change.full:
+            table.insert(task_id, *change.fields())
+            self.next_id = max(self.next_id, task_id + 1)
+            return self._add_payloads(task_id, *change.fields())
+        if task_id not in table:
+            return []
+        payloads = []
+        if change.repeat is not None:
+            table.set_repeat(task_id, change.repeat)
+            payloads.append(self._repeat_payload(task_id, change.repeat))
+        if change.text is not None or change.due is not None:
+            if change.text is not None:
+                table.set_text(task_id, change.text)
+            if change.due is not None:
+                table.set_due(task_id, change.due)
+            payloads.append(self.TEXT.pack(self.OP_TEXT, task_id, table.due[task_id]) + table.texts.encoded(task_id))
+        if change.completed is not None:
+            table.set_position(task_id, change.completed,
+                               table.order_key(task_id) if change.order_key is None else change.order_key)
+            payloads.append(self.COMPLETE.pack(self.OP_COMPLETE, task_id, int(change.completed))
+                            + table.keys.encoded(task_id))
+        elif change.order_key is not None:
+            table.set_position(task_id, table.completed(task_id), change.order_key)
+            payloads.append(self.ORDER.pack(self.OP_ORDER, task_id) + change.order_key.encode("ascii"))
+        return payloads
+
+    def writer(self):
+        """The store itself: its task table is locked against concurrent reads while a batch is applied"""
+        return self
+
+    # Durability
+
+    def sync(self):
+        """Flushes and fsyncs pending journal records, compacting when the journal grew large"""
+        if self.unsynced:
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.unsynced = 0
+        if self.journal_records >= max(self.compact_every, len(self.table)):
+            self.compact()
+
+    def compact(self):
+        """Folds the journal into a fresh snapshot and starts an empty journal"""
+        generation = self.generation + 1
+        rows = []
+        texts = []
+        offset = 0
+        table = self.table
+        with self.lock:
+            for task_id in table.ids():
+                encoded_text = table.texts.encoded(task_id)
+                encoded_key = table.keys.encoded(task_id)
+                encoded_rule = table.repeat(task_id).encode("ascii")
+                rows.append(self.SNAPSHOT_ROW.pack(task_id, table.due[task_id], int(table.completed(task_id)), offset,
+                                                   len(encoded_text), len(encoded_key), len(encoded_rule)))
+                texts += (encoded_text, encoded_key, encoded_rule)
+                offset += len(encoded_text) + len(encoded_key) + len(encoded_rule)
+            next_id = self.next_id
+        body = b"".join([self.SNAPSHOT_HEADER.pack(self.MAGIC, self.VERSION, generation,
+                                                   next_id, len(rows))] + rows + texts)
+
+        # Write-then-rename keeps the previous snapshot intact until the new one is durable
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(body)
+            f.write(struct.pack("<I", zlib.crc32(body)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        self._fsync_directory()
+
+        # The old journal is now stale: its generation no longer matches the snapshot
+        self.generation = generation
+        self.journal.close()
+        self._write_journal_header()
+        self.journal = open(self.journal_path, "ab")
+        self.journal_records = 0
+        self.unsynced = 0
+
+    def _write_journal_header(self):
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.JOURNAL_HEADER.pack(self.MAGIC, self.generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+        self._fsync_directory()
+
+    def _fsync_directory(self):
+        if not hasattr(os, "O_DIRECTORY"):
+            return  # Directory fsync is not available on Windows
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """Syncs outstanding records and closes the journal"""
+        self.sync()
+        self.journal.close()
@@ -0,0 +1,146 @@
+"""
+Lexicographic rank keys for ordering tasks.
+
+A key is an integer part followed by an optional fraction, both in base 62. The first character
+encodes the length of the integer part ("a".."z" for non-negative, "A".."Z" for negative
+integers), so keys grow only logarithmically when tasks are repeatedly added at either end.
+Any two keys always have another key between them, so moving a task rewrites its key alone.
+Keys compare correctly as plain strings, in Python and in SQLite.
+"""
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+FIRST_KEY = "a0"
+SMALLEST_INTEGER = "A" + DIGITS[0] * 26
+
+_DIGIT_INDEX = {digit: i for i, digit in enumerate(DIGITS)}
+
+
+def _integer_length(head):
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"Invalid rank key head: {head!r}")
+
+
+def _split(key):
+    """Splits a key into its integer part and fraction"""
+    length = _integer_length(key[0])
+    if len(key) < length or key[-1] == DIGITS[0] and len(key) > length:
+        raise ValueError(f"Invalid rank key: {key!r}")
+    return key[:length], key[length:]
+
+
+def _midpoint(a, b):
+    """Fraction strictly between fractions a and b (b=None means 1)"""
+    if b is not None:
+        # Keep the common prefix and recurse on the rest
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = _DIGIT_INDEX[a[0]] if a else 0
+    digit_b = _DIGIT_INDEX[b[0]] if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]  # The first digit of b alone already sorts between a and b
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _increment(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        index = _DIGIT_INDEX[digits[i]] + 1
+        if index < BASE:
+            digits[i] = DIGITS[index]
+            return head + "".join(digits)
+        digits[i] = DIGITS[0]
+    # Carried out of every digit: switch to a longer (or shorter negative) integer
+    if head == "Z":
+        return "a" + DIGITS[0]
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(DIGITS[0])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def _decrement(integer):
+    head, digits = integer[0], list(integer[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        index = _DIGIT_INDEX[digits[i]] - 1
+        if index >= 0:
+            digits[i] = DIGITS[index]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+
+def key_between(before, after):
+    """Returns a key sorting strictly between two keys; None stands for either end of the list"""
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Rank keys out of order: {before!r} >= {after!r}")
+
+    if before is None and after is None:
+        return FIRST_KEY
+
+    if before is None:
+        integer, fraction = _split(after)
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if integer < after:
+            return integer
+        smaller = _decrement(integer)
+        if smaller is None:
+            raise ValueError("Cannot decrement rank key any further")
+        return smaller
+
+    if after is None:
+        integer, fraction = _split(before)
+        larger = _increment(integer)
+        return larger if larger is not None else integer + _midpoint(fraction, None)
+
+    integer_a, fraction_a = _split(before)
+    integer_b, fraction_b = _split(after)
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, fraction_b)
+    larger = _increment(integer_a)
+    if larger is not None and larger < after:
+        return larger
+    return integer_a + _midpoint(fraction_a, None)
+
+
+def initial_keys(count):
+    """Generates `count` increasing keys, for numbering an existing list once"""
+    key = None
+    for _ in range(count):
+        key = key_between(key, None)
+        yield key
+
+
+def keys_between(before, after, count):
+    """
+    Returns `count` increasing keys strictly between two keys (None for either end), found by
+    bisecting the gap so that they stay short however many there are
+    """
+    if count <= 0:
+        return []
+    middle = key_between(before, after)
+    lower = (count - 1) // 2
+    return keys_between(before, middle, lower) + [middle] + keys_between(middle, after, count - 1 - lower)
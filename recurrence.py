@@ -0,0 +1,149 @@
+"""
+Recurrence rules for repeating tasks.
+
+A repeating task is one row: its due time is the current occurrence and its rule says
+where the series goes next, so a rule running for years stores nothing per occurrence.
+Later occurrences are computed on demand, each in constant time, for whatever window is
+being looked at. Rules are stored as short canonical strings, "" meaning no repeat:
+
+    hours:6         every 6 hours
+    days:1          daily; days:14 every two weeks
+    weekly:0,2,4    every Mon, Wed and Fri
+    monthly:31      on day 31 of each month, or its last day in shorter months
+
+Day-based rules keep the due time of day in local time. Qt-free, like core.
+"""
+import calendar
+import re
+from datetime import datetime, timedelta
+from itertools import islice
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+WEEKDAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+CANONICAL = re.compile(r"(?:hours|days):[1-9]\d*|weekly:[0-6](?:,[0-6])*|monthly:(?:[1-9]|[12]\d|3[01])")
+EVERY = re.compile(r"every\s+(\d+)\s*(h|hours?|d|days?|w|weeks?)")
+MONTHLY = re.compile(r"(?:monthly|every\s+month)(?:\s+on)?(?:\s+(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)?)?")
+
+
+def parse_rule(text, due=None):
+    """
+    The canonical rule a text describes ("daily", "every 3 days", "weekly", "mon wed fri",
+    "weekdays", "monthly", "monthly on 15", "hourly", "every 6h"), "" for no repeat, or None
+    if it is not understood. "weekly" and "monthly" repeat on the weekday or day of month of
+    `due` (epoch seconds, default now). Canonical rules are accepted as they are.
+    """
+    if CANONICAL.fullmatch(text.strip()):
+        return text.strip()
+    text = " ".join(text.lower().replace(",", " ").split())
+    if text in ("", "none", "never", "no"):
+        return ""
+    anchor = datetime.fromtimestamp(due) if due is not None else datetime.now()
+    if text == "hourly" or text == "every hour":
+        return "hours:1"
+    if text in ("daily", "every day"):
+        return "days:1"
+    if text in ("weekly", "every week"):
+        return f"weekly:{anchor.weekday()}"
+    if text in ("weekdays", "every weekday"):
+        return "weekly:0,1,2,3,4"
+    match = EVERY.fullmatch(text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)[0]
+        if count < 1:
+            return None
+        return f"hours:{count}" if unit == "h" else f"days:{count * (7 if unit == 'w' else 1)}"
+    match = MONTHLY.fullmatch(text)
+    if match:
+        day = int(match.group(1) or anchor.day)
+        return f"monthly:{day}" if 1 <= day <= 31 else None
+    words = text.removeprefix("every ").removeprefix("weekly on ").removeprefix("weekly ").split()
+    days = set()
+    for word in words:
+        day = next((i for i, name in enumerate(WEEKDAYS) if word.startswith(name)), None)
+        if day is None:
+            return None
+        days.add(day)
+    if not days:
+        return None
+    return f"weekly:{','.join(map(str, sorted(days)))}"
+
+
+def describe(rule):
+    """Short label of a rule, e.g. "Every Mon, Wed"; "" for no repeat"""
+    if not rule:
+        return ""
+    kind, value = rule.split(":")
+    if kind == "hours":
+        return "Hourly" if value == "1" else f"Every {value} hours"
+    if kind == "days":
+        count = int(value)
+        if count == 1:
+            return "Daily"
+        return f"Every {count // 7} weeks" if count % 7 == 0 else f"Every {count} days"
+    if kind == "weekly":
+        days = [int(day) for day in value.split(",")]
+        if days == [0, 1, 2, 3, 4]:
+            return "Weekdays"
+        return "Every " + ", ".join(WEEKDAY_NAMES[day] for day in days)
+    day = int(value)
+    suffix = "th" if 10 <= day % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    return f"Monthly on the {day}{suffix}"
+
+
+def next_due(rule, due, after):
+    """
+    First occurrence later than `after` of the series that starts at `due`, in epoch
+    seconds. Jumps straight to it however many occurrences lie in between.
+    """
+    if after < due:
+        after = due - 1  # The series starts with the current occurrence itself
+    kind, value = rule.split(":")
+    if kind == "hours":
+        step = int(value) * 3600
+        return due + ((after - due) // step + 1) * step
+
+    start = datetime.fromtimestamp(due)
+    limit = datetime.fromtimestamp(after)
+    clock = start.time()
+    if kind == "days":
+        step = int(value)
+        periods = max(0, (limit.date() - start.date()).days // step)
+        while True:
+            candidate = datetime.combine(start.date() + timedelta(days=periods * step), clock)
+            if candidate > limit:
+                return int(candidate.timestamp())
+            periods += 1
+    if kind == "weekly":
+        days = {int(day) for day in value.split(",")}
+        date = max(start.date(), limit.date())
+        while True:
+            candidate = datetime.combine(date, clock)
+            if date.weekday() in days and candidate > limit:
+                return int(candidate.timestamp())
+            date += timedelta(days=1)
+    day = int(value)
+    year, month = (limit.year, limit.month) if limit > start else (start.year, start.month)
+    while True:
+        candidate = datetime.combine(
+            datetime(year, month, min(day, calendar.monthrange(year, month)[1])).date(), clock)
+        if candidate > limit and candidate >= start:
+            return int(candidate.timestamp())
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def occurrences(rule, due, start, end):
+    """Yields the series' occurrences in [start, end), computing each only when it is asked for"""
+    if not rule:
+        if start <= due < end:
+            yield due
+        return
+    occurrence = next_due(rule, due, start - 1)
+    while occurrence < end:
+        yield occurrence
+        occurrence = next_due(rule, due, occurrence)
+
+
+def upcoming(rule, due, count):
+    """The series' next `count` occurrences from the current one on"""
+    return list(islice(occurrences(rule, due, due, float("inf")), count))
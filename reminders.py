@@ -0,0 +1,117 @@
+import heapq
+import os
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from store import data_dir
+
+
+class ReminderScheduler(QObject):
+    """
+    Due-date reminders driven by a single QTimer armed for the earliest pending deadline.
+    Deadlines sit in a min-heap; cancelled or rescheduled entries stay in the heap and are
+    skipped when they reach the top, so every change costs O(log n) and idle costs nothing.
+    """
+
+    tasksDue = pyqtSignal(list)  # Ids of tasks whose due time has arrived
+
+    MAX_INTERVAL_MS = 2 ** 31 - 1  # QTimer limit (~24 days); longer waits re-arm on expiry
+    FAR_FUTURE = 2 ** 62
+
+    def __init__(self, state_path=None, parent=None):
+        super().__init__(parent)
+        self.state_path = state_path or os.path.join(data_dir(), "reminders.state")
+        self.heap = []  # (due, task_id), possibly stale
+        self.pending = {}  # task_id -> due, the source of truth
+        self.armed_for = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._fire)
+
+    def start(self, store):
+        """
+        Loads every pending deadline from the store and arms the timer.
+        Returns ids of tasks that came due while the app was closed.
+        """
+        now = int(time.time())
+        last_seen = self._read_last_seen()
+        missed = [task_id for task_id, _ in store.due_tasks(last_seen, now)] if last_seen else []
+
+        self.pending = dict(store.due_tasks(now, self.FAR_FUTURE))
+        self.heap = [(due, task_id) for task_id, due in self.pending.items()]
+        heapq.heapify(self.heap)
+        self._arm()
+        self._write_last_seen(now)
+        return missed
+
+    def schedule(self, task_id, due):
+        """Adds or moves the reminder of a task"""
+        if due <= time.time():
+            self.cancel(task_id)  # Already due: nothing left to remind about
+            return
+        if self.pending.get(task_id) == due:
+            return  # Unchanged, e.g. the task was only moved
+        self.pending[task_id] = due
+        heapq.heappush(self.heap, (due, task_id))
+        if self.armed_for is None or due < self.armed_for:
+            self._arm()
+
+    def cancel(self, task_id):
+        """Drops the reminder of a task, if it has one"""
+        due = self.pending.pop(task_id, None)
+        if due is not None and due == self.armed_for:
+            self._arm()
+
+    def _arm(self):
+        heap, pending = self.heap, self.pending
+        # Skip entries that were cancelled or rescheduled since they were pushed
+        while heap and pending.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        if len(heap) > 2 * len(pending) + 64:
+            self.heap = heap = [(due, task_id) for task_id, due in pending.items()]
+            heapq.heapify(heap)
+
+        if not heap:
+            self.timer.stop()
+            self.armed_for = None
+            return
+        due = heap[0][0]
+        if due != self.armed_for or not self.timer.isActive():
+            self.armed_for = due
+            delay_ms = max(0, int((due - time.time()) * 1000))
+            self.timer.start(min(delay_ms, self.MAX_INTERVAL_MS))
+
+    def _fire(self):
+        now = time.time()
+        heap, pending = self.heap, self.pending
+        due_ids = []
+        while heap and heap[0][0] <= now:
+            due, task_id = heapq.heappop(heap)
+            if pending.get(task_id) == due:
+                del pending[task_id]
+                due_ids.append(task_id)
+        self.armed_for = None
+        self._arm()
+        if due_ids:
+            self._write_last_seen(int(now))
+            self.tasksDue.emit(due_ids)
+
+    def stop(self):
+        """Stops the timer and records the time reminders were last delivered up to"""
+        self.timer.stop()
+        self._write_last_seen(int(time.time()))
+
+    def _read_last_seen(self):
+        try:
+            with open(self.state_path) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_last_seen(self, timestamp):
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(str(timestamp))
+        os.replace(temp_path, self.state_path)
@@ -0,0 +1,212 @@
+"""
+Incremental full-text index over task texts.
+
+Task texts are split into lower-cased word tokens with a posting set of task ids per token.
+Query terms match tokens by prefix (through the sorted vocabulary) and, from three
+characters on, anywhere inside a token (through a trigram index over the vocabulary, which
+is far smaller than the task list). All terms of a query must match. Results come back
+lazily in display order, so a keystroke never sorts or scans the whole list.
+"""
+import re
+from bisect import bisect_left, insort
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Distinct lower-cased word tokens of a text"""
+    return tuple(dict.fromkeys(TOKEN.findall(text.lower())))
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchResults:
+    """
+    Matching task ids of one query, produced in display order on demand.
+    Small result sets are sorted once; large ones are picked out of the index's display
+    order as it is walked, which stops as soon as enough rows were found.
+    """
+
+    # Sorting m matches costs about m log m, walking the display order for a page of rows
+    # about PAGE * n / m: small result sets are sorted, large ones walked
+    PAGE = 256
+
+    def __init__(self, index, matches):
+        self.index = index
+        self.matches = matches
+        self.ids = []  # Produced so far
+        self._sorted = None
+        self._walk = 0
+        self.exhausted = not matches
+        if matches and len(matches) ** 2 <= self.PAGE * len(index.positions):
+            self._sorted = sorted(matches, key=index.positions.__getitem__)
+
+    def __len__(self):
+        return len(self.matches)
+
+    def fetch(self, count):
+        """Produces up to `count` more ids and returns them"""
+        if self.exhausted:
+            return []
+        if self._sorted is not None:
+            start = len(self.ids)
+            found = self._sorted[start:start + count]
+        else:
+            order, matches = self.index.order, self.matches
+            found = []
+            i = self._walk
+            while i < len(order) and len(found) < count:
+                task_id = order[i][2]
+                if task_id in matches:
+                    found.append(task_id)
+                i += 1
+            self._walk = i
+        self.ids += found
+        if len(self.ids) >= len(self.matches):
+            self.exhausted = True
+        return found
+
+
+class SearchIndex:
+    """Token and trigram index over task texts, kept up to date one task at a time"""
+
+    def __init__(self):
+        self.postings = {}  # token -> set of task ids
+        self.tokens_of = {}  # task id -> tokens of its text
+        self.vocabulary = []  # Sorted tokens, for prefix matching
+        self.trigram_tokens = {}  # trigram -> set of tokens containing it
+        self.positions = {}  # task id -> (completed, order_key, id)
+        self.order = []  # Sorted positions of every task, i.e. the display order
+        self.building = False  # While building, the vocabulary is sorted once at the end
+
+    def __len__(self):
+        return len(self.positions)
+
+    def build(self, store, chunk=2000):
+        """
+        Indexes every task in the store, reading it in display order.
+        A generator: it yields after each chunk, so callers can spread the work out.
+        """
+        self.__init__()
+        self.building = True
+        after = None
+        while True:
+            rows = store.page(after, chunk)
+            for task_id, text, _, completed, order_key, _ in rows:
+                position = (int(completed), order_key, task_id)
+                self.positions[task_id] = position
+                self.order.append(position)
+                self._index_text(task_id, text)
+            if len(rows) < chunk:
+                break
+            after = self.order[-1]
+            yield
+        self.vocabulary = sorted(self.postings)
+        self.building = False
+
+    # Updates
+
+    def _index_text(self, task_id, text):
+        tokens = tokenize(text)
+        self.tokens_of[task_id] = tokens
+        postings = self.postings
+        for token in tokens:
+            ids = postings.get(token)
+            if ids is None:
+                postings[token] = ids = set()
+                self._add_token(token)
+            ids.add(task_id)
+
+    def _add_token(self, token):
+        if not self.building:
+            insort(self.vocabulary, token)
+        for trigram in trigrams(token):
+            self.trigram_tokens.setdefault(trigram, set()).add(token)
+
+    def _remove_token(self, token):
+        del self.postings[token]
+        del self.vocabulary[bisect_left(self.vocabulary, token)]
+        for trigram in trigrams(token):
+            tokens = self.trigram_tokens[trigram]
+            tokens.discard(token)
+            if not tokens:
+                del self.trigram_tokens[trigram]
+
+    def _unindex_text(self, task_id):
+        for token in self.tokens_of.pop(task_id, ()):
+            ids = self.postings[token]
+            ids.discard(task_id)
+            if not ids:
+                self._remove_token(token)
+
+    def add(self, task):
+        """Indexes a new task"""
+        self._index_text(task.id, task.text)
+        position = task.sort_key()
+        self.positions[task.id] = position
+        insort(self.order, position)
+
+    def remove(self, task_id):
+        """Drops a task from the index"""
+        position = self.positions.pop(task_id, None)
+        if position is None:
+            return
+        self._unindex_text(task_id)
+        del self.order[bisect_left(self.order, position)]
+
+    def update(self, task):
+        """Re-indexes a task whose text, completed flag or position changed"""
+        if task.id not in self.positions:
+            self.add(task)
+            return
+        if tokenize(task.text) != self.tokens_of[task.id]:
+            self._unindex_text(task.id)
+            self._index_text(task.id, task.text)
+        position = task.sort_key()
+        old = self.positions[task.id]
+        if position != old:
+            del self.order[bisect_left(self.order, old)]
+            insort(self.order, position)
+            self.positions[task.id] = position
+
+    # Queries
+
+    def matching_tokens(self, term):
+        """Vocabulary tokens a query term matches: by prefix, or anywhere from three characters on"""
+        if len(term) < 3:
+            vocabulary = self.vocabulary
+            start = bisect_left(vocabulary, term)
+            end = bisect_left(vocabulary, term + "\U0010ffff", start)
+            return vocabulary[start:end]
+        grams = sorted((self.trigram_tokens.get(gram, ()) for gram in trigrams(term)), key=len)
+        if not grams[0]:
+            return []
+        candidates = set(grams[0]).intersection(*grams[1:])
+        return [token for token in candidates if term in token]
+
+    def search(self, query):
+        """
+        Ids of tasks matching every term of a query, as lazily ordered SearchResults.
+        The match set may be one of the index's own posting sets, so results are re-run
+        rather than kept across edits.
+        """
+        terms = []
+        for term in tokenize(query):
+            postings = [self.postings[token] for token in self.matching_tokens(term)]
+            if not postings:
+                return SearchResults(self, set())
+            terms.append(postings)
+        if not terms:
+            return SearchResults(self, set())
+
+        # Intersect starting from the term with the fewest postings, never copying a lone set
+        terms.sort(key=lambda postings: sum(map(len, postings)))
+        matches = None
+        for postings in terms:
+            ids = postings[0] if len(postings) == 1 else set().union(*postings)
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                break
+        return SearchResults(self, matches)
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+
+from PyQt6.QtCore import QPointF, QRect, QRectF, Qt
+from PyQt6.QtGui import QColor, QImage, QPainter, QPixmap
+from PyQt6.QtWidgets import QGraphicsBlurEffect, QGraphicsPixmapItem, QGraphicsScene
+
+
+class ShadowCache:
+    """
+    Drop shadows for task rows drawn from pre-rendered nine-slice pixmaps.
+    The blur is rendered once per state; every card size is then composed once from the
+    nine slices and cached, so painting a shadow is a single drawPixmap and hovering only
+    swaps which cached pixmap is drawn.
+    """
+
+    # state -> (blur radius, y offset), matching the per-row QGraphicsDropShadowEffect it replaces
+    STATES = {
+        "normal": (15, 1),
+        "hover": (20, 2),
+    }
+
+    def __init__(self, margin=8, corner_radius=8, color=QColor(0, 0, 0, 80), max_sizes=16):
+        self.margin = margin  # How far a shadow may extend beyond its card
+        self.corner_radius = corner_radius
+        self.color = color
+        self.max_sizes = max_sizes
+        self.slices = {state: self._render_slices(blur) for state, (blur, _) in self.STATES.items()}
+        self.composed = OrderedDict()  # (width, height, state) -> QPixmap
+
+    def _render_slices(self, blur):
+        """Blurs one small rounded rectangle; its corners, edges and centre are the nine slices"""
+        side = 2 * (self.margin + self.corner_radius) + 1
+        source = QImage(side, side, QImage.Format.Format_ARGB32_Premultiplied)
+        source.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(source)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.color)
+        painter.drawRoundedRect(QRectF(self.margin, self.margin, side - 2 * self.margin, side - 2 * self.margin),
+                                self.corner_radius, self.corner_radius)
+        painter.end()
+
+        # Blur once, offscreen, through a throwaway scene
+        scene = QGraphicsScene()
+        item = QGraphicsPixmapItem(QPixmap.fromImage(source))
+        effect = QGraphicsBlurEffect()
+        effect.setBlurRadius(blur / 2)
+        effect.setBlurHints(QGraphicsBlurEffect.BlurHint.QualityHint)
+        item.setGraphicsEffect(effect)
+        scene.addItem(item)
+
+        blurred = QImage(side, side, QImage.Format.Format_ARGB32_Premultiplied)
+        blurred.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(blurred)
+        scene.render(painter, QRectF(0, 0, side, side), QRectF(0, 0, side, side))
+        painter.end()
+        return QPixmap.fromImage(blurred)
+
+    def pixmap(self, width, height, state):
+        """Shadow for a card of the given size, composed from the slices on first use"""
+        key = (width, height, state)
+        pixmap = self.composed.get(key)
+        if pixmap is not None:
+            self.composed.move_to_end(key)
+            return pixmap
+
+        source = self.slices[state]
+        corner = self.margin + self.corner_radius
+        full_width, full_height = width + 2 * self.margin, height + 2 * self.margin
+        middle_width, middle_height = max(0, full_width - 2 * corner), max(0, full_height - 2 * corner)
+        right, bottom = full_width - corner, full_height - corner
+        source_far = corner + 1
+
+        pixmap = QPixmap(full_width, full_height)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        # Corners
+        painter.drawPixmap(QRect(0, 0, corner, corner), source, QRect(0, 0, corner, corner))
+        painter.drawPixmap(QRect(right, 0, corner, corner), source, QRect(source_far, 0, corner, corner))
+        painter.drawPixmap(QRect(0, bottom, corner, corner), source, QRect(0, source_far, corner, corner))
+        painter.drawPixmap(QRect(right, bottom, corner, corner), source,
+                           QRect(source_far, source_far, corner, corner))
+        # Edges and centre, stretched from one-pixel strips
+        painter.drawPixmap(QRect(corner, 0, middle_width, corner), source, QRect(corner, 0, 1, corner))
+        painter.drawPixmap(QRect(corner, bottom, middle_width, corner), source,
+                           QRect(corner, source_far, 1, corner))
+        painter.drawPixmap(QRect(0, corner, corner, middle_height), source, QRect(0, corner, corner, 1))
+        painter.drawPixmap(QRect(right, corner, corner, middle_height), source,
+                           QRect(source_far, corner, corner, 1))
+        painter.drawPixmap(QRect(corner, corner, middle_width, middle_height), source, QRect(corner, corner, 1, 1))
+        painter.end()
+
+        self.composed[key] = pixmap
+        while len(self.composed) > self.max_sizes:
+            self.composed.popitem(last=False)
+        return pixmap
+
+    def paint(self, painter, card, state):
+        """Draws the shadow of a card rectangle"""
+        card = card.toAlignedRect()
+        offset = self.STATES[state][1]
+        painter.drawPixmap(QPointF(card.left() - self.margin, card.top() - self.margin + offset),
+                           self.pixmap(card.width(), card.height(), state))
@@ -0,0 +1,498 @@
+import os
+import sqlite3
+import uuid
+
+from rank import initial_keys
+from table import TaskTable
+
+
+def data_dir():
+    """Directory holding the task store, overridable with JAX_TODO_HOME"""
+    path = os.environ.get("JAX_TODO_HOME") or os.path.join(os.path.expanduser("~"), ".jax_todo")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def open_store():
+    """
+    Opens the storage engine selected by JAX_TODO_STORAGE ("sqlite", "journal" or "memory").
+    Damaged journal files are set aside, listed in the store's `recovered`, so the tasks
+    still readable open.
+    """
+    engine = os.environ.get("JAX_TODO_STORAGE", "sqlite")
+    if engine == "journal":
+        from journal import JournalStore
+        return JournalStore(recover=True)
+    if engine == "memory":
+        return MemoryStore()
+    return TaskStore()
+
+
+class Change:
+    """
+    A pending change to one task, as coalesced by a write-behind store: the fields set so far
+    (None for unchanged), or a deletion. A change with every field set is written whole,
+    replacing any stored row.
+    """
+
+    __slots__ = ("text", "due", "completed", "order_key", "repeat", "deleted")
+
+    def __init__(self, text=None, due=None, completed=None, order_key=None, repeat=None, deleted=False):
+        self.text = text
+        self.due = due
+        self.completed = completed
+        self.order_key = order_key
+        self.repeat = repeat
+        self.deleted = deleted
+
+    def fields(self):
+        return (self.text, self.due, self.completed, self.order_key, self.repeat)
+
+    @property
+    def full(self):
+        return None not in self.fields()
+
+    def then(self, later):
+        """This change followed by a later one, as one change"""
+        if later.deleted or self.deleted and later.full:
+            return later
+        if self.deleted:
+            return self  # Changes to a deleted task are moot
+        return Change(*(old if new is None else new for old, new in zip(self.fields(), later.fields())))
+
+    def applied(self, row):
+        """A stored (id, text, due, completed, order_key, repeat) row with this change made to it"""
+        return (row[0], *(old if new is None else int(new) if isinstance(new, bool) else new
+                          for old, new in zip(row[1:], self.fields())))
+
+    def row(self, task_id):
+        """The whole row of a full change"""
+        return (task_id, self.text, self.due, int(self.completed), self.order_key, self.repeat)
+
+
+class TaskStore:
+    """
+    SQLite-backed persistent task store.
+    Every mutation is a single small statement, so saving never rewrites the list.
+
+    Several app instances may share one database. Each connection logs the ids of the tasks
+    it writes to the changes table, tagged with its instance's origin, so an instance can
+    re-read just the tasks others changed. Ids of new tasks are claimed from a shared
+    counter, so instances never hand out the same id.
+    """
+
+    SCHEMA_VERSION = 3
+    LOG_SIZE = 100000  # Change log entries kept; an instance further behind reloads
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            due_datetime INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            order_key TEXT NOT NULL,
+            repeat TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS tasks_completed_order ON tasks (completed, order_key);
+        CREATE INDEX IF NOT EXISTS tasks_due ON tasks (due_datetime);
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            origin TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path=None, check_same_thread=True, origin=None):
+        self.path = path or os.path.join(data_dir(), "tasks.db")
+        self.origin = origin or uuid.uuid4().hex  # Shared by the connections of one instance
+        self.data_version = None
+        # Autocommit mode: each statement below is its own transaction
+        self.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=check_same_thread)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._log_changes()
+
+    def _log_changes(self):
+        """Logs every task this connection writes, by temporary triggers only it runs"""
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            self.conn.execute(
+                f"CREATE TEMP TRIGGER log_{event.lower()} AFTER {event} ON main.tasks BEGIN "
+                f"INSERT INTO changes (task_id, origin) VALUES ({row}.id, '{self.origin}'); END"
+            )
+
+    def _migrate(self):
+        """Creates the schema, upgrading databases written with numeric order keys"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks'"
+        ).fetchone()
+        if exists and version < 1:
+            # Version 0 stored REAL order keys: renumber them as rank keys, keeping the order
+            self.conn.execute("BEGIN")
+            self.conn.execute("DROP INDEX IF EXISTS tasks_completed_order")
+            self.conn.execute("DROP INDEX IF EXISTS tasks_due")
+            self.conn.execute("ALTER TABLE tasks RENAME TO tasks_v0")
+            self.conn.execute(self.SCHEMA.split(";")[0])
+            old_rows = self.conn.execute(
+                "SELECT id, text, due_datetime, completed FROM tasks_v0 ORDER BY completed, order_key, id"
+            ).fetchall()
+            self.conn.executemany(
+                "INSERT INTO tasks (id, text, due_datetime, completed, order_key) VALUES (?, ?, ?, ?, ?)",
+                (row + (order_key,) for row, order_key in zip(old_rows, initial_keys(len(old_rows)))),
+            )
+            self.conn.execute("DROP TABLE tasks_v0")
+            self.conn.execute("COMMIT")
+        elif exists and version < 3:
+            # Version 3 added recurrence rules
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN repeat TEXT NOT NULL DEFAULT ''")
+        self.conn.executescript(self.SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def page(self, after, limit):
+        """
+        Returns up to `limit` tasks as (id, text, due, completed, order_key, repeat) in display
+        order, starting after the (completed, order_key, id) position `after` (None for the top)
+        """
+        if after is None:
+            return self.conn.execute(
+                "SELECT id, text, due_datetime, completed, order_key, repeat FROM tasks "
+                "ORDER BY completed, order_key, id LIMIT ?", (limit,)
+            ).fetchall()
+        return self.conn.execute(
+            "SELECT id, text, due_datetime, completed, order_key, repeat FROM tasks "
+            "WHERE (completed, order_key, id) > (?, ?, ?) "
+            "ORDER BY completed, order_key, id LIMIT ?", (*after, limit)
+        ).fetchall()
+
+    def get_many(self, task_ids):
+        """Returns the (id, text, due, completed, order_key, repeat) rows of the given tasks, unordered"""
+        rows = []
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            rows += self.conn.execute(
+                "SELECT id, text, due_datetime, completed, order_key, repeat FROM tasks "
+                f"WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+        return rows
+
+    def max_order_key(self, completed):
+        """Largest order key in the active or completed section, or None if it is empty"""
+        return self.conn.execute(
+            "SELECT MAX(order_key) FROM tasks WHERE completed = ?", (int(completed),)
+        ).fetchone()[0]
+
+    def last_id(self):
+        """Largest task id in use, or 0"""
+        return self.conn.execute("SELECT MAX(id) FROM tasks").fetchone()[0] or 0
+
+    def _claim_ids(self, count):
+        """Takes `count` consecutive unused ids from the shared counter; runs inside a write transaction"""
+        stored = self.conn.execute("SELECT value FROM counters WHERE name = 'next_id'").fetchone()
+        first = max(stored[0] if stored else 1, self.last_id() + 1)
+        self.conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('next_id', ?)", (first + count,))
+        return first
+
+    def reserve_ids(self, count):
+        """Claims `count` consecutive ids for tasks created later; returns the first"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            first = self._claim_ids(count)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return first
+
+    # Changes made by other instances
+
+    def change_seq(self):
+        """Position in the change log, to read later changes from"""
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq):
+        """
+        Returns (seq, ids): the new log position and the ids of tasks other instances wrote
+        after `seq`, or None for ids if the log no longer reaches back that far. Costs one
+        pragma while no other connection has committed anything.
+        """
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return seq, []
+        self.data_version = version
+        self.conn.execute("BEGIN")
+        try:
+            first, last = self.conn.execute("SELECT MIN(seq), MAX(seq) FROM changes").fetchone()
+            if last is None or last <= seq:
+                return seq, []
+            if first > seq + 1:
+                return last, None
+            ids = [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT task_id FROM changes WHERE seq > ? AND seq <= ? AND origin != ?",
+                (seq, last, self.origin))]
+            return last, ids
+        finally:
+            self.conn.execute("COMMIT")
+
+    def watch_paths(self):
+        """Files whose changes signal writes by other instances"""
+        return [self.path, self.path + "-wal"]
+
+    def _trim_log(self):
+        self.conn.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", (self.LOG_SIZE,))
+
+    def dues(self):
+        """Returns (id, due, completed) of every task"""
+        return self.conn.execute("SELECT id, due_datetime, completed FROM tasks").fetchall()
+
+    def due_tasks(self, after, until):
+        """Returns (id, due) of active tasks due in the interval (after, until]"""
+        return self.conn.execute(
+            "SELECT id, due_datetime FROM tasks "
+            "WHERE due_datetime > ? AND due_datetime <= ? AND completed = 0", (after, until)
+        ).fetchall()
+
+    def completed_tasks(self, until, limit):
+        """Returns (id, due) of up to `limit` completed tasks due by `until`"""
+        return self.conn.execute(
+            "SELECT id, due_datetime FROM tasks WHERE due_datetime <= ? AND completed = 1 LIMIT ?",
+            (until, limit)
+        ).fetchall()
+
+    def add(self, text, due, completed, order_key, repeat=""):
+        """Inserts a task and returns its id"""
+        return self.add_many([(text, due, completed, order_key, repeat)])[0]
+
+    def add_many(self, tasks):
+        """Inserts (text, due, completed, order_key, repeat) tasks in one transaction and returns their ids"""
+        tasks = list(tasks)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            first = self._claim_ids(len(tasks))
+            ids = list(range(first, first + len(tasks)))
+            self.conn.executemany(
+                "INSERT INTO tasks (id, text, due_datetime, completed, order_key, repeat) VALUES (?, ?, ?, ?, ?, ?)",
+                ((task_id, text, due, int(completed), order_key, repeat)
+                 for task_id, (text, due, completed, order_key, repeat) in zip(ids, tasks)),
+            )
+            self._trim_log()
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return ids
+
+    def restore_many(self, rows):
+        """Re-inserts (id, text, due, completed, order_key, repeat) rows of deleted tasks in one transaction"""
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(
+                "INSERT INTO tasks (id, text, due_datetime, completed, order_key, repeat) VALUES (?, ?, ?, ?, ?, ?)",
+                ((task_id, text, due, int(completed), order_key, repeat)
+                 for task_id, text, due, completed, order_key, repeat in rows),
+            )
+            self._trim_log()
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def remove(self, task_id):
+        """Deletes a task"""
+        self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def remove_many(self, task_ids):
+        """Deletes tasks in one transaction"""
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", ((task_id,) for task_id in task_ids))
+            self._trim_log()
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def set_text(self, task_id, text, due, repeat):
+        """Updates a task's text, due time and recurrence rule"""
+        self.conn.execute("UPDATE tasks SET text = ?, due_datetime = ?, repeat = ? WHERE id = ?",
+                          (text, due, repeat, task_id))
+
+    def set_completed(self, task_id, completed, order_key):
+        """Updates the completed flag together with the task's new position"""
+        self.conn.execute(
+            "UPDATE tasks SET completed = ?, order_key = ? WHERE id = ?",
+            (int(completed), order_key, task_id),
+        )
+
+    def set_order(self, task_id, order_key):
+        """Moves a task by rewriting its order key only"""
+        self.conn.execute("UPDATE tasks SET order_key = ? WHERE id = ?", (order_key, task_id))
+
+    COLUMNS = ("text", "due_datetime", "completed", "order_key", "repeat")
+
+    def apply(self, changes):
+        """
+        Writes a batch of (id, Change) pairs in one transaction. Changes are grouped into a few
+        executemany calls, which run in SQLite with the GIL released, so a large batch written
+        from a background thread barely holds up the UI thread.
+        """
+        deleted, whole, updates = [], [], {}
+        for task_id, change in changes:
+            if change.deleted:
+                deleted.append((task_id,))
+            elif change.full:
+                whole.append(change.row(task_id))
+            else:
+                values = change.fields()
+                columns = tuple(column for column, value in zip(self.COLUMNS, values) if value is not None)
+                updates.setdefault(columns, []).append(
+                    [int(value) if isinstance(value, bool) else value for value in values if value is not None]
+                    + [task_id])
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", deleted)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tasks (id, text, due_datetime, completed, order_key, repeat) "
+                "VALUES (?, ?, ?, ?, ?, ?)", whole)
+            for columns, rows in updates.items():
+                self.conn.executemany(
+                    f"UPDATE tasks SET {', '.join(column + ' = ?' for column in columns)} WHERE id = ?", rows)
+            self._trim_log()
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def writer(self):
+        """A second connection to the database, for writing from a background thread"""
+        return TaskStore(self.path, check_same_thread=False, origin=self.origin)
+
+    def sync(self):
+        """Nothing to do: every statement is committed as it runs"""
+
+    def close(self):
+        """Closes the database connection"""
+        self.conn.close()
+
+
+class MemoryStore:
+    """
+    Non-persistent store with the same interface, for benchmarks and throwaway sessions.
+    Tasks live in a columnar TaskTable.
+    """
+
+    def __init__(self):
+        self.table = TaskTable()
+        self.next_id = 1
+
+    def page(self, after, limit):
+        """
+        Returns up to `limit` tasks as (id, text, due, completed, order_key, repeat) in display
+        order, starting after the (completed, order_key, id) position `after` (None for the top)
+        """
+        return self.table.rows(self.table.page(after, limit))
+
+    def get_many(self, task_ids):
+        """Returns the (id, text, due, completed, order_key, repeat) rows of the given tasks"""
+        return self.table.rows(task_ids)
+
+    def max_order_key(self, completed):
+        """Largest order key in the active or completed section, or None if it is empty"""
+        return self.table.max_order_key(completed)
+
+    def last_id(self):
+        """Largest task id handed out so far, or 0"""
+        return self.next_id - 1
+
+    def reserve_ids(self, count):
+        """Claims `count` consecutive ids for tasks created later; returns the first"""
+        first = self.next_id
+        self.next_id += count
+        return first
+
+    def change_seq(self):
+        """None: nothing else writes to the store"""
+        return None
+
+    def dues(self):
+        """Returns (id, due, completed) of every task"""
+        return self.table.dues()
+
+    def due_tasks(self, after, until):
+        """Returns (id, due) of active tasks due in the interval (after, until]"""
+        return self.table.due_tasks(after, until)
+
+    def completed_tasks(self, until, limit):
+        """Returns (id, due) of up to `limit` completed tasks due by `until`"""
+        return self.table.completed_tasks(until, limit)
+
+    def memory_report(self):
+        """Allocated bytes of the task table by column"""
+        return self.table.memory_report()
+
+    def add(self, text, due, completed, order_key, repeat=""):
+        """Inserts a task and returns its id"""
+        task_id = self.next_id
+        self.next_id += 1
+        self.table.insert(task_id, text, due, completed, order_key, repeat)
+        return task_id
+
+    def add_many(self, tasks):
+        """Inserts (text, due, completed, order_key, repeat) tasks and returns their ids"""
+        return [self.add(*task) for task in tasks]
+
+    def restore_many(self, rows):
+        """Re-inserts (id, text, due, completed, order_key, repeat) rows of deleted tasks"""
+        for row in rows:
+            self.table.insert(*row)
+            self.next_id = max(self.next_id, row[0] + 1)
+
+    def remove(self, task_id):
+        """Deletes a task"""
+        self.table.remove(task_id)
+
+    def remove_many(self, task_ids):
+        """Deletes tasks"""
+        for task_id in task_ids:
+            self.table.remove(task_id)
+
+    def set_text(self, task_id, text, due, repeat):
+        """Updates a task's text, due time and recurrence rule"""
+        if task_id in self.table:
+            self.table.set_text(task_id, text)
+            self.table.set_due(task_id, due)
+            self.table.set_repeat(task_id, repeat)
+
+    def set_completed(self, task_id, completed, order_key):
+        """Updates the completed flag together with the task's new position"""
+        if task_id in self.table:
+            self.table.set_position(task_id, completed, order_key)
+
+    def set_order(self, task_id, order_key):
+        """Moves a task by rewriting its order key only"""
+        if task_id in self.table:
+            self.table.set_position(task_id, self.table.completed(task_id), order_key)
+
+    def apply(self, changes):
+        """Makes a batch of (id, Change) pairs"""
+        for task_id, change in changes:
+            if change.deleted:
+                self.table.remove(task_id)
+            elif change.full:
+                self.table.insert(*change.row(task_id))
+                self.next_id = max(self.next_id, task_id + 1)
+            elif task_id in self.table:
+                self.table.insert(*change.applied(self.table.row(task_id)))
+
+    def writer(self):
+        """None: there is nothing to write in the background"""
+        return None
+
+    def sync(self):
+        """Nothing to persist"""
+
+    def close(self):
+        """Nothing to close"""
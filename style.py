@@ -1,24 +1,101 @@
 class TaskStyles:
     """
     Class for storing all styling information for the Task Manager application.
-    This separation allows for easier maintenance and theme changes.
+    All widget styling is compiled once into a single application-wide stylesheet; widget
+    states are selected through dynamic properties, so a state change only needs a repolish.
     """
-    
-    def __init__(self):
-        # Theme colors - can be easily changed here to modify the entire app's appearance
-        self.color_bg_dark = "#121212"
-        self.color_bg_medium = "#1a1a1a"
-        self.color_bg_light = "#232323"
-        self.color_accent = "#ff9100"
-        self.color_accent_hover = "#ffa122"
-        self.color_accent_pressed = "#e57f00"
-        self.color_text_primary = "white"
-        self.color_text_secondary = "#a0a0a0"
-        self.color_text_disabled = "#666666"
-        self.color_border = "#3c3c3c"
-        self.color_task_bg = "#252525"
-        self.color_task_hover = "#2d2d2d"
-        
+
+    # Theme colors - switching theme swaps the whole palette in one pass
+    THEMES = {
+        "dark": {
+            "color_bg_dark": "#121212",
+            "color_bg_medium": "#1a1a1a",
+            "color_bg_light": "#232323",
+            "color_accent": "#ff9100",
+            "color_accent_hover": "#ffa122",
+            "color_accent_hover_end": "#ff8811",
+            "color_accent_pressed": "#e57f00",
+            "color_accent_pressed_end": "#d67400",
+            "color_text_primary": "white",
+            "color_text_secondary": "#a0a0a0",
+            "color_text_completed": "#888888",
+            "color_text_disabled": "#666666",
+            "color_border": "#3c3c3c",
+            "color_entry_bg": "#2c2c2c",
+            "color_entry_focus_bg": "#333333",
+            "color_scrollbar": "#202020",
+            "color_scrollbar_handle": "#505050",
+            "color_checkbox_border": "#6c6c6c",
+            "color_task_bg": "#252525",
+            "color_task_top": "#323232",
+            "color_task_hover": "#2d2d2d",
+            "color_task_hover_top": "#3a3a3a",
+            "color_task_hover_border": "#4c4c4c",
+            "color_task_completed_top": "#2a2a2a",
+            "color_task_completed_bg": "#222222",
+            "color_task_completed_border": "#333333",
+            "color_task_dragging_top": "#444444",
+            "color_task_dragging_bg": "#333333",
+            "color_task_dragging_border": "#555555",
+            "color_task_selected_top": "#3d3326",
+            "color_task_selected_bg": "#2f281e",
+            "color_task_selected_border": "#ff9100",
+        },
+        "light": {
+            "color_bg_dark": "#e4e4e4",
+            "color_bg_medium": "#f2f2f2",
+            "color_bg_light": "#ffffff",
+            "color_accent": "#ff9100",
+            "color_accent_hover": "#ffa122",
+            "color_accent_hover_end": "#ff8811",
+            "color_accent_pressed": "#e57f00",
+            "color_accent_pressed_end": "#d67400",
+            "color_text_primary": "#202020",
+            "color_text_secondary": "#6a6a6a",
+            "color_text_completed": "#8a8a8a",
+            "color_text_disabled": "#a8a8a8",
+            "color_border": "#d4d4d4",
+            "color_entry_bg": "#f7f7f7",
+            "color_entry_focus_bg": "#ffffff",
+            "color_scrollbar": "#e0e0e0",
+            "color_scrollbar_handle": "#b0b0b0",
+            "color_checkbox_border": "#9a9a9a",
+            "color_task_bg": "#f4f4f4",
+            "color_task_top": "#ffffff",
+            "color_task_hover": "#ececec",
+            "color_task_hover_top": "#fafafa",
+            "color_task_hover_border": "#c0c0c0",
+            "color_task_completed_top": "#f0f0f0",
+            "color_task_completed_bg": "#e8e8e8",
+            "color_task_completed_border": "#dcdcdc",
+            "color_task_dragging_top": "#e6e6e6",
+            "color_task_dragging_bg": "#dadada",
+            "color_task_dragging_border": "#bcbcbc",
+            "color_task_selected_top": "#fff6ea",
+            "color_task_selected_bg": "#ffedd6",
+            "color_task_selected_border": "#ff9100",
+        },
+    }
+
+    def __init__(self, theme="dark"):
+        self.theme = theme
+        for name, value in self.THEMES[theme].items():
+            setattr(self, name, value)
+        self._stylesheet = None
+
+    def application_style(self):
+        """The complete application stylesheet, compiled once per theme"""
+        if self._stylesheet is None:
+            self._stylesheet = "".join((
+                self.main_window_style(),
+                self.label_style(),
+                self.input_panel_style(),
+                self.entry_style(),
+                self.button_style(),
+                self.menu_style(),
+            ))
+        return self._stylesheet
+
     def main_window_style(self):
         """Main window styling"""
         return f"""
@@ -26,15 +103,19 @@ class TaskStyles:
                 background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
                                                stop:0 {self.color_bg_medium}, stop:1 {self.color_bg_dark});
             }}
+            QListView#taskList {{
+                background: transparent;
+                border: none;
+            }}
             QScrollBar:vertical {{
                 border: none;
-                background: #202020;
+                background: {self.color_scrollbar};
                 width: 10px;
                 margin: 0px;
                 border-radius: 5px;
             }}
             QScrollBar::handle:vertical {{
-                background: #505050;
+                background: {self.color_scrollbar_handle};
                 min-height: 20px;
                 border-radius: 5px;
             }}
@@ -42,22 +123,50 @@ class TaskStyles:
                 height: 0px;
             }}
         """
-    
+
+    def label_style(self):
+        """Header and panel label styling"""
+        return f"""
+            QLabel#title, QLabel#reminder {{
+                color: {self.color_accent};
+            }}
+            QLabel#subtitle {{
+                color: {self.color_text_secondary};
+            }}
+            QLabel#panelTitle {{
+                color: {self.color_text_primary};
+                border: none;
+            }}
+            QLabel#duePreview {{
+                color: {self.color_text_secondary};
+                border: none;
+                background: transparent;
+            }}
+            QLabel#duePreview[error="true"] {{
+                color: {self.color_accent};
+            }}
+            QLabel#inputIcon {{
+                font-size: 16px;
+                border: none;
+                background: transparent;
+            }}
+        """
+
     def input_panel_style(self):
         """Input panel styling"""
         return f"""
-            QFrame {{
+            QFrame#inputPanel {{
                 background-color: {self.color_bg_light};
                 border-radius: 10px;
                 border: 1px solid {self.color_border};
             }}
         """
-    
+
     def entry_style(self):
-        """Input field styling"""
+        """Input field styling, including the error state set through the "error" property"""
         return f"""
             QLineEdit {{
-                background-color: #2c2c2c;
+                background-color: {self.color_entry_bg};
                 color: {self.color_text_primary};
                 border: 1px solid {self.color_border};
                 border-radius: 5px;
@@ -67,33 +176,21 @@ class TaskStyles:
             }}
             QLineEdit:focus {{
                 border: 1px solid {self.color_accent};
-                background-color: #333333;
-            }}
-            QLineEdit::placeholder {{
-                color: #888888;
+                background-color: {self.color_entry_focus_bg};
             }}
-        """
-    
-    def input_error_style(self):
-        """Error styling for input fields"""
-        return """
-            QLineEdit {
+            QLineEdit[error="true"] {{
                 background-color: rgba(255, 0, 0, 0.1);
-                color: white;
                 border: 1px solid #ff0000;
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 12px;
-            }
+            }}
         """
-    
+
     def button_style(self):
         """Button styling"""
         return f"""
             QPushButton {{
                 background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
                                                stop:0 {self.color_accent}, stop:1 {self.color_accent_pressed});
-                color: {self.color_text_primary};
+                color: white;
                 border: none;
                 border-radius: 5px;
                 padding: 10px 15px;
@@ -103,105 +200,68 @@ class TaskStyles:
             }}
             QPushButton:hover {{
                 background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                                               stop:0 {self.color_accent_hover}, stop:1 #ff8811);
+                                               stop:0 {self.color_accent_hover}, stop:1 {self.color_accent_hover_end});
             }}
             QPushButton:pressed {{
                 background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                                               stop:0 {self.color_accent_pressed}, stop:1 #d67400);
+                                               stop:0 {self.color_accent_pressed}, stop:1 {self.color_accent_pressed_end});
             }}
         """
-    
-    def delete_button_style(self):
-        """Delete button styling"""
+
+    def menu_style(self):
+        """Menu bar, menu, bucket tab and progress bar styling"""
         return f"""
-            QPushButton {{
-                background-color: transparent;
-                border: none;
-                min-width: 30px;
-                min-height: 30px;
-                font-size: 25px;
-                color: {self.color_accent};
-                font-weight: bold;
+            QMenuBar {{
+                background: transparent;
+                color: {self.color_text_secondary};
             }}
-            QPushButton:hover {{
-                color: {self.color_accent_hover};
-            }}
-            QPushButton:pressed {{
-                color: {self.color_accent_pressed};
+            QMenuBar::item:selected, QMenu::item:selected {{
+                background: {self.color_entry_bg};
+                color: {self.color_text_primary};
             }}
-        """
-
-    def checkbox_style(self):
-        """Checkbox styling with an orange fill when checked and a grey border"""
-        return f"""
-            QCheckBox::indicator {{
-                width: 20px;
-                height: 20px;
-                border-radius: 10px;
-                border: 2px solid #6c6c6c;
-                background-color: {self.color_task_bg};
-                transition: background-color 0.2s, border-color 0.2s;
+            QMenu {{
+                background: {self.color_bg_light};
+                color: {self.color_text_primary};
+                border: 1px solid {self.color_border};
             }}
-            QCheckBox::indicator:hover {{
-                border: 2px solid {self.color_accent};
-                background-color: rgba(255, 145, 0, 0.2);
+            QTabBar::tab {{
+                background: transparent;
+                color: {self.color_text_secondary};
+                border: none;
+                border-bottom: 2px solid transparent;
+                padding: 6px 10px;
+                font-family: 'Segoe UI';
             }}
-            QCheckBox::indicator:checked {{
-                background-color: {self.color_accent};  /* Filled with orange when checked */
-                border: 2px solid {self.color_task_bg};  /* Grey border when checked */
+            QTabBar::tab:selected {{
+                color: {self.color_text_primary};
+                border-bottom: 2px solid {self.color_accent};
             }}
-        """
-
-    def task_normal_style(self):
-        """Normal task styling"""
-        return f"""
-            QFrame {{
-                background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                                               stop:0 #323232, stop:1 {self.color_task_bg});
-                border-radius: 8px;
-                border: 1px solid {self.color_border};
+            QProgressBar {{
+                background: {self.color_entry_bg};
+                border: none;
+                border-radius: 3px;
             }}
-        """
-    
-    def task_completed_style(self):
-        """Completed task styling"""
-        return """
-            QFrame {
-                background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                                               stop:0 #2a2a2a, stop:1 #222222);
-                border-radius: 8px;
-                border: 1px solid #333333;
-            }
-        """
-    
-    def task_hover_style(self):
-        """Task hover styling"""
-        return f"""
-            QFrame {{
-                background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                                               stop:0 #3a3a3a, stop:1 {self.color_task_hover});
-                border-radius: 8px;
-                border: 1px solid #4c4c4c;
+            QProgressBar::chunk {{
+                background: {self.color_accent};
+                border-radius: 3px;
             }}
         """
-    
-    def task_dragging_style(self):
-        """Task dragging styling"""
-        return """
-            QFrame {
-                background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                                               stop:0 #444444, stop:1 #333333);
-                border-radius: 8px;
-                border: 1px solid #555555;
-            }
-        """
-    
-    def task_delete_style(self):
-        """Task delete styling"""
-        return """
-            QFrame {
-                background-color: rgba(255, 0, 0, 0.2);
-                border-radius: 8px;
-                border: 1px solid #3c3c3c;
-            }
-        """
+
+    def task_row_colors(self, state):
+        """Gradient top, gradient bottom and border colors of a painted task row"""
+        return {
+            "normal": (self.color_task_top, self.color_task_bg, self.color_border),
+            "completed": (self.color_task_completed_top, self.color_task_completed_bg,
+                          self.color_task_completed_border),
+            "hover": (self.color_task_hover_top, self.color_task_hover, self.color_task_hover_border),
+            "selected": (self.color_task_selected_top, self.color_task_selected_bg,
+                         self.color_task_selected_border),
+            "dragging": (self.color_task_dragging_top, self.color_task_dragging_bg,
+                         self.color_task_dragging_border),
+        }[state]
+
+    def task_text_colors(self, completed):
+        """Main text and due date colors of a painted task row"""
+        if completed:
+            return self.color_text_completed, self.color_text_disabled
+        return self.color_text_primary, self.color_text_secondary
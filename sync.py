@@ -0,0 +1,308 @@
+"""
+Delta sync of the task list across machines, through a sync server.
+
+Every change the server accepts takes the next number of one global sequence, and every
+task remembers the number of its latest change, and of each field's. A device keeps the
+number it has pulled up to and the version of each task it holds, so a single request
+pushes its own changes, only the fields that changed, and pulls whatever changed since,
+BATCH tasks at a time. Requests and responses are zlib-compressed JSON: syncing one edit
+sends a few hundred bytes however long the list is.
+
+The server settles conflicts field by field: a field another device changed since this
+one last pulled the task goes to the later edit, by the editing device's clock, with the
+device id breaking ties; a deletion beats any edit. Devices take the server's state for
+everything they pull, so all of them end up the same. Tasks put at the same place on two
+devices between syncs get the same order key, and each device shows them in its own order.
+
+The device side keeps its state in sync.db next to the task store: its id, the sequence
+number pulled up to, the server key and version of every synced task, and an outbox of
+tasks changed since they were last sent. Qt-free, like core.
+
+    python sync.py http://127.0.0.1:8765    (syncs the configured store once, without the UI)
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+import urllib.request
+import uuid
+import zlib
+from contextlib import contextmanager
+
+from store import data_dir
+
+FIELDS = ("text", "due", "completed", "order_key", "repeat")
+ALL_FIELDS = (1 << len(FIELDS)) - 1  # Bit i of a field mask stands for FIELDS[i]
+
+
+def encode(message):
+    return zlib.compress(json.dumps(message, separators=(",", ":")).encode("utf-8"))
+
+
+def decode(data):
+    return json.loads(zlib.decompress(data))
+
+
+def post(url, message, timeout=30):
+    """Sends a request to a sync server and returns its response; blocks, so it runs off the UI thread"""
+    request = urllib.request.Request(
+        url.rstrip("/") + "/sync", data=encode(message), method="POST",
+        headers={"Content-Type": "application/json", "Content-Encoding": "deflate"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return decode(response.read())
+
+
+def state(task):
+    return tuple(getattr(task, name) for name in FIELDS)
+
+
+class SyncClient:
+    """
+    The device side of the protocol over a TaskList: records which fields of which tasks
+    change, builds requests from them and applies responses. Runs on the UI thread; only
+    post() is meant for another.
+    """
+
+    BATCH = 500  # Changes pushed, and changes pulled, per request
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS links (
+            key TEXT PRIMARY KEY,
+            task_id INTEGER NOT NULL UNIQUE,
+            version INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS outbox (
+            task_id INTEGER PRIMARY KEY,
+            mask INTEGER NOT NULL,
+            stamp INTEGER NOT NULL,
+            deleted INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, tasks, path=None):
+        self.tasks = tasks
+        self.path = path or os.path.join(data_dir(), "sync.db")
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.node = self._meta("node")
+        if self.node is None:
+            self.node = uuid.uuid4().hex[:16]
+            self._set_meta("node", self.node)
+        self.pending = {}  # id -> [mask, stamp, deleted] of changes not in the outbox yet
+        self.before = {}  # id -> state at its "updating" event
+        self.sent = None  # (id, stamp) of the outbox entries in the request awaiting its response
+        self.paused_depth = 0
+        tasks.subscribe(self._on_task_event)
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    # Recording local changes
+
+    @contextmanager
+    def paused(self):
+        """Leaves the edits made inside the block unsynced, e.g. ones pulled from the server"""
+        self.paused_depth += 1
+        try:
+            yield
+        finally:
+            self.paused_depth -= 1
+
+    def _on_task_event(self, event):
+        kind = event.kind
+        if self.paused_depth or kind not in ("created", "deleted", "updating", "updated"):
+            return
+        task = event.task
+        if kind == "updating":
+            self.before[task.id] = state(task)
+            return
+        mask = ALL_FIELDS
+        if kind == "updated":
+            before = self.before.pop(task.id, None)
+            if before is not None:
+                mask = sum(1 << i for i, (old, new) in enumerate(zip(before, state(task))) if old != new)
+            if not mask:
+                return
+        entry = self.pending.get(task.id)
+        stamp = int(time.time() * 1000)
+        deleted = kind == "deleted"
+        if entry is None:
+            self.pending[task.id] = [mask, stamp, deleted]
+        else:
+            entry[0] |= mask
+            entry[1] = stamp
+            entry[2] = deleted
+
+    def has_changes(self):
+        return bool(self.pending)
+
+    def _flush_pending(self):
+        """Moves the recorded changes into the outbox, so they survive a restart"""
+        if self._meta("seeded") is None:
+            # First sync from this store: every task it holds is new to the server
+            stamp = int(time.time() * 1000)
+            with self._transaction():
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO outbox (task_id, mask, stamp, deleted) VALUES (?, ?, ?, 0)",
+                    ((row[0], ALL_FIELDS, stamp) for row in self.tasks.store.dues()))
+                self._set_meta("seeded", 1)
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO outbox (task_id, mask, stamp, deleted) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (task_id) DO UPDATE SET mask = mask | excluded.mask, stamp = excluded.stamp, "
+                "deleted = excluded.deleted",
+                ((task_id, mask, stamp, int(deleted)) for task_id, (mask, stamp, deleted) in pending.items()))
+
+    def _select_in(self, query, values):
+        """Rows of a query ending in "IN", for any number of values"""
+        rows = []
+        values = list(values)
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            rows += self.conn.execute(f"{query} ({','.join('?' * len(chunk))})", chunk).fetchall()
+        return rows
+
+    def _links(self, column, values):
+        """(key, task_id, version) links whose key or task_id is among `values`"""
+        return self._select_in(f"SELECT key, task_id, version FROM links WHERE {column} IN", values)
+
+    # Requests and responses
+
+    def request(self):
+        """The next request: up to BATCH outbox changes, and the position to pull changes from"""
+        self._flush_pending()
+        entries = self.conn.execute(
+            "SELECT task_id, mask, stamp, deleted FROM outbox ORDER BY stamp LIMIT ?", (self.BATCH,)).fetchall()
+        links = {task_id: (key, version) for key, task_id, version in self._links("task_id", (e[0] for e in entries))}
+        rows = {row[0]: row for row in self.tasks.store.get_many([e[0] for e in entries if not e[3]])}
+        changes = []
+        new_links = []
+        for task_id, mask, stamp, deleted in entries:
+            key, version = links.get(task_id, (None, 0))
+            row = rows.get(task_id)
+            if deleted or row is None:
+                if key is not None:  # A task the server never saw needs no deletion
+                    changes.append({"key": key, "base": version, "stamp": stamp, "deleted": True})
+                continue
+            if key is None:
+                key = f"{self.node}-{task_id}"
+                new_links.append((key, task_id))
+            if version == 0:
+                mask = ALL_FIELDS  # New to the server: sent whole
+            changes.append({"key": key, "base": version, "stamp": stamp,
+                            "fields": {name: row[i + 1] for i, name in enumerate(FIELDS) if mask >> i & 1}})
+        if new_links:
+            with self._transaction():
+                self.conn.executemany("INSERT OR IGNORE INTO links (key, task_id, version) VALUES (?, ?, 0)",
+                                      new_links)
+        self.sent = [(entry[0], entry[2]) for entry in entries]
+        return {"node": self.node, "since": int(self._meta("seq") or 0), "limit": self.BATCH, "changes": changes}
+
+    def abort(self):
+        """Forgets the request in flight after it failed; its changes stay in the outbox"""
+        self.sent = None
+
+    def apply(self, response):
+        """
+        Takes in the response to the last request: clears the changes it pushed from the
+        outbox and makes the changes it pulled, all in one batch. Tasks changed here again
+        meanwhile are left as they are, to be settled by the server on the next push.
+        Returns counts of what was sent and received, and whether more is waiting.
+        """
+        sent, self.sent = self.sent or [], None
+        records = response["changes"]
+        self._flush_pending()
+        with self._transaction():
+            self.conn.executemany("DELETE FROM outbox WHERE task_id = ? AND stamp = ?", sent)
+            links = {key: task_id for key, task_id, _ in self._links("key", (record["key"] for record in records))}
+            known = set(links.values())
+            dirty = {row[0] for row in self._select_in("SELECT task_id FROM outbox WHERE task_id IN", known)}
+            present = {row[0] for row in self.tasks.store.get_many(list(known))}
+            removed, created, states, versions = [], [], {}, []
+            for record in records:
+                task_id = links.get(record["key"])
+                if task_id in dirty:
+                    continue
+                if record["deleted"]:
+                    if task_id in present:
+                        removed.append(task_id)
+                elif task_id in present:
+                    fields = record["fields"]
+                    states[task_id] = tuple(bool(fields[name]) if name == "completed" else fields[name]
+                                            for name in FIELDS)
+                else:
+                    created.append(record)  # New here, or archived or deleted here before
+                    continue
+                versions.append((record["rev"], record["key"]))
+            if created:
+                first = self.tasks.store.reserve_ids(len(created))
+                rows = [(first + i, *(record["fields"][name] for name in FIELDS)) for i, record in enumerate(created)]
+                self.conn.executemany("INSERT OR REPLACE INTO links (key, task_id, version) VALUES (?, ?, ?)",
+                                      ((record["key"], row[0], record["rev"]) for record, row in zip(created, rows)))
+            self.conn.executemany("UPDATE links SET version = ? WHERE key = ?", versions)
+            with self.paused():
+                if removed:
+                    self.tasks.remove_many(removed)
+                if created:
+                    self.tasks.restore_many(rows)
+                if states:
+                    self.tasks.set_state_many(states.items())
+            self._set_meta("seq", response["seq"])
+        waiting = self.conn.execute("SELECT 1 FROM outbox LIMIT 1").fetchone() is not None
+        return {"sent": len(sent), "received": len(records), "more": response["more"] or waiting}
+
+    def close(self):
+        """Stops recording and saves the changes recorded so far to the outbox"""
+        self.tasks.unsubscribe(self._on_task_event)
+        self._flush_pending()
+        self.conn.close()
+
+
+def main(argv=None):
+    """Syncs the configured store with a server until nothing is left to send or receive"""
+    from core import TaskList
+    from store import open_store
+
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        sys.exit("usage: python sync.py URL")
+    store = open_store()
+    try:
+        tasks = TaskList(store)
+        tasks.load()
+        client = SyncClient(tasks)
+        sent = received = 0
+        while True:
+            result = client.apply(post(argv[0], client.request()))
+            sent += result["sent"]
+            received += result["received"]
+            if not result["more"]:
+                break
+        client.close()
+        print(f"Sent {sent} changes, received {received}", file=sys.stderr)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
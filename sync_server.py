@@ -0,0 +1,157 @@
+"""
+Reference sync server: the other end of sync.py, as plain HTTP on localhost.
+
+    python sync_server.py [--port 8765] [--data PATH]
+
+It answers one endpoint, POST /sync, taking and returning zlib-compressed JSON. Tasks are
+kept by key in SQLite, in memory unless --data names a file, each as its latest fields
+with the sequence number and the (stamp, device) of every field's last change, indexed
+by the sequence number of the task's latest change, so a pull reads only what changed
+since. It is a stand-in for a hosted server, for development and tests: there are no
+accounts and no authentication. Qt-free, like core.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sync import decode, encode
+
+
+class SyncServer:
+    """Task states and the change sequence, settling conflicting changes the same way for every device"""
+
+    LIMIT = 2000  # Most changes returned per request
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS tasks (key TEXT PRIMARY KEY, rev INTEGER NOT NULL, record TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS idx_tasks_rev ON tasks(rev);
+    """
+
+    def __init__(self, path=":memory:"):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+
+    def seq(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'seq'").fetchone()
+        return row[0] if row else 0
+
+    def sync(self, request):
+        """Takes in a device's changes, then returns the changes made since its `since`"""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                seq = self.seq()
+                for change in request["changes"]:
+                    seq = self._push(change, request["node"], seq)
+                self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('seq', ?)", (seq,))
+                limit = max(1, min(int(request.get("limit", self.LIMIT)), self.LIMIT))
+                rows = self.conn.execute(
+                    "SELECT key, rev, record FROM tasks WHERE rev > ? ORDER BY rev LIMIT ?",
+                    (request["since"], limit + 1)).fetchall()
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = []
+        for key, rev, record in rows:
+            record = json.loads(record)
+            changes.append({"key": key, "rev": rev, "deleted": record["deleted"], "fields": record["fields"]})
+        return {"seq": rows[-1][1] if more else seq, "changes": changes, "more": more}
+
+    def _push(self, change, node, seq):
+        """
+        Applies one change and returns the sequence number reached. A field goes to the change
+        if nobody changed it since the version the device based its change on, or else if the
+        change is the later one by (stamp, device); a deletion beats any edit, before or after.
+        """
+        key = change["key"]
+        row = self.conn.execute("SELECT record FROM tasks WHERE key = ?", (key,)).fetchone()
+        stamp = [change["stamp"], node]
+        if row is None:
+            record = {"deleted": False, "fields": {}, "revs": {}, "stamps": {}}
+        else:
+            record = json.loads(row[0])
+            if record["deleted"]:
+                return seq
+        if change.get("deleted"):
+            record["deleted"] = True
+        else:
+            applied = False
+            for name, value in change["fields"].items():
+                if record["revs"].get(name, 0) <= change["base"] or stamp > record["stamps"][name]:
+                    record["fields"][name] = value
+                    record["revs"][name] = seq + 1
+                    record["stamps"][name] = stamp
+                    applied = True
+            if not applied:
+                return seq
+        seq += 1
+        self.conn.execute("INSERT OR REPLACE INTO tasks (key, rev, record) VALUES (?, ?, ?)",
+                          (key, seq, json.dumps(record, separators=(",", ":"))))
+        return seq
+
+    def close(self):
+        self.conn.close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "JaxTodoSync/1"
+
+    def do_POST(self):
+        if self.path != "/sync":
+            self.send_error(404)
+            return
+        try:
+            request = decode(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            body = encode(self.server.store.sync(request))
+        except (ValueError, KeyError, TypeError, zlib.error) as e:
+            self.send_error(400, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "deflate")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, path=":memory:"):
+    """Starts a server on localhost in a background thread and returns it; its URL is server.url"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.store = SyncServer(path)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reference sync server for Jax TODO, on localhost.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default=":memory:", help="SQLite file to keep tasks in (default: memory)")
+    args = parser.parse_args(argv)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    server.daemon_threads = True
+    server.store = SyncServer(args.data)
+    print(f"Serving on http://127.0.0.1:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.store.close()
+
+
+if __name__ == "__main__":
+    main()
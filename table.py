@@ -0,0 +1,456 @@
+"""
+Columnar in-memory task table.
+
+Tasks are stored by column rather than as an object per task: due times in an array of
+64-bit epoch seconds, flags in a bytearray, recurrence rules as small indexes into the
+list of distinct rules, and texts and order keys packed end to end in string pools. Every
+column is indexed by task id directly, as ids are handed out densely. The display order is
+an array of ids kept sorted by (completed, order key, id). A task costs about 45 bytes plus
+its text, so a million tasks fit in well under 100 MB.
+
+Bulk queries run column-wide in C through the standard library, with no Python loop per
+task: flags are turned into masks with bytes.translate, and columns are filtered with
+itertools.compress and compared with map. Qt-free, like core.
+"""
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress, islice
+from operator import itemgetter
+
+PRESENT = 1
+COMPLETED = 2
+DONE = PRESENT | COMPLETED
+
+# Flag byte -> 1 if the task is in the set, else 0; for bytes.translate
+ACTIVE_MASK = bytes(int(flags == PRESENT) for flags in range(256))
+DONE_MASK = bytes(int(flags == DONE) for flags in range(256))
+
+
+class StringPool:
+    """
+    Strings of a column packed end to end in one bytearray, found by slot through offset
+    and length arrays. A string that grows is appended and its old bytes left dead; the
+    pool is compacted once more than half of it is dead.
+    """
+
+    COMPACT_MIN = 64 * 1024  # Pools smaller than this are never compacted
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.data = bytearray()
+        self.offsets = array("q")
+        self.lengths = array("i")
+        self.dead = 0
+
+    def grow(self, count):
+        self.offsets.frombytes(bytes(count * self.offsets.itemsize))
+        self.lengths.frombytes(bytes(count * self.lengths.itemsize))
+
+    def get(self, slot):
+        start = self.offsets[slot]
+        return str(self.data[start:start + self.lengths[slot]], self.encoding)
+
+    def encoded(self, slot):
+        start = self.offsets[slot]
+        return bytes(self.data[start:start + self.lengths[slot]])
+
+    def set(self, slot, text):
+        self.set_encoded(slot, text.encode(self.encoding))
+
+    def set_encoded(self, slot, data):
+        """Stores already encoded bytes, overwriting the old ones in place when they fit"""
+        length = len(data)
+        old_length = self.lengths[slot]
+        if length <= old_length:
+            start = self.offsets[slot]
+            self.data[start:start + length] = data
+            self.dead += old_length - length
+        else:
+            self.offsets[slot] = len(self.data)
+            self.data += data
+            self.dead += old_length
+        self.lengths[slot] = length
+        if self.dead > len(self.data) // 2 and len(self.data) > self.COMPACT_MIN:
+            self.compact()
+
+    def clear(self, slot):
+        self.dead += self.lengths[slot]
+        self.lengths[slot] = 0
+
+    def compact(self):
+        """Copies the live strings into a fresh buffer"""
+        data, offsets, lengths = bytearray(), self.offsets, self.lengths
+        old = memoryview(self.data)
+        for slot, length in enumerate(lengths):
+            if length:
+                start = offsets[slot]
+                offsets[slot] = len(data)
+                data += old[start:start + length]
+        old.release()
+        self.data = data
+        self.dead = 0
+
+    def nbytes(self):
+        return sys.getsizeof(self.data) + sys.getsizeof(self.offsets) + sys.getsizeof(self.lengths)
+
+    def recount(self):
+        """Recomputes the dead bytes after the offsets and lengths were set directly"""
+        self.dead = len(self.data) - sum(self.lengths)
+
+
+class DisplayOrder:
+    """
+    Task ids sorted by a key function, kept in blocks of up to 2 * LOAD ids beside the key
+    of each block's last id. A search bisects those block maxima in C, then one block through
+    the key function, and an insertion or removal only shifts the ids of one block.
+    """
+
+    LOAD = 512
+
+    def __init__(self, sort_key, ids=()):
+        self.sort_key = sort_key
+        ids = array("q", ids)
+        self.blocks = [ids[start:start + self.LOAD] for start in range(0, len(ids), self.LOAD)]
+        self.maxes = [sort_key(block[-1]) for block in self.blocks]
+        self.count = len(ids)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def _locate(self, position, bisect):
+        """(block, index) at which `position` sorts, by bisect_left or bisect_right"""
+        i = bisect(self.maxes, position)
+        if i == len(self.blocks):
+            return i - 1, len(self.blocks[-1])
+        return i, bisect(self.blocks[i], position, key=self.sort_key)
+
+    def insert(self, task_id):
+        position = self.sort_key(task_id)
+        self.count += 1
+        if not self.blocks:
+            self.blocks.append(array("q", (task_id,)))
+            self.maxes.append(position)
+            return
+        i, j = self._locate(position, bisect_right)
+        block = self.blocks[i]
+        block.insert(j, task_id)
+        if j == len(block) - 1:
+            self.maxes[i] = position
+        if len(block) > 2 * self.LOAD:
+            self.blocks.insert(i + 1, block[self.LOAD:])
+            del block[self.LOAD:]
+            self.maxes.insert(i, self.sort_key(block[-1]))
+
+    def remove(self, task_id):
+        """Takes out a task, which must still have the key it was inserted with"""
+        i, j = self._locate(self.sort_key(task_id), bisect_left)
+        block = self.blocks[i]
+        del block[j]
+        self.count -= 1
+        if not block:
+            del self.blocks[i]
+            del self.maxes[i]
+        elif j == len(block):
+            self.maxes[i] = self.sort_key(block[-1])
+
+    def rank(self, position, bisect=bisect_left):
+        """Number of ids sorting before `position`, or up to it with bisect_right"""
+        if not self.blocks:
+            return 0
+        i, j = self._locate(position, bisect)
+        return sum(map(len, islice(self.blocks, i))) + j
+
+    def slice(self, start, stop):
+        """Ids from the `start`th up to the `stop`th, in order"""
+        ids = []
+        offset = 0
+        for block in self.blocks:
+            if offset >= stop:
+                break
+            end = offset + len(block)
+            if end > start:
+                ids += block[max(0, start - offset):stop - offset].tolist()
+            offset = end
+        return ids
+
+    def after(self, position, limit):
+        """Up to `limit` ids sorting after `position`, or from the first if it is None"""
+        if not self.blocks:
+            return []
+        i, j = (0, 0) if position is None else self._locate(position, bisect_right)
+        ids = self.blocks[i][j:j + limit].tolist()
+        while len(ids) < limit and i + 1 < len(self.blocks):
+            i += 1
+            ids += self.blocks[i][:limit - len(ids)].tolist()
+        return ids
+
+    def before(self, position):
+        """The last id sorting before `position`, or None"""
+        if not self.blocks:
+            return None
+        i, j = self._locate(position, bisect_left)
+        if j:
+            return self.blocks[i][j - 1]
+        return self.blocks[i - 1][-1] if i else None
+
+    def last(self):
+        return self.blocks[-1][-1] if self.blocks else None
+
+    def nbytes(self):
+        return (sys.getsizeof(self.blocks) + sum(map(sys.getsizeof, self.blocks)) + sys.getsizeof(self.maxes)
+                + sum(sys.getsizeof(position) + sys.getsizeof(position[1]) for position in self.maxes))
+
+
+class TaskTable:
+    """
+    Tasks as columns indexed by id, with their display order. Rows come out as
+    (id, text, due, completed, order_key, repeat) tuples like a store's.
+    """
+
+    def __init__(self, ordered=True):
+        self.due = array("q")
+        self.flags = bytearray()  # PRESENT and COMPLETED bits
+        self.rules = array("H")  # Index into rule_names
+        self.rule_names = [""]
+        self.rule_index = {"": 0}
+        self.texts = StringPool("utf-8")
+        self.keys = StringPool("ascii")
+        # Ids sorted by (completed, order_key, id); None while loading, until reindex()
+        self.order = DisplayOrder(self._sort_key) if ordered else None
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, task_id):
+        return 0 <= task_id < len(self.flags) and bool(self.flags[task_id] & PRESENT)
+
+    def reserve(self, size):
+        """Makes room for ids below `size`"""
+        extra = size - len(self.flags)
+        if extra <= 0:
+            return
+        self.due.frombytes(bytes(8 * extra))
+        self.flags += bytes(extra)
+        self.rules.frombytes(bytes(2 * extra))
+        self.texts.grow(extra)
+        self.keys.grow(extra)
+
+    def _slot(self, task_id):
+        """Makes room for a new id, growing the columns by a fraction at a time"""
+        capacity = len(self.flags)
+        if task_id >= capacity:
+            self.reserve(max(task_id + 1, capacity + capacity // 8 + 256))
+
+    # Reading
+
+    def ids(self):
+        """Ids of every task, ascending"""
+        return compress(range(len(self.flags)), self.flags)
+
+    def completed(self, task_id):
+        return bool(self.flags[task_id] & COMPLETED)
+
+    def text(self, task_id):
+        return self.texts.get(task_id)
+
+    def order_key(self, task_id):
+        return self.keys.get(task_id)
+
+    def repeat(self, task_id):
+        return self.rule_names[self.rules[task_id]]
+
+    def row(self, task_id):
+        return (task_id, self.texts.get(task_id), self.due[task_id], self.flags[task_id] >> 1,
+                self.keys.get(task_id), self.rule_names[self.rules[task_id]])
+
+    def rows(self, task_ids):
+        """Rows of the given tasks, skipping missing ones"""
+        return [self.row(task_id) for task_id in task_ids if task_id in self]
+
+    def position(self, task_id):
+        """The (completed, order_key, id) a task is sorted by in the display order"""
+        return (self.flags[task_id] >> 1, self.keys.get(task_id), task_id)
+
+    # Writing
+
+    def insert(self, task_id, text, due, completed, order_key, repeat=""):
+        """Adds a task, replacing any task with the same id"""
+        self.insert_encoded(task_id, text.encode("utf-8"), due, completed, order_key.encode("ascii"), repeat)
+
+    def insert_encoded(self, task_id, text, due, completed, order_key, repeat=""):
+        """Adds a task whose text and order key are given as UTF-8 and ASCII bytes"""
+        self._slot(task_id)
+        if self.flags[task_id] & PRESENT:
+            self.remove(task_id)
+        self.due[task_id] = due
+        self.flags[task_id] = DONE if completed else PRESENT
+        self.rules[task_id] = self._rule(repeat)
+        self.texts.set_encoded(task_id, text)
+        self.keys.set_encoded(task_id, order_key)
+        self.count += 1
+        if self.order is not None:
+            self.order.insert(task_id)
+
+    def remove(self, task_id):
+        """Deletes a task; returns whether it existed"""
+        if task_id not in self:
+            return False
+        if self.order is not None:
+            self.order.remove(task_id)
+        self.flags[task_id] = 0
+        self.texts.clear(task_id)
+        self.keys.clear(task_id)
+        self.count -= 1
+        return True
+
+    def load_packed(self, rows, blob):
+        """
+        Bulk-loads rows of (id, due, completed, offset, text length, key length, rule length)
+        into an empty table, reading each task's text, order key and rule from `blob` at
+        `offset`, one after the other. The blob is copied once and becomes the buffer of both
+        string pools, shared until either is compacted.
+        """
+        data = bytearray(blob)
+        self.texts.data = self.keys.data = data
+        due, flags, rules, rule = self.due, self.flags, self.rules, self._rule
+        text_offsets, text_lengths = self.texts.offsets, self.texts.lengths
+        key_offsets, key_lengths = self.keys.offsets, self.keys.lengths
+        count = 0
+        for task_id, task_due, completed, offset, text_length, key_length, rule_length in rows:
+            if task_id >= len(flags):
+                self.reserve(task_id + 1)
+            due[task_id] = task_due
+            flags[task_id] = DONE if completed else PRESENT
+            text_offsets[task_id] = offset
+            text_lengths[task_id] = text_length
+            key_offsets[task_id] = offset = offset + text_length
+            key_lengths[task_id] = key_length
+            if rule_length:
+                offset += key_length
+                rules[task_id] = rule(str(data[offset:offset + rule_length], "ascii"))
+            count += 1
+        self.count = count
+        self.texts.recount()
+        self.keys.recount()
+
+    def set_text(self, task_id, text):
+        self.texts.set(task_id, text)
+
+    def set_due(self, task_id, due):
+        self.due[task_id] = due
+
+    def set_repeat(self, task_id, repeat):
+        self.rules[task_id] = self._rule(repeat)
+
+    def set_position(self, task_id, completed, order_key):
+        """Sets the completed flag and order key, moving the task in the display order"""
+        if self.order is not None:
+            self.order.remove(task_id)
+        self.flags[task_id] = DONE if completed else PRESENT
+        self.keys.set(task_id, order_key)
+        if self.order is not None:
+            self.order.insert(task_id)
+
+    def _rule(self, repeat):
+        """Interned index of a recurrence rule"""
+        index = self.rule_index.get(repeat)
+        if index is None:
+            index = self.rule_index[repeat] = len(self.rule_names)
+            self.rule_names.append(repeat)
+        return index
+
+    # Display order
+
+    def reindex(self):
+        """Sorts every task into the display order at once, after a bulk load"""
+        # Sort keys are built and compared as in _sort_key, but all in C
+        ids = list(self.ids())
+        keys = self.keys
+        starts = list(map(keys.offsets.__getitem__, ids))
+        ends = map(int.__add__, starts, map(keys.lengths.__getitem__, ids))
+        key_bytes = map(keys.data.__getitem__, map(slice, starts, ends))
+        positions = sorted(zip(map(self.flags.__getitem__, ids), key_bytes, ids))
+        self.order = DisplayOrder(self._sort_key, map(itemgetter(2), positions))
+
+    def _sort_key(self, task_id):
+        """The position as compared in the display order: (flags, key bytes, id), decoding nothing"""
+        keys = self.keys
+        start = keys.offsets[task_id]
+        return (self.flags[task_id], keys.data[start:start + keys.lengths[task_id]], task_id)
+
+    def page(self, after, limit):
+        """Ids of up to `limit` tasks in display order, after the position `after` (None for the top)"""
+        if after is not None:
+            completed, order_key, task_id = after
+            after = (DONE if completed else PRESENT, order_key.encode("ascii"), task_id)
+        return self.order.after(after, limit)
+
+    def max_order_key(self, completed):
+        """Largest order key in the active or completed section, or None if it is empty"""
+        if completed:
+            task_id = self.order.last()
+            return self.keys.get(task_id) if task_id is not None and self.flags[task_id] == DONE else None
+        task_id = self.order.before((DONE,))  # Sorts before every completed task
+        return self.keys.get(task_id) if task_id is not None else None
+
+    # Bulk queries
+
+    def dues(self):
+        """(id, due, completed) of every task"""
+        flags = self.flags
+        return list(zip(self.ids(), compress(self.due, flags), compress(flags.translate(DONE_MASK), flags)))
+
+    def due_tasks(self, after, until):
+        """(id, due) of active tasks due in the interval (after, until]"""
+        active = self.flags.translate(ACTIVE_MASK)
+        window = range(after + 1, until + 1)  # Membership in a range is a comparison, in C
+        due = self.due
+        return [(task_id, due[task_id]) for task_id in compress(
+            compress(range(len(active)), active), map(window.__contains__, compress(due, active)))]
+
+    def completed_tasks(self, until, limit):
+        """(id, due) of up to `limit` completed tasks due by `until`, ascending by id"""
+        done = self.flags.translate(DONE_MASK)
+        due = self.due
+        return [(task_id, due[task_id]) for task_id in islice(compress(
+            compress(range(len(done)), done), map(until.__ge__, compress(due, done))), limit)]
+
+    def count_overdue(self, now):
+        """Number of active tasks due by `now`"""
+        return sum(map(now.__ge__, compress(self.due, self.flags.translate(ACTIVE_MASK))))
+
+    def completed_ids(self):
+        """Ids of every completed task, ascending"""
+        return list(compress(range(len(self.flags)), self.flags.translate(DONE_MASK)))
+
+    def ids_by_due(self, completed=False):
+        """Ids of the active or completed tasks, earliest due first, ties by id"""
+        mask = self.flags.translate(DONE_MASK if completed else ACTIVE_MASK)
+        # A stable sort of ascending ids keeps ties in id order
+        return sorted(compress(range(len(mask)), mask), key=self.due.__getitem__)
+
+    # Memory
+
+    def memory_report(self):
+        """Allocated bytes by column, with the total and the average per task"""
+        keys = self.keys.nbytes()
+        if self.keys.data is self.texts.data:
+            keys -= sys.getsizeof(self.keys.data)  # Counted with the texts
+        report = {
+            "due": sys.getsizeof(self.due),
+            "flags": sys.getsizeof(self.flags),
+            "rules": sys.getsizeof(self.rules) + sum(map(sys.getsizeof, self.rule_names)),
+            "texts": self.texts.nbytes(),
+            "order_keys": keys,
+            "order": self.order.nbytes() if self.order is not None else 0,
+        }
+        total = sum(report.values())
+        report.update(tasks=self.count, capacity=len(self.flags), total=total,
+                      per_task=total / self.count if self.count else 0.0)
+        return report
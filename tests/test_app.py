@@ -0,0 +1,88 @@
+import os
+import random
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QPersistentModelIndex
+from PyQt6.QtWidgets import QApplication
+
+from app import TaskBucketModel, TaskSearchModel, row_changes
+from core import TaskList
+from store import MemoryStore
+
+qt_app = QApplication.instance() or QApplication([])
+
+
+def test_row_changes_rebuild_the_new_order():
+    rng = random.Random(1)
+    for _ in range(2000):
+        old = rng.sample(range(60), rng.randint(0, 30))
+        new = [task_id for task_id in old if rng.random() < 0.8]
+        for _ in range(rng.randint(0, 3)):
+            if new:
+                new.insert(rng.randrange(len(new)), new.pop(rng.randrange(len(new))))
+        for task_id in rng.sample(range(60, 90), rng.randint(0, 4)):
+            new.insert(rng.randrange(len(new) + 1), task_id)
+        removals, insertions = row_changes(old, new)
+        ids = list(old)
+        for first, last in removals:
+            del ids[first:last + 1]
+        for row, run in insertions:
+            ids[row:row] = run
+        assert ids == new
+
+
+def test_search_refresh_keeps_rows_in_place():
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    for i in range(300):
+        tasks.add(f"task {i}", 1_700_000_000 + i)
+    model = TaskSearchModel(tasks)
+    model.build_index(wait=True)
+    model.set_query("task")
+    kept, kept_id = QPersistentModelIndex(model.index(20)), model.ids[20]
+    resets = []
+    model.modelReset.connect(lambda: resets.append(True))
+    tasks.remove_id(model.ids[1])
+    tasks.toggle_id(model.ids[5])
+    model.refresh()
+    assert not resets
+    assert model.ids[kept.row()] == kept_id
+    assert model.ids == model.search_index.search("task").fetch(len(model.ids))
+
+
+def test_bucket_refresh_keeps_rows_in_place():
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    soon = int(time.time()) + 3 * 86400
+    tasks.add_many([(f"task {i}", soon + i * 60, False, "") for i in range(300)])
+    model = TaskBucketModel(tasks, "upcoming")
+    model.reset_index()
+    kept, kept_id = QPersistentModelIndex(model.index(20)), model.ids[20]
+    resets = []
+    model.modelReset.connect(lambda: resets.append(True))
+    tasks.remove_id(model.ids[1])
+    tasks.add_many([("new", soon + 30, False, "")])
+    model.refresh()
+    assert not resets
+    assert model.ids[kept.row()] == kept_id
+    assert model.ids == model.bucket_index.ids("upcoming", 0, len(model.ids))
+
+
+def test_view_menu_switches_the_theme(tmp_path, monkeypatch):
+    monkeypatch.setenv("JAX_TODO_HOME", str(tmp_path))
+    monkeypatch.setenv("JAX_TODO_STORAGE", "memory")
+    from app import TaskManager
+
+    window = TaskManager()
+    light = next(action for menu in window.menuBar().actions() if menu.text() == "&View"
+                 for action in menu.menu().actions() if action.text() == "&Light theme")
+    assert not light.isChecked() and window.styles.theme == "dark"
+    light.setChecked(True)
+    assert window.styles.theme == "light"
+    assert window.task_delegate.styles is window.styles
+    assert window.styles.color_bg_medium in qt_app.styleSheet()
+    light.setChecked(False)
+    assert window.styles.theme == "dark"
+    window.close()
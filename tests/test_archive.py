@@ -0,0 +1,57 @@
+import time
+
+from archive import DAY, Archive, archivable_rows, archive_completed, remove_archived, restore_archived
+from core import TaskList
+from store import MemoryStore
+
+
+def test_restored_task_is_archived_again_once_it_ages(tmp_path):
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    tasks.add_many([(f"task {i}", 1_000_000 + i, True, "") for i in range(10)])
+    archive = Archive(str(tmp_path / "archive"))
+    cutoff = int(time.time()) - 30 * DAY
+    assert archive_completed(tasks, archive, cutoff) == 10
+
+    restored = [row[0] for row in archive.rows()][:3]
+    assert len(restore_archived(tasks, archive, restored)) == 3
+    assert archive_completed(tasks, archive, cutoff) == 0  # Restored since the cutoff: held back
+    assert len(archive) == 7
+
+    later = int(time.time()) + 1  # A cutoff past the restore
+    assert archive_completed(tasks, archive, later) == 3
+    assert tasks.store.dues() == []
+    assert len(archive) == 10
+    rows = list(Archive(archive.directory).rows())
+    assert sorted(row[1] for row in rows) == sorted(f"task {i}" for i in range(10))
+    assert [task.id for task in restore_archived(tasks, archive, restored[:1])] == restored[:1]
+
+
+def test_tasks_left_in_the_list_by_a_crash_are_not_archived_twice(tmp_path):
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    tasks.add_many([(f"task {i}", 1_000_000 + i, True, "") for i in range(10)])
+    archive = Archive(str(tmp_path / "archive"))
+    cutoff = int(time.time()) - 30 * DAY
+    archive.append(archivable_rows(tasks, archive, cutoff))  # Crashed before the delete was written
+    size = archive.disk_usage()
+
+    assert archive_completed(tasks, archive, cutoff) == 10
+    assert archive.disk_usage() == size
+    assert len(archive) == 10
+    assert tasks.store.dues() == []
+
+
+def test_tasks_changed_while_archiving_stay_in_the_list(tmp_path):
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    ids = [task.id for task in tasks.add_many([(f"task {i}", 1_000_000 + i, True, "") for i in range(4)])]
+    archive = Archive(str(tmp_path / "archive"))
+    rows = archivable_rows(tasks, archive, int(time.time()) - 30 * DAY)
+    archive.append(rows)
+    tasks.toggle_id(ids[0])  # Edited and deleted while the batch was being written
+    tasks.remove_many([ids[1]])
+
+    assert remove_archived(tasks, archive, rows) == 2
+    assert [row[0] for row in tasks.store.page(None, 10)] == [ids[0]]
+    assert sorted(row[0] for row in archive.rows()) == ids[2:]
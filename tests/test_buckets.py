@@ -0,0 +1,52 @@
+import random
+
+from buckets import BUCKETS, BucketIndex
+from core import TaskRecord
+from store import MemoryStore
+from table import DisplayOrder
+
+NOW = 1_700_000_000
+
+
+def expected(tasks, index):
+    """Bucket -> ids in display order, by sorting every task"""
+    buckets = {bucket: [] for bucket in BUCKETS}
+    for task_id, (due, done) in sorted(tasks.items(), key=lambda item: (item[1][0], item[0])):
+        if done:
+            buckets["done"].insert(0, task_id)
+        elif due <= index.now:
+            buckets["overdue"].append(task_id)
+        elif due < index.midnight:
+            buckets["today"].append(task_id)
+        else:
+            buckets["upcoming"].append(task_id)
+    return buckets
+
+
+def test_buckets_follow_edits_one_by_one_and_in_bulk():
+    DisplayOrder.LOAD, load = 4, DisplayOrder.LOAD  # Many small blocks
+    try:
+        rng = random.Random(3)
+        index = BucketIndex()
+        index.build(MemoryStore(), NOW)
+        tasks = {}
+        for step in range(600):
+            changes = {}
+            for _ in range(rng.choice((1, 1, 1, 300))):
+                task_id = rng.randrange(400)
+                if task_id in tasks and rng.random() < 0.3:
+                    del tasks[task_id]
+                    changes[task_id] = None
+                else:
+                    tasks[task_id] = (NOW + rng.randrange(-3, 3) * 40_000, rng.random() < 0.3)
+                    changes[task_id] = TaskRecord(task_id, "", tasks[task_id][0], tasks[task_id][1], "", "")
+            index.apply(changes)
+            if step % 50 == 0:
+                index.advance(NOW + step * 100)
+            buckets = expected(tasks, index)
+            for bucket in BUCKETS:
+                assert index.count(bucket) == len(buckets[bucket])
+                start = rng.randrange(len(buckets[bucket]) + 1)
+                assert index.ids(bucket, start, 7) == buckets[bucket][start:start + 7]
+    finally:
+        DisplayOrder.LOAD = load
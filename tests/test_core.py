@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from core import TaskList
+from history import History
+from store import MemoryStore
+
+
+def store_order(store):
+    return [row[0] for row in store.page(None, 1_000_000)]
+
+
+def fetch_all(tasks):
+    while tasks.can_fetch_more():
+        tasks.fetch_more()
+
+
+def make_list(count):
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    for i in range(count):
+        tasks.add(f"task {i}", 1_700_000_000 + i)
+    tasks.load()
+    return tasks
+
+
+def test_undo_delete_of_last_loaded_row():
+    tasks = make_list(150)
+    history = History(tasks)
+    removed = tasks.remove(TaskList.PAGE_SIZE - 1)
+    history.undo()
+    fetch_all(tasks)
+    assert tasks.row_of(removed.id) >= 0
+    assert tasks.ids == store_order(tasks.store)
+
+
+def test_add_after_every_loaded_row_is_deleted():
+    tasks = make_list(150)
+    while tasks.ids:
+        tasks.remove(0)
+    assert tasks.can_fetch_more()
+    inserted = []
+    tasks.subscribe(lambda event: event.kind == "inserted" and inserted.append((event.first, event.last)))
+    task = tasks.add("new", 1_700_000_000)
+    assert inserted == [(0, 0)] and tasks.ids == [task.id]
+    fetch_all(tasks)
+    assert tasks.ids == store_order(tasks.store)
+
+
+class SmallPages(TaskList):
+    PAGE_SIZE = 7
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_loaded_rows_follow_the_store_under_random_edits(seed):
+    rng = random.Random(seed)
+    tasks = SmallPages(MemoryStore())
+    tasks.load()
+    history = History(tasks)
+    tasks.add_many([(f"task {i}", 1_700_000_000 + i, i % 4 == 0, "") for i in range(200)])
+    tasks.load()
+    for step in range(400):
+        ids = [row[0] for row in tasks.store.dues()]
+        last = len(tasks.ids) - 1
+        op = rng.randrange(12)
+        if op == 0:
+            tasks.add(f"new {step}", 1_700_000_000)
+        elif op == 1 and tasks.ids:
+            tasks.remove(rng.choice([last, rng.randrange(len(tasks.ids))]))
+        elif op == 2 and tasks.ids:
+            tasks.toggle(rng.choice([last, rng.randrange(len(tasks.ids))]))
+        elif op == 3 and len(tasks.ids) > 1:
+            tasks.move(rng.choice([last, rng.randrange(len(tasks.ids))]), rng.randrange(len(tasks.ids)))
+        elif op == 4 and ids:
+            tasks.remove_many(rng.sample(ids, min(len(ids), rng.randint(1, 9))) + tasks.ids[-1:])
+        elif op == 5 and ids:
+            tasks.complete_many(rng.sample(ids, min(len(ids), rng.randint(1, 9))), rng.random() < 0.6)
+        elif op == 6 and ids:
+            tasks.move_many(rng.sample(ids, min(len(ids), rng.randint(1, 5))) + tasks.ids[-1:],
+                            rng.randint(0, len(tasks.ids)))
+        elif op == 7 and ids:
+            tasks.reschedule_many(rng.sample(ids, min(len(ids), rng.randint(1, 5))), 1_700_000_000 + step)
+        elif op in (8, 9):
+            history.undo()
+        elif op == 10:
+            history.redo()
+        elif tasks.can_fetch_more():
+            tasks.fetch_more()
+        order = store_order(tasks.store)
+        assert tasks.ids == order[:len(tasks.ids)], step
+        assert tasks.active_rows == sum(1 for task_id in tasks.ids if not tasks._read_task(task_id).completed)
+        if rng.random() < 0.02:
+            fetch_all(tasks)
+            assert tasks.ids == store_order(tasks.store), step
+            tasks.load()
+    fetch_all(tasks)
+    assert tasks.ids == store_order(tasks.store)
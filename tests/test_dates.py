@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+from dates import parse_due_text
+
+NOW = datetime(2026, 2, 27, 22, 45)  # A Friday, late, near the end of February
+
+
+@pytest.mark.parametrize("text, due", [
+    ("today", datetime(2026, 2, 27, 22, 45)),
+    ("tomorrow 9am", datetime(2026, 2, 28, 9, 0)),
+    ("9am tomorrow", datetime(2026, 2, 28, 9, 0)),
+    ("tonight", datetime(2026, 2, 27, 20, 0)),
+    ("fri", datetime(2026, 3, 6, 22, 45)),  # Today is Friday: a week ahead
+    ("next fri", datetime(2026, 3, 6, 22, 45)),
+    ("saturday noon", datetime(2026, 2, 28, 12, 0)),
+    ("12am", datetime(2026, 2, 27, 0, 0)),
+    ("12pm", datetime(2026, 2, 27, 12, 0)),
+    ("midnight", datetime(2026, 2, 27, 0, 0)),
+    ("+90m", datetime(2026, 2, 28, 0, 15)),  # Past midnight
+    ("in 2 days", datetime(2026, 3, 1, 22, 45)),  # Past the end of February
+    ("+1w 0800", datetime(2026, 3, 6, 8, 0)),
+    ("010326", datetime(2026, 3, 1, 22, 45)),
+    ("2028-02-29 17:30", datetime(2028, 2, 29, 17, 30)),
+    ("  Tomorrow   23:59 ", datetime(2026, 2, 28, 23, 59)),
+])
+def test_understood(text, due):
+    assert parse_due_text(text, NOW) == due
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "2026-02-29",  # Not a leap year
+    "300226",  # 30 February
+    "2026-13-01",
+    "24:00",
+    "2360",
+    "13pm",
+    "0am",
+    "tomorrow today",  # Two dates
+    "5pm 17:00",  # Two times
+    "fri9am",
+    "in days",
+    "soon",
+])
+def test_not_understood(text):
+    assert parse_due_text(text, NOW) is None
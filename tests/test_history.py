@@ -0,0 +1,76 @@
+from core import TaskList
+from history import History
+from store import MemoryStore
+
+DUE = 1_700_000_000
+
+
+def make_history(count):
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    ids = [tasks.add(f"task {i}", DUE + i).id for i in range(count)]
+    return tasks, History(tasks), ids
+
+
+def text_of(tasks, task_id):
+    return tasks.store.get_many([task_id])[0][1]
+
+
+def test_repeated_edits_of_one_task_undo_as_one_step():
+    tasks, history, ids = make_history(2)
+    for text in ("draft", "draft two", "final"):
+        tasks.edit_id(ids[0], text, DUE)
+    assert len(history.undo_stack) == 1
+
+    history.undo()
+    assert text_of(tasks, ids[0]) == "task 0"
+    assert not history.can_undo()
+    history.redo()
+    assert text_of(tasks, ids[0]) == "final"
+
+
+def test_edits_of_other_tasks_or_kinds_are_separate_steps():
+    tasks, history, ids = make_history(2)
+    tasks.edit_id(ids[0], "a", DUE)
+    tasks.edit_id(ids[1], "b", DUE)
+    tasks.edit_id(ids[1], "c", DUE)
+    tasks.toggle_id(ids[1])
+    tasks.toggle_id(ids[1])
+    assert len(history.undo_stack) == 4  # Edit, edits merged, then each toggle
+
+    history.undo()
+    history.undo()
+    history.undo()
+    assert text_of(tasks, ids[1]) == "task 1"
+    assert text_of(tasks, ids[0]) == "a"
+
+
+def test_edit_back_to_the_start_leaves_nothing_to_undo():
+    tasks, history, ids = make_history(1)
+    tasks.edit_id(ids[0], "changed", DUE)
+    tasks.edit_id(ids[0], "task 0", DUE)
+    assert not history.can_undo()
+
+
+def test_edit_after_undo_starts_a_new_step():
+    tasks, history, ids = make_history(1)
+    tasks.edit_id(ids[0], "one", DUE)
+    tasks.edit_id(ids[0], "two", DUE)
+    history.undo()
+    tasks.edit_id(ids[0], "three", DUE)
+    assert len(history.undo_stack) == 1 and not history.can_redo()
+    history.undo()
+    assert text_of(tasks, ids[0]) == "task 0"
+
+
+def test_repeated_moves_of_one_task_undo_as_one_step():
+    tasks, history, ids = make_history(5)
+    order = [row[0] for row in tasks.store.page(None, 10)]
+    moved = order[0]
+    for target in (2, 4, 5):
+        tasks.move(tasks.row_of(moved), target)
+    assert [row[0] for row in tasks.store.page(None, 10)][-1] == moved
+    assert len(history.undo_stack) == 1
+
+    history.undo()
+    assert [row[0] for row in tasks.store.page(None, 10)] == order
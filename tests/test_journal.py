@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from journal import JournalStore
+
+
+def write_tasks(directory, count):
+    store = JournalStore(str(directory))
+    for i in range(count):
+        store.add(f"task {i}", 1_700_000_000 + i, False, f"k{i:04d}")
+    store.close()
+
+
+def texts(store):
+    return [row[1] for row in store.page(None, 1000)]
+
+
+def test_torn_last_record_is_dropped(tmp_path):
+    write_tasks(tmp_path, 5)
+    path = tmp_path / "tasks.journal"
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+    store = JournalStore(str(tmp_path))
+    assert texts(store) == [f"task {i}" for i in range(4)]
+    store.add("after", 0, False, "k9999")
+    store.close()
+    assert len(texts(JournalStore(str(tmp_path)))) == 5
+
+
+def test_zero_filled_tail_is_dropped(tmp_path):
+    write_tasks(tmp_path, 3)
+    with open(tmp_path / "tasks.journal", "ab") as f:
+        f.write(bytes(4096))
+    store = JournalStore(str(tmp_path))
+    assert len(texts(store)) == 3
+    store.close()
+
+
+def test_corrupt_record_before_others_keeps_the_journal(tmp_path):
+    write_tasks(tmp_path, 5)
+    path = tmp_path / "tasks.journal"
+    data = bytearray(path.read_bytes())
+    data[JournalStore.JOURNAL_HEADER.size + JournalStore.RECORD_HEADER.size + 12] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        JournalStore(str(tmp_path))
+    assert path.read_bytes() == bytes(data)
+
+
+def test_corrupt_length_before_others_keeps_the_journal(tmp_path):
+    write_tasks(tmp_path, 5)
+    path = tmp_path / "tasks.journal"
+    data = bytearray(path.read_bytes())
+    JournalStore.RECORD_HEADER.pack_into(data, JournalStore.JOURNAL_HEADER.size, 0x7FFFFFFF, 0)
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        JournalStore(str(tmp_path))
+    assert path.read_bytes() == bytes(data)
+
+
+def test_recover_sets_a_damaged_journal_aside(tmp_path):
+    write_tasks(tmp_path, 5)
+    path = tmp_path / "tasks.journal"
+    data = bytearray(path.read_bytes())
+    size = JournalStore.RECORD_HEADER.size
+    first = JournalStore.JOURNAL_HEADER.size
+    second = first + size + JournalStore.RECORD_HEADER.unpack_from(data, first)[0]
+    data[second + size + 12] ^= 0xFF
+    path.write_bytes(bytes(data))
+    store = JournalStore(str(tmp_path), recover=True)
+    assert texts(store) == ["task 0"]
+    assert len(store.recovered) == 1 and open(store.recovered[0], "rb").read() == bytes(data)
+    store.add("after", 0, False, "k9999")
+    store.close()
+    assert texts(JournalStore(str(tmp_path))) == ["task 0", "after"]
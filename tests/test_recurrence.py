@@ -0,0 +1,54 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from recurrence import next_due, parse_rule, upcoming
+
+
+@pytest.fixture(autouse=True)
+def new_york(monkeypatch):
+    """Local time with US daylight saving: clocks go forward on 2026-03-08 and back on 2026-11-01"""
+    monkeypatch.setenv("TZ", "EST5EDT,M3.2.0,M11.1.0")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def at(*fields):
+    return int(datetime(*fields).timestamp())
+
+
+def local(timestamps):
+    return [datetime.fromtimestamp(timestamp) for timestamp in timestamps]
+
+
+def test_daily_keeps_the_time_of_day_across_daylight_saving():
+    assert local(upcoming("days:1", at(2026, 3, 7, 9, 0), 3)) == [
+        datetime(2026, 3, 7, 9, 0), datetime(2026, 3, 8, 9, 0), datetime(2026, 3, 9, 9, 0)]
+    assert at(2026, 3, 8, 9, 0) - at(2026, 3, 7, 9, 0) == 23 * 3600
+    assert local([next_due("weekly:6", at(2026, 10, 25, 9, 0), at(2026, 10, 25, 9, 0))]) == [
+        datetime(2026, 11, 1, 9, 0)]
+
+
+def test_hourly_keeps_exact_intervals_across_daylight_saving():
+    occurrences = upcoming("hours:6", at(2026, 3, 8, 0, 0), 4)
+    assert [b - a for a, b in zip(occurrences, occurrences[1:])] == [6 * 3600] * 3
+    assert local(occurrences)[1] == datetime(2026, 3, 8, 7, 0)  # The skipped hour shifts the clock
+
+
+def test_monthly_falls_back_to_the_last_day_of_shorter_months():
+    assert local(upcoming("monthly:31", at(2026, 1, 31, 9, 0), 4)) == [
+        datetime(2026, 1, 31, 9, 0), datetime(2026, 2, 28, 9, 0),
+        datetime(2026, 3, 31, 9, 0), datetime(2026, 4, 30, 9, 0)]
+    assert local([next_due("monthly:29", at(2027, 12, 29, 9, 0), at(2027, 12, 30, 0, 0))]) == [
+        datetime(2028, 1, 29, 9, 0)]
+    assert local(upcoming(parse_rule("monthly", at(2028, 1, 30, 9, 0)), at(2028, 1, 30, 9, 0), 2)) == [
+        datetime(2028, 1, 30, 9, 0), datetime(2028, 2, 29, 9, 0)]
+
+
+def test_next_due_skips_occurrences_already_missed():
+    due = at(2026, 3, 1, 9, 0)
+    assert local([next_due("days:3", due, at(2026, 3, 20, 12, 0))]) == [datetime(2026, 3, 22, 9, 0)]
+    assert local([next_due("weekly:0,4", due, at(2026, 3, 20, 12, 0))]) == [datetime(2026, 3, 23, 9, 0)]
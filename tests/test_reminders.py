@@ -0,0 +1,50 @@
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+from reminders import ReminderScheduler
+from store import TaskStore
+
+qt_app = QApplication.instance() or QApplication([])
+
+
+def test_reminders_missed_while_closed_are_shown_as_one_notice(tmp_path, monkeypatch):
+    monkeypatch.setenv("JAX_TODO_HOME", str(tmp_path))
+    now = int(time.time())
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    for text, due, completed in [("before last run", now - 7200, False), ("pay rent", now - 1800, False),
+                                 ("call bank", now - 1200, False), ("water plants", now - 900, False),
+                                 ("book dentist", now - 600, False), ("done already", now - 300, True),
+                                 ("later", now + 3600, False)]:
+        store.add(text, due, completed, f"{due:012d}")
+    store.close()
+    with open(tmp_path / "reminders.state", "w") as f:
+        f.write(str(now - 3600))  # Last run an hour ago
+
+    from app import TaskManager
+
+    window = TaskManager()
+    qt_app.processEvents()
+    message = window.reminder_label.text()
+    assert message.startswith("4 tasks are due: ") and message.endswith(", … (while the app was closed)")
+    assert "before last run" not in message and "done already" not in message
+    assert list(window.reminders.pending.values()) == [now + 3600]
+    window.close()
+
+
+def test_start_reports_only_tasks_due_since_the_last_run(tmp_path):
+    now = int(time.time())
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    ids = [store.add(f"task {i}", due, False, f"{i:06d}") for i, due in enumerate((now - 60, now + 60))]
+    scheduler = ReminderScheduler(str(tmp_path / "reminders.state"))
+    assert scheduler.start(store) == []  # First run: nothing to catch up on
+    scheduler.stop()
+
+    restarted = ReminderScheduler(str(tmp_path / "reminders.state"))
+    assert restarted.start(store) == []
+    assert restarted.pending == {ids[1]: now + 60}
+    restarted.stop()
+    store.close()
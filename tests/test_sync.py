@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from core import TaskList
+from store import MemoryStore
+from sync import SyncClient, post
+from sync_server import serve
+
+DUE = 1_700_000_000
+
+
+@pytest.fixture
+def server():
+    server = serve()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.store.close()
+
+
+def device(tmp_path, name):
+    tasks = TaskList(MemoryStore())
+    tasks.load()
+    return tasks, SyncClient(tasks, str(tmp_path / f"{name}.db"))
+
+
+def sync(client, url):
+    while client.apply(post(url, client.request()))["more"]:
+        pass
+
+
+def rows(tasks):
+    return sorted(row[1:4] for row in tasks.store.page(None, 100))
+
+
+def test_round_trip_settles_a_conflicting_edit(tmp_path, server):
+    a_tasks, a = device(tmp_path, "a")
+    b_tasks, b = device(tmp_path, "b")
+    task_id = a_tasks.add("buy milk", DUE).id
+    a_tasks.add("call mum", DUE + 60)
+    sync(a, server.url)
+    sync(b, server.url)
+    assert rows(b_tasks) == rows(a_tasks)
+
+    # Both edit the text between syncs, the later edit on b, which also completes the task
+    a_tasks.edit_id(task_id, "buy oat milk", DUE)
+    time.sleep(0.01)
+    b_id = next(row[0] for row in b_tasks.store.page(None, 100) if row[1] == "buy milk")
+    b_tasks.edit_id(b_id, "buy soy milk", DUE)
+    b_tasks.toggle_id(b_id)
+    sync(a, server.url)
+    sync(b, server.url)
+    sync(a, server.url)
+    assert rows(a_tasks) == rows(b_tasks) == [("buy soy milk", DUE, True), ("call mum", DUE + 60, False)]
+
+    # A deletion beats an edit made after it
+    a_tasks.remove_many([task_id])
+    time.sleep(0.01)
+    b_tasks.edit_id(b_id, "buy rice milk", DUE)
+    sync(a, server.url)
+    sync(b, server.url)
+    sync(a, server.url)
+    assert rows(a_tasks) == rows(b_tasks) == [("call mum", DUE + 60, False)]
+    a.close()
+    b.close()
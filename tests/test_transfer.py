@@ -0,0 +1,25 @@
+import io
+import json
+
+from core import TaskList
+from store import MemoryStore, TaskStore
+from transfer import CHUNK_SIZE, export_steps
+
+
+def exported(store):
+    f = io.StringIO()
+    for _ in export_steps(store, f, "jsonl"):
+        pass
+    return [json.loads(line) for line in f.getvalue().splitlines()]
+
+
+def test_export_more_than_a_chunk(tmp_path):
+    count = CHUNK_SIZE + CHUNK_SIZE // 2
+    for store in (MemoryStore(), TaskStore(str(tmp_path / "tasks.db"))):
+        tasks = TaskList(store)
+        tasks.load()
+        tasks.add_many([(f"task {i}", 1_700_000_000 + i, i % 5 == 0, "") for i in range(count)])
+        rows = exported(store)
+        assert len(rows) == count
+        assert sorted(row["text"] for row in rows) == sorted(f"task {i}" for i in range(count))
+        store.close()
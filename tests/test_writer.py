@@ -0,0 +1,47 @@
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt6.QtWidgets import QApplication
+
+from store import TaskStore
+from writer import WriteBehindStore, write_behind
+
+qt_app = QApplication.instance() or QApplication([])
+
+
+def gui_claims_fail(store):
+    def reserve_ids(count):
+        raise AssertionError("ids claimed on the GUI thread's connection")
+    store.reserve_ids = reserve_ids
+
+
+def test_ids_are_claimed_ahead_on_the_writer_thread(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    store = TaskStore(path)
+    gui_claims_fail(store)
+    tasks = write_behind(store)
+    ids = [tasks.add(f"task {i}", 1_700_000_000, False, f"{i:06d}") for i in range(3000)]
+    ids.append(tasks.reserve_ids(500))  # As sync does for pulled tasks
+    tasks.close()
+
+    assert len(set(ids)) == len(ids)
+    other = TaskStore(path)
+    assert other.reserve_ids(1) >= ids[-1] + 500
+    assert len(other.page(None, 10_000)) == 3000
+    other.close()
+
+
+def test_failed_id_claim_raises_oserror(tmp_path):
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    gui_claims_fail(store)
+    writer = store.writer()
+
+    def locked(count):
+        raise OSError("database is locked")
+    writer.reserve_ids = locked
+    tasks = WriteBehindStore(store, writer)
+    with pytest.raises(OSError, match="database is locked"):
+        tasks.add("task", 1_700_000_000, False, "000001")
+    tasks.close()
@@ -0,0 +1,182 @@
+"""
+Streaming import and export of tasks as JSON Lines or CSV.
+
+Everything is a generator pipeline: file rows are read, parsed and batched a chunk at a time,
+so memory stays constant however large the file is. Due dates are read as ISO-8601, epoch
+seconds, or the app's own DDMMYY/HHMM fields; exports write ISO-8601. An optional "repeat"
+field holds a recurrence rule, in the app's canonical form or as text like "every mon".
+
+    python transfer.py import tasks.jsonl
+    python transfer.py export tasks.csv
+"""
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from itertools import islice
+
+from core import TaskList
+from recurrence import parse_rule
+
+CHUNK_SIZE = 1000
+FIELDS = ("text", "due", "completed", "repeat")
+TRUE_TEXTS = {"1", "true", "yes", "y", "x", "done"}
+
+
+def file_format(path):
+    """"jsonl" or "csv", from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type: {extension or path!r} (use .jsonl or .csv)")
+
+
+# Reading
+
+def read_jsonl(f):
+    """Yields the objects of a binary JSON Lines file, skipping blank lines"""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(f):
+    """Yields the rows of a binary CSV file with a header row, as dicts"""
+    yield from csv.DictReader(io.TextIOWrapper(f, encoding="utf-8-sig", newline=""))
+
+
+def parse_due(row, now=None):
+    """
+    Due time of an imported row in epoch seconds: "due" as ISO-8601 or epoch seconds, else
+    "date" (DDMMYY) and "time" (HHMM) with the same defaults as the input fields
+    """
+    due = row.get("due")
+    if isinstance(due, (int, float)):
+        return int(due)
+    if due:
+        due = str(due).strip()
+        if due.isdigit() and len(due) > 6:
+            return int(due)
+        try:
+            return int(datetime.fromisoformat(due).timestamp())
+        except ValueError:
+            pass
+        if due.isdigit():
+            return int(TaskList.parse_due(due, str(row.get("time") or ""), now).timestamp())
+    return int(TaskList.parse_due(str(row.get("date") or "").strip(), str(row.get("time") or "").strip(),
+                                  now).timestamp())
+
+
+def parse_completed(value):
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_TEXTS
+    return bool(value)
+
+
+def parse_rows(rows, stats):
+    """
+    Yields (text, due, completed, repeat) for each usable row; rows without text are counted
+    in stats["skipped"], and unreadable recurrence rules are dropped
+    """
+    for row in rows:
+        text = str(row.get("text") or row.get("title") or "").strip() if isinstance(row, dict) else ""
+        if not text:
+            stats["skipped"] += 1
+            continue
+        due = parse_due(row)
+        yield text, due, parse_completed(row.get("completed")), parse_rule(str(row.get("repeat") or ""), due) or ""
+
+
+def chunked(items, size=CHUNK_SIZE):
+    """Yields lists of up to `size` consecutive items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_chunks(f, file_type, stats, size=CHUNK_SIZE):
+    """Parsed task chunks of an open binary file, ready for TaskList.add_many"""
+    rows = read_csv(f) if file_type == "csv" else read_jsonl(f)
+    return chunked(parse_rows(rows, stats), size)
+
+
+# Writing
+
+def export_rows(store, size=CHUNK_SIZE):
+    """Yields every task of a store as a dict, in display order, one page in memory at a time"""
+    after = None
+    while True:
+        page = store.page(after, size)
+        for _, text, due, completed, _, repeat in page:
+            yield {"text": text, "due": datetime.fromtimestamp(due).isoformat(timespec="minutes"),
+                   "completed": bool(completed), "repeat": repeat}
+        if len(page) < size:
+            return
+        task_id, _, _, completed, order_key, _ = page[-1]
+        after = (completed, order_key, task_id)
+
+
+def write_jsonl(rows, f):
+    """Writes rows to a text file as JSON Lines, yielding after each one"""
+    for row in rows:
+        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        yield
+
+
+def write_csv(rows, f):
+    """Writes rows to a text file as CSV with a header, yielding after each one"""
+    writer = csv.DictWriter(f, FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(dict(row, completed=int(row["completed"])))
+        yield
+
+
+def export_steps(store, f, file_type):
+    """Generator writing a store's tasks to an open text file; yields once per task"""
+    writer = write_csv if file_type == "csv" else write_jsonl
+    return writer(export_rows(store), f)
+
+
+def main(argv=None):
+    """Command line import/export against the configured store, without the UI"""
+    import argparse
+    from store import open_store
+
+    parser = argparse.ArgumentParser(description="Import or export tasks as JSON Lines or CSV.")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help="a .jsonl or .csv file")
+    args = parser.parse_args(argv)
+    file_type = file_format(args.path)
+
+    store = open_store()
+    try:
+        if args.command == "import":
+            tasks = TaskList(store)
+            tasks.load()
+            stats = {"skipped": 0}
+            imported = 0
+            with open(args.path, "rb") as f:
+                for chunk in import_chunks(f, file_type, stats):
+                    imported += len(tasks.add_many(chunk))
+                    print(f"\rImported {imported} tasks", end="", file=sys.stderr)
+            print(f"\rImported {imported} tasks, skipped {stats['skipped']} rows without text", file=sys.stderr)
+        else:
+            exported = 0
+            with open(args.path, "w", encoding="utf-8", newline="") as f:
+                for _ in export_steps(store, f, file_type):
+                    exported += 1
+            print(f"Exported {exported} tasks", file=sys.stderr)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
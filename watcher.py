@@ -0,0 +1,182 @@
+"""
+Live sync: between app instances sharing one task store, and across machines.
+
+StoreWatcher is told of writes to the store's files by a QFileSystemWatcher, and polls as
+a fallback for file systems that send no notifications. Either way it asks the store only
+for the ids of tasks other instances wrote since its last look, which the store answers
+from its change log without reading any task; the TaskList then re-reads just those.
+
+SyncAgent keeps the list in sync with other machines through a sync server (see sync.py),
+when JAX_TODO_SYNC_URL is set.
+"""
+import os
+import sqlite3
+import zlib
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QThreadPool, QTimer, pyqtSignal
+
+
+class StoreWatcher(QObject):
+    """
+    Reports tasks changed by other instances. `changed` carries their ids, or None when the
+    change log no longer reaches back to the last look and everything must be reloaded.
+    """
+
+    changed = pyqtSignal(object)
+
+    SETTLE_MS = 20  # Lets the several file writes of one commit arrive as one check
+    POLL_MS = 250
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.seq = store.change_seq()
+
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(self.SETTLE_MS)
+        self.settle_timer.timeout.connect(self.check)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_MS)
+        self.poll_timer.timeout.connect(self.check)
+        self.poll_timer.start()
+
+        # SQLite creates and removes the WAL file as connections come and go, so the
+        # directory is watched too and files are re-added when they reappear
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_changed)
+        self.watcher.directoryChanged.connect(self._on_changed)
+        self.watcher.addPath(os.path.dirname(os.path.abspath(store.watch_paths()[0])))
+        self._watch_files()
+
+    def _watch_files(self):
+        watched = set(self.watcher.files())
+        missing = [path for path in self.store.watch_paths() if path not in watched and os.path.exists(path)]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def _on_changed(self, path):
+        self._watch_files()
+        if not self.settle_timer.isActive():
+            self.settle_timer.start()
+
+    def check(self):
+        """Reports the changes other instances made since the last check, if any"""
+        self.seq, task_ids = self.store.changes_since(self.seq)
+        if task_ids is None or task_ids:
+            self.changed.emit(task_ids)
+
+    def stop(self):
+        self.poll_timer.stop()
+        self.settle_timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+
+class SyncAgent(QObject):
+    """
+    Runs sync rounds with a server: SETTLE_MS after local edits stop, and every POLL_MS for
+    changes made on other devices. Requests are sent from a worker thread, so the event
+    loop never waits on the network; responses are applied back on the UI thread, inside
+    `guard`. A failed round is retried after RETRY_MS, its changes kept in the outbox.
+    """
+
+    synced = pyqtSignal(dict)  # Counts of a round: sent, received, more
+    failed = pyqtSignal(str)
+    answered = pyqtSignal(object, object)  # Response, or error message; from the worker thread
+
+    SETTLE_MS = 500
+    POLL_MS = 5000
+    RETRY_MS = 15000
+
+    def __init__(self, client, url, guard, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.url = url
+        self.guard = guard
+        self.busy = False
+        self.again = False  # Another round is due once the one in flight is answered
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(self.SETTLE_MS)
+        self.settle_timer.timeout.connect(self.sync_now)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_MS)
+        self.poll_timer.timeout.connect(self.sync_now)
+        self.answered.connect(self._on_answered)
+        client.tasks.subscribe(self._on_task_event)
+
+    def start(self):
+        self.poll_timer.start()
+        QTimer.singleShot(0, self.sync_now)
+
+    def _on_task_event(self, event):
+        # The client records edits before this listener runs
+        if self.client.has_changes() and not self.settle_timer.isActive():
+            self.settle_timer.start()
+
+    def sync_now(self):
+        """Starts a round, or another one right after the one in flight"""
+        if self.busy:
+            self.again = True
+            return
+        self.settle_timer.stop()
+        try:
+            request = self.client.request()
+        except sqlite3.Error as e:
+            self.failed.emit(str(e))
+            return
+        self.busy = True
+        self.pool.start(lambda: self._send(request))
+
+    def _send(self, request):
+        """Runs on the worker thread"""
+        from sync import post
+
+        try:
+            response, error = post(self.url, request), None
+        except (OSError, ValueError, zlib.error) as e:
+            response, error = None, str(e) or type(e).__name__
+        try:
+            self.answered.emit(response, error)
+        except RuntimeError:
+            pass  # The agent was deleted at exit without being stopped
+
+    def _on_answered(self, response, error):
+        if not self.busy:
+            return  # Stopped meanwhile
+        self.busy = False
+        if error is not None:
+            self.client.abort()
+            self.again = False
+            self.poll_timer.stop()
+            self.failed.emit(error)
+            self.settle_timer.start(self.RETRY_MS)
+            return
+        try:
+            with self.guard():
+                result = self.client.apply(response)
+        except (OSError, sqlite3.Error) as e:  # No ids for pulled tasks, or the sync database is busy
+            self.again = False
+            self.failed.emit(str(e))
+            self.settle_timer.start(self.RETRY_MS)
+            return
+        if not self.poll_timer.isActive():
+            self.poll_timer.start()
+        self.synced.emit(result)
+        if result["more"] or self.again:
+            self.again = False
+            QTimer.singleShot(0, self.sync_now)
+
+    def stop(self):
+        """Stops syncing, waiting for a request in flight; changes not sent stay in the outbox"""
+        self.poll_timer.stop()
+        self.settle_timer.stop()
+        self.client.tasks.unsubscribe(self._on_task_event)
+        self.pool.waitForDone()
+        self.busy = False
+        self.client.close()
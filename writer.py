@@ -0,0 +1,338 @@
+"""
+Write-behind persistence: store writes never run on the GUI thread.
+
+WriteBehindStore wraps a task store. Writes are recorded as pending Changes, coalesced per
+task, and handed to a background thread as one batch shortly after they were made. Reads
+merge the changes not yet written over the wrapped store's rows, so callers see their own
+writes at once. Ids of new tasks are handed out in memory from blocks the background
+thread claims from the store ahead of need, so instances sharing a database never pick
+the same id and adding a task never waits on the disk.
+"""
+
+from collections import deque
+
+from PyQt6.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+
+from store import Change
+
+
+def write_behind(store, parent=None):
+    """Wraps a store in a WriteBehindStore, unless it has nothing to write"""
+    writer = store.writer()
+    return store if writer is None else WriteBehindStore(store, writer, parent)
+
+
+class WriteBehindStore(QObject):
+    """
+    Task store interface over a wrapped store, writing through a single background thread.
+    Changes made within WINDOW_MS of each other go out as one batch; while a batch is being
+    written, newer changes collect for the next one. A failed batch is kept and retried.
+    """
+
+    written = pyqtSignal(object)  # Error message of the batch just written, or None; from the writer thread
+    claimed = pyqtSignal()  # An id block claim finished; from the writer thread
+    failed = pyqtSignal(str)
+
+    WINDOW_MS = 100
+    RETRY_MS = 2000
+    ID_BLOCK = 1024  # Ids claimed at a time; the next block is claimed once half of one is handed out
+
+    def __init__(self, store, writer, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.writer = writer  # Store object the background thread writes through
+        self.next_id = self.id_limit = 0  # Claimed ids not handed out yet: [next_id, id_limit)
+        self.blocks = []  # (first, limit) of claimed blocks not taken into use yet
+        self.claims = deque()  # (first, count, error) of finished claims, from the writer thread
+        self.claiming = False
+        self.claim_error = None
+        self.pending = {}  # id -> Change not handed to the writer yet
+        self.flushing = None  # id -> Change of the batch being written
+        self.overlay = {}  # id -> Change not known to be written: the batch, then pending ones
+        self.rows = {}  # id -> current row of a task in the overlay, None if deleted; filled on reads
+        self.base_rows = {}  # id -> stored row under a partial change in the overlay
+        self.error = None
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.WINDOW_MS)
+        self.timer.timeout.connect(self.flush)
+        self.written.connect(self._on_written)
+        self.claimed.connect(self._take_claims)
+        self._claim_ahead(self.ID_BLOCK)
+
+    # Writing
+
+    def _record(self, task_id, change):
+        pending, overlay = self.pending, self.overlay
+        pending[task_id] = pending[task_id].then(change) if task_id in pending else change
+        overlay[task_id] = overlay[task_id].then(change) if task_id in overlay else change
+        self.rows.pop(task_id, None)
+        if self.flushing is None and not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        """Hands the pending changes to the writer thread, unless a batch is being written"""
+        if self.flushing is not None or not self.pending:
+            return
+        self.flushing, self.pending = self.pending, {}
+        batch = list(self.flushing.items())
+        self.pool.start(lambda: self._write(batch))
+
+    def _write(self, batch):
+        """Runs on the writer thread"""
+        try:
+            self.writer.apply(batch)
+            error = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self.error = error
+        try:
+            self.written.emit(error)
+        except RuntimeError:
+            pass  # The store object was deleted at exit without being closed
+
+    def _on_written(self, error):
+        if self.flushing is None:
+            return  # Already settled by close()
+        batch, self.flushing = self.flushing, None
+        if error is not None:
+            # Keep the batch, ahead of anything changed since, and try again later
+            for task_id, change in self.pending.items():
+                batch[task_id] = batch[task_id].then(change) if task_id in batch else change
+            self.pending = batch
+            self.failed.emit(error)
+            self.timer.start(self.RETRY_MS)
+            return
+        # The store now holds the batch: only the pending changes remain to be merged over it
+        self.overlay = dict(self.pending)
+        for task_id in batch:
+            self.base_rows.pop(task_id, None)
+            if task_id not in self.overlay:
+                self.rows.pop(task_id, None)
+        if self.pending:
+            self.timer.start(self.WINDOW_MS)
+
+    # Ids
+
+    def _claim(self, count):
+        """Runs on the writer thread"""
+        try:
+            self.claims.append((self.writer.reserve_ids(count), count, None))
+        except Exception as e:
+            self.claims.append((None, count, e))
+        try:
+            self.claimed.emit()
+        except RuntimeError:
+            pass  # The store object was deleted at exit without being closed
+
+    def _claim_ahead(self, count):
+        if not self.claiming:
+            self.claiming = True
+            self.pool.start(lambda: self._claim(count))
+
+    def _take_claims(self):
+        while self.claims:
+            first, count, error = self.claims.popleft()
+            self.claiming = False
+            if error is None:
+                self.blocks.append((first, first + count))
+            else:
+                self.claim_error = error  # Claimed again when ids are next handed out
+                self.failed.emit(str(error) or type(error).__name__)
+
+    def _block_for(self, count):
+        """Takes a claimed block holding `count` ids, waiting for the writer thread to claim one if none does"""
+        self.claim_error = None
+        while True:
+            block = next((block for block in self.blocks if block[1] - block[0] >= count), None)
+            if block is not None:
+                self.blocks.remove(block)
+                return block
+            if self.claim_error is not None:
+                raise OSError(f"Could not claim task ids: {self.claim_error}")
+            self._claim_ahead(max(count, self.ID_BLOCK))  # Unless a claim is in flight already
+            self.pool.waitForDone()
+            self._take_claims()
+
+    def _new_ids(self, count):
+        self._take_claims()
+        if self.next_id + count > self.id_limit:
+            self.next_id, self.id_limit = self._block_for(count)
+        first = self.next_id
+        self.next_id += count
+        if not self.blocks and self.id_limit - self.next_id < self.ID_BLOCK // 2:
+            self._claim_ahead(self.ID_BLOCK)
+        return range(first, first + count)
+
+    def add(self, text, due, completed, order_key, repeat=""):
+        """Records a new task and returns its id"""
+        return self.add_many([(text, due, completed, order_key, repeat)])[0]
+
+    def add_many(self, tasks):
+        """Records (text, due, completed, order_key, repeat) tasks and returns their ids"""
+        tasks = list(tasks)
+        ids = self._new_ids(len(tasks))
+        for task_id, (text, due, completed, order_key, repeat) in zip(ids, tasks):
+            self._record(task_id, Change(text, due, bool(completed), order_key, repeat))
+        return list(ids)
+
+    def restore_many(self, rows):
+        """Records deleted tasks re-created from their (id, text, due, completed, order_key, repeat) rows"""
+        for task_id, text, due, completed, order_key, repeat in rows:
+            self._record(task_id, Change(text, due, bool(completed), order_key, repeat))
+
+    def remove(self, task_id):
+        self._record(task_id, Change(deleted=True))
+
+    def remove_many(self, task_ids):
+        for task_id in task_ids:
+            self._record(task_id, Change(deleted=True))
+
+    def set_completed(self, task_id, completed, order_key):
+        self._record(task_id, Change(completed=bool(completed), order_key=order_key))
+
+    def set_order(self, task_id, order_key):
+        self._record(task_id, Change(order_key=order_key))
+
+    def set_text(self, task_id, text, due, repeat):
+        self._record(task_id, Change(text=text, due=due, repeat=repeat))
+
+    def apply(self, changes):
+        """Records a batch of (id, Change) pairs, such as a bulk edit"""
+        for task_id, change in changes:
+            self._record(task_id, change)
+
+    # Reading
+
+    def _dirty(self):
+        """Current rows of the tasks with unwritten changes: id -> row, or None if deleted"""
+        rows, overlay = self.rows, self.overlay
+        if len(rows) < len(overlay):
+            stale = [task_id for task_id in overlay if task_id not in rows]
+            missing = [task_id for task_id in stale
+                       if not (overlay[task_id].deleted or overlay[task_id].full) and task_id not in self.base_rows]
+            for row in self.store.get_many(missing) if missing else ():
+                self.base_rows[row[0]] = row
+            for task_id in stale:
+                change = overlay[task_id]
+                if change.deleted:
+                    rows[task_id] = None
+                elif change.full:
+                    rows[task_id] = change.row(task_id)
+                else:
+                    row = self.base_rows.get(task_id)
+                    rows[task_id] = change.applied(row) if row is not None else None
+        return rows
+
+    def page(self, after, limit):
+        """
+        Returns up to `limit` tasks as (id, text, due, completed, order_key, repeat) in display
+        order, starting after the (completed, order_key, id) position `after` (None for the top)
+        """
+        dirty = self._dirty()
+        if not dirty:
+            return self.store.page(after, limit)
+        # Every changed task the stored page holds is dropped, so read enough to make up for them
+        rows = [row for row in self.store.page(after, limit + len(dirty)) if row[0] not in dirty]
+        after = tuple(after) if after is not None else None
+        rows += [row for row in dirty.values()
+                 if row is not None and (after is None or (row[3], row[4], row[0]) > after)]
+        rows.sort(key=lambda row: (row[3], row[4], row[0]))
+        return rows[:limit]
+
+    def get_many(self, task_ids):
+        """Returns the (id, text, due, completed, order_key, repeat) rows of the given tasks"""
+        dirty = self._dirty()
+        if not dirty:
+            return self.store.get_many(task_ids)
+        rows = self.store.get_many([task_id for task_id in task_ids if task_id not in dirty])
+        return rows + [dirty[task_id] for task_id in task_ids if dirty.get(task_id) is not None]
+
+    def max_order_key(self, completed):
+        """
+        Largest order key in the active or completed section, or None if it is empty. While
+        changes are pending it may be a key that was since moved away, which still sorts
+        after the section, as appending needs.
+        """
+        key = self.store.max_order_key(completed)
+        for row in self._dirty().values():
+            if row is not None and row[3] == completed and (key is None or row[4] > key):
+                key = row[4]
+        return key
+
+    def last_id(self):
+        return max(self.store.last_id(), max(self.overlay, default=0))
+
+    def reserve_ids(self, count):
+        """Claims `count` consecutive ids, from the blocks claimed ahead; returns the first"""
+        return self._new_ids(count).start
+
+    def change_seq(self):
+        return self.store.change_seq()
+
+    def changes_since(self, seq):
+        """
+        Changes by other instances, as the wrapped store reports them. The stored rows of
+        those tasks are re-read, so pending changes to them are merged over the new rows.
+        """
+        seq, ids = self.store.changes_since(seq)
+        if ids is None:
+            self.rows, self.base_rows = {}, {}
+        for task_id in ids or ():
+            self.base_rows.pop(task_id, None)
+            self.rows.pop(task_id, None)
+        return seq, ids
+
+    def watch_paths(self):
+        return self.store.watch_paths()
+
+    def dues(self):
+        """Returns (id, due, completed) of every task"""
+        dirty = self._dirty()
+        if not dirty:
+            return self.store.dues()
+        dues = [row for row in self.store.dues() if row[0] not in dirty]
+        return dues + [(row[0], row[2], row[3]) for row in dirty.values() if row is not None]
+
+    def due_tasks(self, after, until):
+        """Returns (id, due) of active tasks due in the interval (after, until]"""
+        dirty = self._dirty()
+        due = [(task_id, due) for task_id, due in self.store.due_tasks(after, until) if task_id not in dirty]
+        return due + [(row[0], row[2]) for row in dirty.values()
+                      if row is not None and not row[3] and after < row[2] <= until]
+
+    def completed_tasks(self, until, limit):
+        """Returns (id, due) of up to `limit` completed tasks due by `until`"""
+        dirty = self._dirty()
+        done = [(task_id, due) for task_id, due in self.store.completed_tasks(until, limit + len(dirty))
+                if task_id not in dirty]
+        done += [(row[0], row[2]) for row in dirty.values() if row is not None and row[3] and row[2] <= until]
+        return done[:limit]
+
+    def writer(self):
+        return None  # Already writing in the background
+
+    # Durability
+
+    def sync(self):
+        """Starts writing pending changes now instead of at the end of the window"""
+        self.timer.stop()
+        self.flush()
+
+    def close(self):
+        """Waits for the batch in flight, writes whatever is left and closes the stores"""
+        self.timer.stop()
+        self.pool.waitForDone()
+        if self.flushing is not None:
+            self._on_written(self.error)
+        self.timer.stop()
+        if self.pending:
+            self.writer.apply(list(self.pending.items()))
+            self.pending = {}
+        self.overlay, self.rows, self.base_rows = {}, {}, {}
+        if self.writer is not self.store:
+            self.writer.close()
+        self.store.close()